@@ -0,0 +1,103 @@
+# benchmarks/amqp_stub.py
+"""Broker AMQP simulé en mémoire, branché sur un RabbitMQPool.
+
+Il remplace pika.BlockingConnection pour mesurer le débit de publication
+(pool, outbox, encodage) sans RabbitMQ. `confirm_delay` simule l'aller-retour
+de l'accusé du broker sur un canal en mode confirmation.
+"""
+import threading
+import time
+
+from src.rabbitmq_pool import _PooledChannel
+
+
+class StubChannel:
+    def __init__(self, broker: "StubBroker"):
+        self.broker = broker
+        self.is_closed = False
+        self.confirming = False
+
+    def confirm_delivery(self):
+        self.confirming = True
+
+    def queue_declare(self, queue, **kwargs):
+        self.broker.count('declares')
+
+    def exchange_declare(self, exchange, exchange_type='direct', **kwargs):
+        self.broker.count('declares')
+
+    def queue_bind(self, **kwargs):
+        self.broker.count('bindings')
+
+    def queue_unbind(self, **kwargs):
+        self.broker.count('bindings')
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if self.confirming and self.broker.confirm_delay:
+            time.sleep(self.broker.confirm_delay)
+        self.broker.received(len(body))
+
+    def close(self):
+        self.is_closed = True
+
+
+class StubConnection:
+    def __init__(self, broker: "StubBroker"):
+        self.is_closed = False
+        self.is_open = True
+        self._channel = StubChannel(broker)
+
+    def channel(self):
+        return self._channel
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def sleep(self, duration):
+        time.sleep(duration)
+
+    def close(self):
+        self.is_closed, self.is_open = True, False
+
+
+class StubBroker:
+    """Compte les messages et octets reçus ; attend un nombre de messages"""
+
+    def __init__(self, confirm_delay: float = 0.0):
+        self.confirm_delay = confirm_delay  # secondes par message confirmé
+        self.messages = 0
+        self.bytes = 0
+        self.counters = {}
+        self.connections = 0
+        self._condition = threading.Condition()
+
+    def attach(self, pool):
+        """Les nouvelles connexions du pool seront ouvertes sur ce broker"""
+        pool._connect = self.connect
+        return pool
+
+    def connect(self) -> _PooledChannel:
+        with self._condition:
+            self.connections += 1
+        connection = StubConnection(self)
+        return _PooledChannel(connection, connection.channel())
+
+    def count(self, name: str):
+        with self._condition:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def received(self, size: int):
+        with self._condition:
+            self.messages += 1
+            self.bytes += size
+            self._condition.notify_all()
+
+    def wait_for(self, count: int, timeout: float = 60.0) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.messages < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
@@ -0,0 +1,80 @@
+# benchmarks/bench_agenda_store.py
+"""Compare l'ancien agenda (liste + parcours linéaire) à l'AgendaStore indexé.
+
+Usage : python -m benchmarks.bench_agenda_store
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from src.agenda_store import AgendaStore
+from src.event_query import EventQuery, day_bounds
+from src.models import Event, PriorityLevel
+
+LOOKUPS = 200
+
+
+def make_events(n: int):
+    rng = random.Random(42)
+    start = datetime(2024, 9, 1)
+    priorities = list(PriorityLevel)
+    return [
+        Event(title=f"evt-{i}", date=start + timedelta(hours=rng.randrange(24 * 365)),
+              priority=rng.choice(priorities))
+        for i in range(n)
+    ]
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / LOOKUPS * 1e6  # µs par opération
+
+
+def bench(n: int):
+    events = make_events(n)
+    titles = [events[i].title for i in random.Random(1).sample(range(n), LOOKUPS)]
+    day = datetime(2025, 3, 14)
+    agenda_list = list(events)
+    store = AgendaStore(events)
+
+    def list_lookup():
+        for title in titles:
+            next(e for e in agenda_list if e.title == title)
+
+    def store_lookup():
+        for title in titles:
+            store.get(store.find_by_title(title))
+
+    def list_filter():
+        for _ in range(LOOKUPS):
+            [e for e in agenda_list if e.date.date() == day.date() and e.priority == PriorityLevel.P1]
+
+    query = EventQuery(*day_bounds(day), priorities=[PriorityLevel.P1])
+
+    def store_filter():
+        for _ in range(LOOKUPS):
+            query.run([store])
+
+    def list_delete():
+        for title in titles:
+            for i, e in enumerate(agenda_list):
+                if e.title == title:
+                    agenda_list.pop(i)
+                    break
+
+    def store_delete():
+        for title in titles:
+            store.remove(store.find_by_title(title))
+
+    print(f"--- {n} événements (µs par opération) ---")
+    for name, old, new in (("recherche par titre", list_lookup, store_lookup),
+                           ("filtre date + priorité", list_filter, store_filter),
+                           ("suppression par titre", list_delete, store_delete)):
+        t_old, t_new = timed(old), timed(new)
+        print(f"{name:<25} liste: {t_old:10.1f}   index: {t_new:8.1f}   x{t_old / t_new:.0f}")
+
+
+if __name__ == "__main__":
+    for n in (10_000, 100_000):
+        bench(n)
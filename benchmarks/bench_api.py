@@ -0,0 +1,158 @@
+# benchmarks/bench_api.py
+"""Générateur de charge en processus : chaque endpoint de l'API est appelé
+en ASGI direct (httpx, sans réseau), avec un broker simulé et un jeu de
+classes synthétique de N élèves et M événements.
+
+Usage : python -m benchmarks.bench_api [--quick] [--output results.json]
+"""
+import asyncio
+import itertools
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from benchmarks.amqp_stub import StubBroker
+from benchmarks.fixtures import PASSWORD, Dataset, make_events
+from benchmarks.harness import HIGHER, Results, percentile
+from src import publisher
+
+SUITE = 'api'
+CONCURRENCY = 8
+
+
+class Scenario:
+    """Une requête type ; `path`, `json` et `method` peuvent dépendre du numéro d'appel.
+    `requests` remplace le nombre d'appels commun (requêtes coûteuses)"""
+
+    def __init__(self, name, method, path, user=None, json=None, content=None, form=None,
+                 content_type=None, requests=None):
+        self.name = name
+        self.requests = requests
+        self.method = method
+        self.path = path
+        self.user = user
+        self.json = json
+        self.content = content
+        self.form = form
+        self.content_type = content_type
+
+    def request(self, client: httpx.AsyncClient, tokens: dict, i: int):
+        value = lambda option: option(i) if callable(option) else option
+        headers = {}
+        if self.user is not None:
+            headers['Authorization'] = f'Bearer {tokens[self.user]}'
+        if self.content_type is not None:
+            headers['Content-Type'] = self.content_type
+        return client.request(value(self.method), value(self.path), headers=headers,
+                              json=value(self.json), content=self.content, data=self.form)
+
+
+def event_body(i: int) -> dict:
+    date = datetime(2025, 1, 1) + timedelta(minutes=i)
+    return {'title': f"Charge {i}", 'date': date.isoformat(), 'priority': 'P2'}
+
+
+def scenarios(data: Dataset, requests: int):
+    student, class_name = data.students[0], data.classes[0]
+    teacher = data.teacher_of(class_name)
+    # Événements et élèves jetables : une suppression ou une inscription par requête
+    private_owner = data.students[1]
+    private_ids = [event.id for event in
+                   data.repo.add_private_events(private_owner, make_events(data.rng, requests, "Jetable"))]
+    class_ids = [event.id for event in
+                 data.repo.add_class_events(class_name, make_events(data.rng, requests, "Jetable"))]
+    spare = data.spare_students(requests)
+    some_private = data.repo.add_private_events(student, make_events(data.rng, 1, "Modifiable"))[0].id
+    some_shared = data.repo.class_events(class_name)[0].id
+    bulk = ''.join(f'{{"title": "Import {i}", "date": "2025-02-01T08:00:00"}}\n' for i in range(20)).encode()
+    return [
+        # Hachage du mot de passe (~0,1 s de CPU) : moins d'appels
+        Scenario('POST token', 'POST', '/token', form={'username': student, 'password': PASSWORD},
+                 requests=max(requests // 20, 10)),
+        Scenario('GET agenda', 'GET', '/users/me/agenda', student),
+        Scenario('GET agenda page', 'GET', '/users/me/agenda?limit=50', student),
+        Scenario('GET agenda filter', 'GET',
+                 '/users/me/agenda/filter?from=01/10/2024&to=31/10/2024&priority=P1,P2', student),
+        Scenario('GET agenda.ics', 'GET', '/users/me/agenda.ics', student),
+        Scenario('GET agenda export', 'GET', '/users/me/agenda/export?format=ndjson', student),
+        Scenario('GET class events', 'GET', f'/classe/{class_name}/events', teacher),
+        Scenario('GET class filter', 'GET', f'/classe/{class_name}/events/filter?priority=P1', teacher),
+        Scenario('GET class events.ics', 'GET', f'/classe/{class_name}/events.ics', teacher),
+        Scenario('POST private event', 'POST', '/users/me/agenda', data.students[2], json=event_body),
+        Scenario('PUT private by_id', 'PUT', f'/users/me/agenda/by_id/{some_private}', student, json=event_body),
+        Scenario('DELETE private by_id', 'DELETE', lambda i: f'/users/me/agenda/by_id/{private_ids[i]}',
+                 private_owner),
+        Scenario('POST class event', 'POST', f'/classe/{class_name}', teacher, json=event_body),
+        Scenario('PUT class by_id', 'PUT', f'/classe/{class_name}/events/by_id/{some_shared}', teacher,
+                 json=event_body),
+        Scenario('DELETE class by_id', 'DELETE', lambda i: f'/classe/{class_name}/events/by_id/{class_ids[i]}',
+                 teacher),
+        Scenario('POST bulk ndjson x20', 'POST', '/users/me/agenda/bulk', data.students[3], content=bulk,
+                 content_type='application/x-ndjson'),
+        Scenario('POST class student', 'POST', lambda i: f'/classe/{class_name}/students/{spare[i]}', teacher),
+        Scenario('DELETE class student', 'DELETE', lambda i: f'/classe/{class_name}/students/{spare[i]}', teacher),
+    ]
+
+
+async def drive(client, tokens, scenario: Scenario, requests: int, concurrency: int):
+    """Lance `requests` appels répartis sur `concurrency` clients simultanés"""
+    latencies, errors = [], 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            start = time.perf_counter()
+            response = await scenario.request(client, tokens, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def report(results: Results, scenario: Scenario, latencies, errors: int, elapsed: float, params: dict):
+    params = dict(params, requests=len(latencies), errors=errors)
+    if errors:
+        print(f"  ! {scenario.name} : {errors} réponse(s) en erreur")
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    results.add(SUITE, f'{scenario.name} throughput', len(latencies) / elapsed, 'req/s', HIGHER, **params)
+    for p in (50, 95, 99):
+        results.add(SUITE, f'{scenario.name} p{p}', percentile(latencies_ms, p), 'ms', **params)
+
+
+async def run_async(results: Results, data: Dataset, requests: int, concurrency: int):
+    import src.main as api
+
+    # Le dépôt de l'API est remplacé par le jeu synthétique ; RabbitMQ par le broker simulé
+    api.repo = data.repo
+    for cache in (api.session_cache, api.class_responses, api.ics_feeds):
+        cache.clear()
+    StubBroker().attach(publisher.pool)
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        tokens = {}
+        for username in data.students[:4] + data.teachers:
+            response = await client.post('/token', data={'username': username, 'password': PASSWORD})
+            tokens[username] = response.json()['access_token']
+        params = dict(data.params, concurrency=concurrency)
+        for scenario in scenarios(data, requests):
+            latencies, errors, elapsed = await drive(client, tokens, scenario, scenario.requests or requests,
+                                                     concurrency)
+            report(results, scenario, latencies, errors, elapsed, params)
+
+
+def run(results: Results, quick: bool = False):
+    data = Dataset(classes=5, students=30 if quick else 200, events=100 if quick else 1_000,
+                   private_events=20)
+    asyncio.run(run_async(results, data, requests=100 if quick else 1_000, concurrency=CONCURRENCY))
+
+
+if __name__ == "__main__":
+    import sys
+    from benchmarks.run_suite import main
+    main(sys.argv[1:] + ['--only', SUITE])
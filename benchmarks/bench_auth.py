@@ -0,0 +1,51 @@
+# benchmarks/bench_auth.py
+"""Coût de l'authentification : hachage et vérification des mots de passe,
+création et vérification des tokens signés, surcoût par requête avec et
+sans le cache des tokens vérifiés.
+
+Usage : python -m benchmarks.bench_auth [--quick] [--output results.json]
+"""
+from benchmarks.fixtures import PASSWORD, Dataset
+from benchmarks.harness import Results, per_op
+from src import auth
+
+SUITE = 'auth'
+
+
+def run(results: Results, quick: bool = False):
+    import src.main as api
+
+    data = Dataset(classes=1, students=10, events=10, private_events=0)
+    api.repo = data.repo
+    api.session_cache.clear()
+    username = data.students[0]
+    params = {'iterations': auth.PASSWORD_ITERATIONS}
+
+    hashed = auth.hash_password(PASSWORD)
+    number = 2 if quick else 10
+    results.add(SUITE, 'password.hash', per_op(lambda: auth.hash_password(PASSWORD), number, 3) / 1000,
+                'ms', **params)
+    results.add(SUITE, 'password.verify', per_op(lambda: auth.verify_password(PASSWORD, hashed), number, 3) / 1000,
+                'ms', **params)
+
+    number = 2_000 if quick else 20_000
+    token = auth.create_token(username)
+    results.add(SUITE, 'token.create', per_op(lambda: auth.create_token(username), number), 'us/op')
+    results.add(SUITE, 'token.decode', per_op(lambda: auth.decode_token(token), number), 'us/op')
+
+    # Surcoût par requête authentifiée : cache des tokens vérifiés, puis sans cache
+    # (signature + lecture de l'utilisateur à chaque requête)
+    api.authenticate(token)
+    results.add(SUITE, 'request.cache_hit', per_op(lambda: api.authenticate(token), number), 'us/op')
+
+    def cache_miss():
+        api.session_cache.clear()
+        api.authenticate(token)
+
+    results.add(SUITE, 'request.cache_miss', per_op(cache_miss, number), 'us/op')
+
+
+if __name__ == "__main__":
+    import sys
+    from benchmarks.run_suite import main
+    main(sys.argv[1:] + ['--only', SUITE])
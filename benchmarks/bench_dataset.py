@@ -0,0 +1,41 @@
+# benchmarks/bench_dataset.py
+"""Jeu synthétique (src.synthetic_db) : démarrage en mode lazy et eager,
+première lecture d'un agenda généré à la demande, lecture suivante.
+
+Usage : python -m benchmarks.bench_dataset [--quick] [--output results.json]
+"""
+import time
+
+from benchmarks.harness import Results, per_op
+from src.repository import MemoryRepository
+from src.synthetic_db import SchoolDataset
+
+SUITE = 'dataset'
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def run(results: Results, quick: bool = False):
+    dataset = SchoolDataset(schools=1 if quick else 10, students=200 if quick else 1000,
+                            class_events=50 if quick else 200)
+    params = {'users': dataset.user_count(), 'events': dataset.event_count()}
+
+    repo, elapsed = timed(lambda: MemoryRepository(*dataset.load('lazy')))
+    results.add(SUITE, 'startup.lazy', elapsed * 1000, 'ms', **params)
+    student = dataset.student_name(0, 0)
+    _, elapsed = timed(lambda: repo.agenda(student))
+    results.add(SUITE, 'agenda.first_read.lazy', elapsed * 1000, 'ms', **params)
+    results.add(SUITE, 'agenda.next_read.lazy', per_op(lambda: repo.agenda(student), 100), 'us/op', **params)
+
+    _, elapsed = timed(lambda: MemoryRepository(*dataset.load('eager')))
+    results.add(SUITE, 'startup.eager', elapsed * 1000, 'ms', **params)
+
+
+if __name__ == "__main__":
+    import sys
+    from benchmarks.run_suite import main
+    main(sys.argv[1:] + ['--only', SUITE])
@@ -0,0 +1,103 @@
+# benchmarks/bench_memory.py
+"""Mémoire occupée par les agendas : octets par événement stocké (index
+compris), pour un AgendaStore seul et pour le jeu synthétique chargé en
+mode eager. Mesuré avec tracemalloc (allocations Python retenues).
+
+Chaque mesure est comparée à l'ancienne disposition : une liste de modèles
+Event par élève, qui contient sa propre copie des événements de ses classes
+(mesurée sur un échantillon d'élèves, le jeu complet ne tiendrait pas en
+mémoire).
+
+Usage : python -m benchmarks.bench_memory [--quick] [--output results.json]
+"""
+import gc
+import tracemalloc
+
+from benchmarks.harness import Results
+from src.agenda_store import AgendaStore
+from src.event_ids import new_event_id
+from src.models import Event
+from src.repository import MemoryRepository
+from src.synthetic_db import SchoolDataset
+
+SUITE = 'memory'
+OLD_LAYOUT_STUDENTS = 20  # élèves de l'échantillon pour l'ancienne disposition
+
+
+def retained(build):
+    """(objet construit, octets retenus après construction)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        value = build()
+        gc.collect()
+        return value, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def as_models(events):
+    """Copies pydantic des événements générés (ancienne disposition)"""
+    return [Event(title=e.title, date=e.date, priority=e.priority, id=new_event_id()) for e in events]
+
+
+def run(results: Results, quick: bool = False):
+    dataset = SchoolDataset(schools=1, students=100 if quick else 1000, class_events=100 if quick else 500)
+
+    # Un seul agenda : les événements de toutes les classes d'une école
+    def build_store():
+        store = AgendaStore()
+        for index in range(dataset.classes):
+            for event in dataset.generate_class_events(dataset.class_name(0, index)):
+                store.add(event)
+        return store
+
+    store, size = retained(build_store)
+    results.add(SUITE, 'store.bytes_per_event', size / len(store), 'B', events=len(store))
+
+    def build_list():
+        # Ancien agenda : une simple liste de modèles Event
+        return [event for index in range(dataset.classes)
+                for event in as_models(dataset.generate_class_events(dataset.class_name(0, index)))]
+
+    agenda, size = retained(build_list)
+    results.add(SUITE, 'list.bytes_per_event', size / len(agenda), 'B', events=len(agenda))
+
+    def build_and_read():
+        # Lecture complète : modèles construits puis libérés
+        store = build_store()
+        list(store)
+        return store
+
+    store, size = retained(build_and_read)
+    results.add(SUITE, 'store.bytes_per_event_after_read', size / len(store), 'B', events=len(store))
+
+    repo, size = retained(lambda: MemoryRepository(*dataset.load('eager')))
+    stats = repo.size_stats()
+    events = stats['private'][0] + stats['shared'][0]
+    results.add(SUITE, 'dataset.bytes_per_event', size / events, 'B', users=dataset.user_count(), events=events)
+    students = dataset.schools * dataset.students
+    results.add(SUITE, 'dataset.bytes_per_student', size / students, 'B', students=students)
+    del repo
+
+    # Ancienne disposition : chaque élève copie les événements de ses classes
+    sample = [dataset.student_name(0, index) for index in range(min(OLD_LAYOUT_STUDENTS, dataset.students))]
+    rosters = dataset.classes_db()
+
+    def build_lists():
+        return {username: as_models(dataset.generate_private_events(username))
+                + [event for class_name, class_info in rosters.items() if username in class_info["students"]
+                   for event in as_models(dataset.generate_class_events(class_name))]
+                for username in sample}
+
+    agendas, size = retained(build_lists)
+    events = sum(map(len, agendas.values()))
+    results.add(SUITE, 'dataset.old_layout.bytes_per_event', size / events, 'B', students=len(sample), events=events)
+    results.add(SUITE, 'dataset.old_layout.bytes_per_student', size / len(sample), 'B', students=len(sample))
+
+
+if __name__ == "__main__":
+    import sys
+    from benchmarks.run_suite import main
+    main(sys.argv[1:] + ['--only', SUITE])
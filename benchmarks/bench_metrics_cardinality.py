@@ -0,0 +1,77 @@
+# benchmarks/bench_metrics_cardinality.py
+"""Vérifie que la taille de /metrics reste stable quand des clients envoient
+des noms de classe tous différents (libellés bornés par modèle de route).
+
+Usage : python -m benchmarks.bench_metrics_cardinality [nombre de classes]
+Code de sortie 1 si l'exposition grossit de plus de 10 % ou si une requête
+n'est pas traitée par la route (statut autre que 200/404, ex. 401).
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')  # pas de journal d'accès pendant la mesure
+
+import httpx
+from prometheus_client import generate_latest
+
+from src.auth import create_token
+from src.main import app
+from src.metrics import registry
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+CHECKPOINTS = 10
+MAX_GROWTH = 1.10
+EXPECTED_STATUS = {200, 404}  # classe existante ou inconnue
+
+
+def exposition_size() -> int:
+    return len(generate_latest(registry))
+
+
+async def bench():
+    # Appels ASGI directs, sans événement de démarrage (ni RabbitMQ, ni rappels)
+    transport = httpx.ASGITransport(app=app)
+    client = httpx.AsyncClient(transport=transport, base_url='http://test')
+    # Jeton signé par ce processus (même secret que l'application importée)
+    headers = {'Authorization': f"Bearer {create_token('JerMac')}"}
+    unexpected = 0
+
+    async def get(url: str):
+        nonlocal unexpected
+        response = await client.get(url, headers=headers)
+        if response.status_code not in EXPECTED_STATUS:
+            unexpected += 1
+            if unexpected == 1:
+                print(f"statut inattendu {response.status_code} pour {url}")
+
+    # Avant la mesure, chaque route est appelée avec des classes existantes et
+    # inconnues : toutes les séries attendues (dont "other" et les 404) existent
+    for class_name in ('M321', 'CG', 'warmup'):
+        await get(f'/classe/{class_name}/events')
+        await get(f'/classe/{class_name}/events/filter')
+    baseline = exposition_size()
+    print(f"--- {N} noms de classe distincts ---")
+    print(f"{'requêtes':>10} {'octets /metrics':>16} {'req/s':>8}")
+    print(f"{0:>10} {baseline:>16}")
+
+    start = time.perf_counter()
+    step = max(N // CHECKPOINTS, 1)
+    size = baseline
+    for i in range(1, N + 1):
+        path = '/classe/cls-{0}/events' if i % 2 else '/classe/cls-{0}/events/filter'
+        await get(path.format(i))
+        if i % step == 0 or i == N:
+            size = exposition_size()
+            print(f"{i:>10} {size:>16} {i / (time.perf_counter() - start):>8.0f}")
+
+    await client.aclose()
+    growth = size / baseline
+    print(f"croissance : x{growth:.3f}")
+    print(f"réponses hors 200/404 : {unexpected}")
+    return growth <= MAX_GROWTH and not unexpected
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(bench()) else 1)
@@ -0,0 +1,98 @@
+# benchmarks/bench_micro.py
+"""Micro-benchmarks : filtres, modifications d'agenda, modèles pydantic.
+
+Usage : python -m benchmarks.bench_micro [--quick] [--output results.json]
+"""
+import itertools
+from datetime import datetime, timedelta
+
+from pydantic import TypeAdapter
+
+from benchmarks.fixtures import Dataset
+from benchmarks.harness import Results, per_op
+from src.event_query import EventQuery
+from src.models import Event, PriorityLevel, UserInDB
+
+SUITE = 'micro'
+
+
+def bench_filters(results: Results, data: Dataset, number: int):
+    repo, student, class_name = data.repo, data.students[0], data.classes[0]
+    queries = {
+        'date': EventQuery.from_params(date='14/10/2024'),
+        'range_month': EventQuery.from_params(date_from='01/10/2024', date_to='31/10/2024'),
+        'priority_p1': EventQuery.from_params(priorities=[PriorityLevel.P1]),
+        'range+priority': EventQuery.from_params(date_from='01/10/2024', date_to='31/10/2024',
+                                                 priorities=[PriorityLevel.P1, PriorityLevel.P2]),
+    }
+    results.add(SUITE, 'query.parse_params',
+                per_op(lambda: EventQuery.from_params('14/10/2024', None, None, [PriorityLevel.P1]), number), 'us/op')
+    for name, query in queries.items():
+        results.add(SUITE, f'agenda.filter.{name}',
+                    per_op(lambda: repo.query_agenda(student, query), number), 'us/op', **data.params)
+        results.add(SUITE, f'class.filter.{name}',
+                    per_op(lambda: repo.query_class_events(class_name, query), number), 'us/op', **data.params)
+    results.add(SUITE, 'agenda.page_50',
+                per_op(lambda: repo.query_agenda(student, EventQuery(), None, 50), number), 'us/op', **data.params)
+    # Page suivante d'un filtre par priorité seule (reprise au curseur)
+    p1 = queries['priority_p1']
+    _, cursor = repo.query_class_events(class_name, p1, None, 50)
+    results.add(SUITE, 'class.page_50.priority_p1',
+                per_op(lambda: repo.query_class_events(class_name, p1, cursor, 50), number), 'us/op', **data.params)
+    results.add(SUITE, 'agenda.full', per_op(lambda: repo.agenda(student), number), 'us/op', **data.params)
+
+
+def bench_mutations(results: Results, data: Dataset, number: int):
+    repo, student, class_name = data.repo, data.students[-1], data.classes[-1]
+    dates = (datetime(2025, 1, 1) + timedelta(hours=i) for i in itertools.count())
+    created = []
+
+    def add():
+        created.append(repo.add_private_event(student, Event(title="Bench", date=next(dates))).id)
+
+    results.add(SUITE, 'agenda.add_private', per_op(add, number, repeat=1), 'us/op')
+    ids = iter(list(created))
+    results.add(SUITE, 'agenda.update_private',
+                per_op(lambda: repo.update_private_event(student, next(ids), "Bench 2", next(dates),
+                                                         PriorityLevel.P1), number, repeat=1), 'us/op')
+    ids = iter(list(created))
+    results.add(SUITE, 'agenda.delete_private',
+                per_op(lambda: repo.delete_private_event(student, next(ids)), number, repeat=1), 'us/op')
+    # Écriture d'une classe : invalide les vues de tous ses élèves
+    results.add(SUITE, 'class.add_event',
+                per_op(lambda: repo.add_class_event(class_name, Event(title="Bench", date=next(dates))),
+                       number, repeat=1), 'us/op', students=data.params['students'])
+    member = repo.get_class(class_name)["students"][0]
+
+    def write_then_read():
+        repo.add_class_event(class_name, Event(title="Bench", date=next(dates)))
+        repo.agenda(member)
+
+    results.add(SUITE, 'agenda.full_after_class_write', per_op(write_then_read, max(number // 10, 1)),
+                'us/op', **data.params)
+
+
+def bench_models(results: Results, data: Dataset, number: int):
+    user_dict = data.repo.get_user(data.students[0])
+    results.add(SUITE, 'UserInDB(**dict)', per_op(lambda: UserInDB(**user_dict), number), 'us/op')
+    results.add(SUITE, 'UserInDB.model_validate', per_op(lambda: UserInDB.model_validate(user_dict), number), 'us/op')
+    raw = {'title': 'Examen', 'date': '2025-03-14T08:00:00', 'priority': 'P1'}
+    results.add(SUITE, 'Event.model_validate', per_op(lambda: Event.model_validate(raw), number), 'us/op')
+    events = data.repo.agenda(data.students[0])
+    adapter = TypeAdapter(list[Event])
+    results.add(SUITE, 'events.dump_json', per_op(lambda: adapter.dump_json(events), max(number // 10, 1)),
+                'us/op', events=len(events))
+
+
+def run(results: Results, quick: bool = False):
+    data = Dataset(classes=3, students=30, events=200 if quick else 2_000, private_events=50)
+    number = 200 if quick else 2_000
+    bench_filters(results, data, number)
+    bench_mutations(results, data, number)
+    bench_models(results, data, number)
+
+
+if __name__ == "__main__":
+    import sys
+    from benchmarks.run_suite import main
+    main(sys.argv[1:] + ['--only', SUITE])
@@ -0,0 +1,120 @@
+# benchmarks/bench_publish.py
+"""Débit de publication (pool direct, outbox, notifications) et regroupement
+des notifications sur un broker simulé.
+
+Usage : python -m benchmarks.bench_publish [--quick] [--output results.json]
+"""
+import time
+from datetime import datetime
+
+from benchmarks.amqp_stub import StubBroker
+from benchmarks.harness import HIGHER, Results, per_op
+from src.coalescer import Coalescer
+from src.models import Event, PriorityLevel
+from src.notification_manager import NotificationManager
+from src.outbox import Outbox
+from src.rabbitmq_pool import RabbitMQPool
+from src.wire_format import EventMessage, encode
+
+SUITE = 'publish'
+CONFIRM_DELAYS = (0.0, 0.0002)  # broker instantané, puis 0,2 ms par accusé
+
+
+def sample_message(i: int) -> EventMessage:
+    return EventMessage('created', f"Examen chapitre {i}", datetime(2025, 3, 14, 8, 0),
+                        PriorityLevel.P1, class_name='M321', event_id=f"{i:026d}", author='JerMac')
+
+
+def stub_pool(broker: StubBroker) -> RabbitMQPool:
+    return broker.attach(RabbitMQPool(host='stub'))
+
+
+def bench_direct(results: Results, n: int):
+    """pool.publish : un aller-retour par message, sans confirmation"""
+    broker = StubBroker()
+    pool = stub_pool(broker)
+    body, _ = encode(sample_message(0))
+    start = time.perf_counter()
+    for _ in range(n):
+        pool.publish('bench', body)
+    elapsed = time.perf_counter() - start
+    results.add(SUITE, 'pool.publish', n / elapsed, 'msg/s', HIGHER, messages=n)
+    pool.close()
+
+
+def bench_outbox(results: Results, n: int, confirm_delay: float):
+    """Dépôt dans l'outbox puis publication par lots confirmés"""
+    broker = StubBroker(confirm_delay=confirm_delay)
+    outbox = Outbox(stub_pool(broker), maxsize=n + 1)
+    bodies = [encode(sample_message(i)) for i in range(n)]
+    start = time.perf_counter()
+    for body, content_type in bodies:
+        outbox.put('bench', body, content_type=content_type)
+    enqueued = time.perf_counter() - start
+    broker.wait_for(n)
+    elapsed = time.perf_counter() - start
+    outbox.close()
+    params = {'messages': n, 'confirm_delay_ms': confirm_delay * 1000}
+    results.add(SUITE, 'outbox.put', enqueued / n * 1e6, 'us/op', **params)
+    results.add(SUITE, 'outbox.throughput', n / elapsed, 'msg/s', HIGHER, **params)
+
+
+def bench_notifications(results: Results, n: int):
+    """Coût côté handler d'une notification : encodage + dépôt"""
+    broker = StubBroker()
+    outbox = Outbox(stub_pool(broker), maxsize=n * 10 + 1)
+    manager = NotificationManager(Coalescer(outbox, window=0))
+    event = Event(title="Examen M321", date=datetime(2025, 3, 14, 8, 0), priority=PriorityLevel.P1,
+                  id="01J0000000000000000000000")
+    results.add(SUITE, 'notification.publish',
+                per_op(lambda: manager.publish_notification(event, 'M321', 'JerMac'), n), 'us/op')
+    outbox.close()
+
+
+def teacher_session(classes: int, assignments: int, updates: int):
+    """Rafale de changements d'enseignants : création de `assignments` devoirs
+    par classe, `updates` modifications de chacun, suppression d'un sur cinq"""
+    for c in range(classes):
+        routing_key = f'class.C{c:03d}'
+        for a in range(assignments):
+            message = sample_message(c * assignments + a)._replace(class_name=f'C{c:03d}')
+            yield routing_key, message
+            for u in range(updates):
+                yield routing_key, message._replace(action='updated', title=f"{message.title} v{u + 2}")
+            if a % 5 == 4:
+                yield routing_key, message._replace(action='deleted')
+
+
+def bench_coalescing(results: Results, classes: int):
+    """Messages publiés et coût côté handler, sans puis avec regroupement"""
+    changes = list(teacher_session(classes, assignments=10, updates=3))
+    for window in (0.0, 0.05):
+        broker = StubBroker()
+        outbox = Outbox(stub_pool(broker), maxsize=len(changes) + 1)
+        coalescer = Coalescer(outbox, window=window)
+        start = time.perf_counter()
+        for routing_key, message in changes:
+            coalescer.put(routing_key, message, exchange='class_events')
+        put_time = time.perf_counter() - start
+        coalescer.close()
+        outbox.close()
+        params = {'changes': len(changes), 'window_ms': window * 1000}
+        results.add(SUITE, f'coalesce.put window={window * 1000:g}ms', put_time / len(changes) * 1e6, 'us/op',
+                    **params)
+        results.add(SUITE, f'coalesce.messages window={window * 1000:g}ms', broker.messages, 'msg', **params)
+        results.add(SUITE, f'coalesce.bytes window={window * 1000:g}ms', broker.bytes, 'B', **params)
+
+
+def run(results: Results, quick: bool = False):
+    n = 2_000 if quick else 20_000
+    bench_direct(results, n)
+    for delay in CONFIRM_DELAYS:
+        bench_outbox(results, n if not delay else n // 10, delay)
+    bench_notifications(results, n // 10)
+    bench_coalescing(results, classes=20 if quick else 200)
+
+
+if __name__ == "__main__":
+    import sys
+    from benchmarks.run_suite import main
+    main(sys.argv[1:] + ['--only', SUITE])
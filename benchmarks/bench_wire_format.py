@@ -0,0 +1,56 @@
+# benchmarks/bench_wire_format.py
+"""Compare les anciens messages texte aux formats binaire et JSON de wire_format.
+
+Usage : python -m benchmarks.bench_wire_format
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from src.models import PriorityLevel
+from src.wire_format import (EventMessage, decode_binary, decode_json, describe,
+                             encode_binary, encode_json)
+
+N = 50_000
+
+
+def make_messages(n: int):
+    rng = random.Random(42)
+    start = datetime(2024, 9, 1)
+    priorities = list(PriorityLevel)
+    return [
+        EventMessage(rng.choice(('created', 'updated', 'reminder')), f"Examen chapitre {i}",
+                     start + timedelta(minutes=rng.randrange(60 * 24 * 365)), rng.choice(priorities),
+                     class_name=rng.choice(('M321', 'CG', None)), author="Jeremy Maceiras")
+        for i in range(n)
+    ]
+
+
+def timed(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6  # µs par message
+
+
+def bench():
+    messages = make_messages(N)
+    # Ancien format : phrase française encodée en UTF-8 ; le consommateur
+    # ne peut qu'afficher le texte (pas de décodage en champs)
+    text_encode = lambda message: describe(message).encode()
+    formats = (
+        ("texte (actuel)", text_encode, lambda body: body.decode()),
+        ("binaire v1", encode_binary, decode_binary),
+        ("json v1", encode_json, decode_json),
+    )
+    print(f"--- {N} messages ---")
+    print(f"{'format':<16} {'octets/msg':>10} {'encodage µs':>12} {'décodage µs':>12}")
+    for name, encode, decode in formats:
+        bodies = [encode(message) for message in messages]
+        size = sum(map(len, bodies)) / N
+        t_encode, t_decode = timed(encode, messages), timed(decode, bodies)
+        print(f"{name:<16} {size:10.1f} {t_encode:12.2f} {t_decode:12.2f}")
+
+
+if __name__ == "__main__":
+    bench()
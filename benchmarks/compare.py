@@ -0,0 +1,53 @@
+# benchmarks/compare.py
+"""Compare deux fichiers de résultats de benchmarks.run_suite.
+
+Usage : python -m benchmarks.compare avant.json apres.json [--threshold 0.10]
+Code de sortie 1 si une mesure se dégrade de plus du seuil.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {(entry['suite'], entry['name']): entry for entry in data['results']}
+
+
+def change(before: dict, after: dict) -> float:
+    """Variation relative, positive si la mesure s'améliore"""
+    if not before['value']:
+        return 0.0
+    ratio = after['value'] / before['value']
+    return ratio - 1 if before['better'] == 'higher' else 1 - ratio
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.10, help="dégradation tolérée (0.10 = 10 %%)")
+    args = parser.parse_args(argv)
+
+    before, after = load(args.before), load(args.after)
+    regressions = 0
+    print(f"{'mesure':<56} {'avant':>12} {'après':>12} {'écart':>8}")
+    for key in sorted(before.keys() & after.keys()):
+        delta = change(before[key], after[key])
+        flag = ''
+        if delta < -args.threshold:
+            flag, regressions = '  RÉGRESSION', regressions + 1
+        elif delta > args.threshold:
+            flag = '  mieux'
+        unit = before[key]['unit']
+        print(f"{'/'.join(key):<56} {before[key]['value']:>12.3f} {after[key]['value']:>12.3f} "
+              f"{delta:>+8.1%} {unit}{flag}")
+    for key in sorted(before.keys() - after.keys()):
+        print(f"{'/'.join(key):<56} absente de {args.after}")
+    print(f"{regressions} régression(s) au-delà de {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
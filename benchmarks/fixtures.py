@@ -0,0 +1,72 @@
+# benchmarks/fixtures.py
+"""Jeu de données synthétique des benchmarks : C classes de N élèves,
+M événements par classe et P événements privés par élève (graine fixe)."""
+import random
+from datetime import datetime, timedelta
+
+from src.models import Event, PriorityLevel
+from src.repository import MemoryRepository
+
+PASSWORD = 'pwd-bench'
+START = datetime(2024, 9, 1)
+
+
+def make_user(username: str, role: str) -> dict:
+    return {
+        "username": username,
+        "full_name": f"Utilisateur {username}",
+        "email": f"{username.lower()}@edu.vs.ch",
+        "hashed_password": "fakehashed" + PASSWORD,
+        "disabled": False,
+        "role": role,
+    }
+
+
+def make_events(rng: random.Random, count: int, prefix: str):
+    priorities = list(PriorityLevel)
+    return [
+        Event(title=f"{prefix} {i}", date=START + timedelta(minutes=rng.randrange(60 * 24 * 300)),
+              priority=rng.choice(priorities))
+        for i in range(count)
+    ]
+
+
+class Dataset:
+    """Dépôt mémoire rempli, et les noms utiles aux scénarios"""
+
+    def __init__(self, classes: int = 5, students: int = 30, events: int = 50,
+                 private_events: int = 10, seed: int = 42):
+        rng = self.rng = random.Random(seed)
+        self.params = {'classes': classes, 'students': students, 'events': events,
+                       'private_events': private_events}
+        users, class_db = {}, {}
+        self.teachers, self.students, self.classes = [], [], []
+        for c in range(classes):
+            class_name, teacher = f"C{c:03d}", f"prof{c:03d}"
+            users[teacher] = make_user(teacher, "enseignant")
+            members = []
+            for s in range(students):
+                student = f"eleve{c:03d}-{s:03d}"
+                users[student] = make_user(student, "eleve")
+                members.append(student)
+            class_db[class_name] = {"teacher": teacher, "students": members}
+            self.teachers.append(teacher)
+            self.students.extend(members)
+            self.classes.append(class_name)
+
+        self.users_db = users
+        self.repo = MemoryRepository(users, class_db, {})
+        for class_name in self.classes:
+            self.repo.add_class_events(class_name, make_events(rng, events, f"Devoir {class_name}"))
+        for student in self.students:
+            self.repo.add_private_events(student, make_events(rng, private_events, "Révision"))
+
+    def teacher_of(self, class_name: str) -> str:
+        return self.repo.get_class(class_name)["teacher"]
+
+    def spare_students(self, count: int, prefix: str = "libre"):
+        """Élèves sans classe (inscriptions des scénarios de charge)"""
+        names = [f"{prefix}{i:05d}" for i in range(count)]
+        for name in names:
+            self.users_db[name] = make_user(name, "eleve")
+        return names
@@ -0,0 +1,76 @@
+# benchmarks/harness.py
+"""Outils communs de la suite : mesure, collecte et export JSON des résultats.
+
+Chaque résultat indique si une valeur plus basse (latence) ou plus haute
+(débit) est meilleure, pour que benchmarks.compare puisse repérer les
+régressions entre deux exécutions.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+LOWER, HIGHER = 'lower', 'higher'  # sens de "meilleur" pour une mesure
+
+
+class Results:
+    """Résultats d'une exécution : suite, nom, valeur, unité et paramètres"""
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, suite: str, name: str, value: float, unit: str, better: str = LOWER, **params):
+        entry = {'suite': suite, 'name': name, 'value': round(value, 4), 'unit': unit,
+                 'better': better, 'params': params}
+        self.entries.append(entry)
+        print(f"  {suite:<8} {name:<40} {value:>12.3f} {unit}")
+        return entry
+
+    def to_dict(self) -> dict:
+        return {'meta': environment(), 'results': self.entries}
+
+    def write(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        print(f"Résultats écrits dans {path}")
+
+
+def environment() -> dict:
+    """Contexte de la mesure (les comparaisons n'ont de sens qu'à contexte égal)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'argv': sys.argv[1:],
+    }
+
+
+def per_op(fn, number: int, repeat: int = 5) -> float:
+    """Meilleur temps par appel de fn() en µs (sur `repeat` séries de `number` appels)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+
+def percentile(samples, p: float) -> float:
+    """Percentile p (0-100) d'une liste de mesures"""
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[max(min(int(p), 99), 1) - 1]
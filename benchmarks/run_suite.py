@@ -0,0 +1,52 @@
+# benchmarks/run_suite.py
+"""Suite de benchmarks : micro-benchmarks, publication (broker simulé),
+charge de l'API en processus, chargement du jeu synthétique, mémoire
+occupée par les agendas et coût de l'authentification. Les résultats sont écrits en JSON pour être
+comparés d'une version à l'autre avec benchmarks.compare.
+
+Usage :
+    python -m benchmarks.run_suite [--quick] [--only micro,publish,api,dataset,memory,auth] [--output results.json]
+"""
+import argparse
+import os
+import time
+
+# Journal d'accès et notifications coupés : ils mesureraient la console
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('AUTH_SECRET', 'benchmarks')
+
+from benchmarks import bench_api, bench_auth, bench_dataset, bench_memory, bench_micro, bench_publish
+from benchmarks.harness import Results
+
+SUITES = {
+    bench_micro.SUITE: bench_micro.run,
+    bench_publish.SUITE: bench_publish.run,
+    bench_api.SUITE: bench_api.run,
+    bench_dataset.SUITE: bench_dataset.run,
+    bench_memory.SUITE: bench_memory.run,
+    bench_auth.SUITE: bench_auth.run,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="jeux de données et itérations réduits")
+    parser.add_argument('--only', default=','.join(SUITES), help="suites à lancer (séparées par des virgules)")
+    parser.add_argument('--output', help="fichier JSON des résultats")
+    args = parser.parse_args(argv)
+
+    results = Results()
+    for name in args.only.split(','):
+        if name not in SUITES:
+            parser.error(f"suite inconnue : {name} (disponibles : {', '.join(SUITES)})")
+        print(f"--- {name} ---")
+        start = time.perf_counter()
+        SUITES[name](results, quick=args.quick)
+        print(f"    ({time.perf_counter() - start:.1f} s)")
+    if args.output:
+        results.write(args.output)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/stress_notifications.py
+"""Test de charge des notifications : des threads publient en parallèle via
+NotificationManager (regroupement désactivé, outbox, pool) sur un broker
+simulé, qui échoue un envoi sur FAIL_EVERY pour forcer reconnexions et
+nouvelles tentatives. Aucune notification ne doit être perdue.
+
+Usage : python -m benchmarks.stress_notifications [threads] [notifications par thread]
+Code de sortie 1 si le broker n'a pas reçu exactement threads x N messages.
+"""
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pika
+
+from benchmarks.amqp_stub import StubBroker, StubChannel
+from src.coalescer import Coalescer
+from src.logging_setup import set_level
+from src.models import Event, PriorityLevel
+from src.notification_manager import NotificationManager
+from src.outbox import Outbox
+from src.rabbitmq_pool import RabbitMQPool
+
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+PER_THREAD = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+FAIL_EVERY = 997  # un envoi sur FAIL_EVERY coupe la connexion
+
+
+class FlakyBroker(StubBroker):
+    """Broker simulé dont les connexions tombent de temps en temps"""
+
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+        self.failures = 0
+
+    def should_fail(self) -> bool:
+        with self._condition:
+            self.attempts += 1
+            if self.attempts % FAIL_EVERY:
+                return False
+            self.failures += 1
+            return True
+
+    def connect(self):
+        entry = super().connect()
+        entry.channel = entry.connection._channel = FlakyChannel(self)
+        return entry
+
+
+class FlakyChannel(StubChannel):
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if self.broker.should_fail():
+            self.is_closed = True
+            raise pika.exceptions.AMQPConnectionError("Connexion perdue (simulée)")
+        super().basic_publish(exchange, routing_key, body, properties, mandatory)
+
+
+def main() -> bool:
+    set_level('ERROR')  # les échecs simulés sont journalisés en warning
+    broker = FlakyBroker()
+    pool = broker.attach(RabbitMQPool(host='stub', max_size=2))
+    # Taille par défaut : les producteurs attendent une place (politique block
+    # hors boucle asyncio) pendant que l'outbox réessaie
+    outbox = Outbox(pool, put_timeout=30.0, retry_delay=0.05)
+    manager = NotificationManager(Coalescer(outbox, window=0))
+    total = THREADS * PER_THREAD
+    date = datetime.now() + timedelta(days=1)
+
+    def produce(t: int):
+        for i in range(PER_THREAD):
+            event = Event(title=f"Rappel {t}-{i}", date=date, priority=PriorityLevel.P2, id=f"{t:04d}{i:022d}")
+            manager.publish_notification(event, class_name=f"C{t:03d}")
+
+    print(f"--- {THREADS} threads x {PER_THREAD} notifications ---")
+    start = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(t,)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    enqueued = time.perf_counter() - start
+    broker.wait_for(total, timeout=120)
+    elapsed = time.perf_counter() - start
+    outbox.close()
+    pool.close()
+
+    print(f"déposées : {total} en {enqueued:.2f} s")
+    print(f"reçues   : {broker.messages} en {elapsed:.2f} s ({broker.messages / elapsed:.0f} msg/s)")
+    print(f"échecs simulés : {broker.failures}, connexions ouvertes : {broker.connections}")
+    return broker.messages == total
+
+
+if __name__ == "__main__":
+    ok = main()
+    print("OK" if ok else "ÉCHEC : notifications perdues ou dupliquées")
+    sys.exit(0 if ok else 1)
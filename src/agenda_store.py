@@ -0,0 +1,222 @@
+# src/agenda_store.py
+import sys
+import weakref
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from heapq import merge
+from itertools import count
+from typing import AbstractSet, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from src.event_ids import new_event_id
+from src.models import Event, PriorityLevel
+
+
+# Clés internes uniques pour tout le processus : (date, clé) ordonne
+# sans ambiguïté des événements venant de plusieurs agendas
+_keys = count()
+
+
+def date_key(date: datetime) -> datetime:
+    """Clé de tri des dates, sans fuseau (comme les filtres de l'API) : une date
+    avec fuseau est ramenée en UTC, une date naïve est prise telle quelle"""
+    if date.tzinfo is None:
+        return date
+    return date.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# ---- Construction des modèles à la lecture ----
+#
+# Chaque lecture construit un Event par événement retourné. Event.model_construct
+# coûte ~4,7 µs (plus qu'Event(), 4,2 µs) ; remplir directement les attributs
+# du modèle coûte ~1,5 µs, et les lectures filtrées de la suite `micro` sont
+# ~2x plus rapides. Ce raccourci dépend de la disposition interne des modèles
+# pydantic : il n'est retenu que si, à l'import, il donne exactement le même
+# modèle que model_construct (sinon model_construct est utilisé).
+
+_new, _set = object.__new__, object.__setattr__
+_EVENT_FIELDS = frozenset(Event.model_fields)
+_MODEL_SLOTS = ('__dict__', '__pydantic_fields_set__', '__pydantic_extra__', '__pydantic_private__')
+
+
+def _fast_event(title: str, date: datetime, priority: PriorityLevel, id: Optional[str]) -> Event:
+    event = _new(Event)
+    _set(event, '__dict__', {'title': title, 'date': date, 'priority': priority, 'id': id})
+    _set(event, '__pydantic_fields_set__', set(_EVENT_FIELDS))  # propre à chaque instance
+    _set(event, '__pydantic_extra__', None)
+    _set(event, '__pydantic_private__', None)
+    return event
+
+
+def _fast_event_matches() -> bool:
+    """Vrai si _fast_event équivaut à Event.model_construct avec cette version de pydantic"""
+    values = {'title': 't', 'date': datetime(2000, 1, 1), 'priority': PriorityLevel.P1, 'id': 'x'}
+    try:
+        fast, reference = _fast_event(**values), Event.model_construct(**values)
+        return (tuple(BaseModel.__slots__) == _MODEL_SLOTS
+                and all(getattr(fast, slot) == getattr(reference, slot) for slot in _MODEL_SLOTS)
+                and fast.model_copy(update={'title': 'u'}).title == 'u')
+    except Exception:
+        return False
+
+
+_build_event = _fast_event if _fast_event_matches() else Event.model_construct
+
+
+class StoredEvent:
+    """Événement tel que conservé en mémoire : objet à slots, titre interné,
+    date de tri partagée avec la date quand elle est sans fuseau. Les modèles
+    pydantic ne sont construits qu'à la lecture (to_event) ; une référence
+    faible permet de resservir le même modèle tant qu'une vue ou un cache le
+    garde en vie."""
+
+    __slots__ = ('title', 'date', 'when', 'priority', 'id', '_model')
+
+    def __init__(self, title: str, date: datetime, priority: PriorityLevel = PriorityLevel.P2,
+                 id: Optional[str] = None):
+        self.set(title, date, priority)
+        self.id = id
+
+    def set(self, title: str, date: datetime, priority: PriorityLevel):
+        self._model = None
+        self.title = sys.intern(title)
+        self.date = date
+        self.when = date if date.tzinfo is None else date_key(date)
+        self.priority = priority
+
+    @classmethod
+    def from_event(cls, event) -> "StoredEvent":
+        return event if isinstance(event, cls) else cls(event.title, event.date, event.priority, event.id)
+
+    def to_event(self) -> Event:
+        if self._model is not None:
+            event = self._model()
+            if event is not None:
+                return event
+        # Valeurs validées à l'entrée : construction sans revalidation
+        event = _build_event(title=self.title, date=self.date, priority=self.priority, id=self.id)
+        self._model = weakref.ref(event)
+        return event
+
+
+class AgendaStore:
+    """Agenda indexé : id -> clé, titre -> clés, dates triées, dates triées par priorité.
+
+    Chaque événement reçoit une clé interne entière, unique dans le
+    processus, et garde son identifiant public (ULID, attribué s'il
+    manque). Les événements sont conservés sous forme de StoredEvent ;
+    les lectures retournent des modèles Event construits à la demande,
+    les écritures passent par add / update / remove. `version` augmente à
+    chaque écriture et sert à invalider les vues et caches dérivés.
+    """
+
+    def __init__(self, events=()):
+        self._events: Dict[int, StoredEvent] = {}  # clé -> événement (ordre d'insertion)
+        self._by_id: Dict[str, int] = {}           # identifiant public -> clé
+        self._by_title: Dict[str, List[int]] = {}  # titre -> clés (ordre d'insertion)
+        self._by_date = []                         # liste triée de (date, clé)
+        self._by_priority: Dict[PriorityLevel, list] = {priority: [] for priority in PriorityLevel}  # idem, par priorité
+        self.version = 0
+        for event in events:
+            self.add(event)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self) -> Iterator[Event]:
+        return (record.to_event() for record in self._events.values())
+
+    def get(self, key: int) -> Optional[Event]:
+        record = self._events.get(key)
+        return record.to_event() if record is not None else None
+
+    # ---- Index ----
+
+    def _index(self, key: int, record: StoredEvent):
+        self._by_title.setdefault(record.title, []).append(key)
+        sort_key = (record.when, key)  # tuple partagé par les deux index triés
+        insort(self._by_date, sort_key)
+        insort(self._by_priority[record.priority], sort_key)
+
+    def _unindex(self, key: int, record: StoredEvent):
+        same_title = self._by_title[record.title]
+        same_title.remove(key)
+        if not same_title:
+            del self._by_title[record.title]
+        sort_key = (record.when, key)
+        del self._by_date[bisect_left(self._by_date, sort_key)]
+        same_priority = self._by_priority[record.priority]
+        del same_priority[bisect_left(same_priority, sort_key)]
+
+    # ---- Écritures ----
+
+    def add(self, event) -> int:
+        """Ajoute un événement (Event, ou StoredEvent repris tel quel) et retourne sa clé"""
+        key = next(_keys)
+        if event.id is None:
+            event.id = new_event_id()
+        record = StoredEvent.from_event(event)
+        self._events[key] = record
+        self._by_id[record.id] = key
+        self._index(key, record)
+        self.version += 1
+        return key
+
+    def update(self, key: int, title: str, date: datetime, priority: PriorityLevel) -> Event:
+        """Modifie un événement et met ses index à jour"""
+        record = self._events[key]
+        self._unindex(key, record)
+        record.set(title, date, priority)
+        self._index(key, record)
+        self.version += 1
+        return record.to_event()
+
+    def remove(self, key: int) -> Event:
+        """Supprime un événement (O(1) hors index des dates)"""
+        record = self._events.pop(key)
+        self._unindex(key, record)
+        self.version += 1
+        del self._by_id[record.id]
+        return record.to_event()
+
+    # ---- Lectures ----
+
+    def find_by_id(self, event_id: str) -> Optional[int]:
+        """Clé de l'événement portant cet identifiant (O(1))"""
+        return self._by_id.get(event_id)
+
+    def find_by_title(self, title: str) -> Optional[int]:
+        """Clé du premier événement portant ce titre"""
+        keys = self._by_title.get(title)
+        return keys[0] if keys else None
+
+    def iter_sorted(self, after: Optional[Tuple[datetime, int]] = None,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    priorities: Optional[AbstractSet[PriorityLevel]] = None):
+        """Itère les ((date, clé), événement) triés, strictement après `after`,
+        dans la plage [start, end[ et parmi les priorités demandées"""
+        events = self._events
+        if priorities is not None and start is None and end is None:
+            # Sans plage de dates, les index par priorité sont plus sélectifs :
+            # reprise par bisect après `after`, fusion des priorités demandées
+            slices = []
+            for priority in priorities:
+                entries = self._by_priority[priority]
+                lo = bisect_right(entries, after) if after is not None else 0
+                slices.append(map(entries.__getitem__, range(lo, len(entries))))
+            for sort_key in (slices[0] if len(slices) == 1 else merge(*slices)):
+                yield sort_key, events[sort_key[1]].to_event()
+            return
+
+        lo = bisect_right(self._by_date, after) if after is not None else 0
+        if start is not None:
+            lo = max(lo, bisect_left(self._by_date, (date_key(start), -1)))
+        hi = len(self._by_date)
+        if end is not None:
+            hi = bisect_left(self._by_date, (date_key(end), -1))
+        for i in range(lo, hi):
+            sort_key = self._by_date[i]
+            record = events[sort_key[1]]
+            if priorities is None or record.priority in priorities:
+                yield sort_key, record.to_event()
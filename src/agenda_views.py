@@ -0,0 +1,110 @@
+# src/agenda_views.py
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from src.agenda_store import AgendaStore
+from src.event_query import EventQuery
+from src.models import Event
+
+# Requête vide : tout l'agenda, dans l'ordre (date, clé)
+_ALL = EventQuery()
+
+# Vues matérialisées conservées au plus (les élèves lus le plus récemment)
+MAX_VIEWS = int(os.getenv('AGENDA_VIEWS_MAX', '1000'))
+
+
+class AgendaViews:
+    """Agendas vus par les utilisateurs (fan-out à la lecture).
+
+    Un événement de classe est stocké une seule fois, dans l'AgendaStore de
+    sa classe. L'agenda d'un élève est la jointure, au moment de la lecture,
+    de son agenda privé et des événements de ses classes. Les vues matérialisées
+    des `max_views` derniers élèves lus sont conservées (LRU) : une vue est
+    invalidée dès que la version de son agenda privé ou de l'une de ses
+    classes change.
+
+    Un `loader` optionnel (voir src.synthetic_db) fournit le contenu initial
+    d'un agenda absent, généré seulement à sa première lecture.
+    """
+
+    def __init__(self, users_db: dict, classes_db: dict, agendas_db: dict,
+                 materialize: bool = True, loader=None, max_views: int = MAX_VIEWS):
+        self.users_db = users_db
+        self.classes_db = classes_db
+        self.agendas_db = agendas_db
+        self.materialize = materialize and max_views > 0
+        self.max_views = max_views
+        self.loader = loader
+        self._memberships: Optional[Dict[str, List[str]]] = None  # élève -> classes
+        self._views = OrderedDict()  # élève -> (signature des versions, événements triés), LRU
+
+    # ---- Stockage ----
+
+    def private_agenda(self, username: str) -> AgendaStore:
+        """Récupère (ou crée) l'agenda privé indexé d'un utilisateur"""
+        agenda = self.agendas_db.get(username)
+        if agenda is None:
+            initial = self.loader.generate_private_events(username) if self.loader else ()
+            agenda = self.agendas_db[username] = AgendaStore(initial)
+        return agenda
+
+    def class_events(self, class_name: str) -> AgendaStore:
+        """Événements d'une classe, stockés une seule fois"""
+        class_info = self.classes_db[class_name]
+        events = class_info.get("events")
+        if events is None:
+            initial = self.loader.generate_class_events(class_name) if self.loader else ()
+            events = class_info["events"] = AgendaStore(initial)
+        return events
+
+    # ---- Appartenance aux classes ----
+
+    def classes_of(self, username: str) -> List[str]:
+        """Classes dont l'utilisateur est élève (index inverse des listes d'élèves)"""
+        if self._memberships is None:
+            memberships = {}
+            for class_name, class_info in self.classes_db.items():
+                for student in class_info["students"]:
+                    memberships.setdefault(student, []).append(class_name)
+            self._memberships = memberships
+        return self._memberships.get(username, [])
+
+    def roster_changed(self):
+        """À appeler quand la liste des élèves d'une classe change"""
+        self._memberships = None
+        self._views.clear()
+
+    # ---- Lecture ----
+
+    def sources(self, username: str, classes=None) -> List[AgendaStore]:
+        """Agendas à joindre : privé + classes de l'élève (ou seulement
+        les classes demandées parmi les siennes)"""
+        if classes is None:
+            return [self.private_agenda(username)] + [
+                self.class_events(class_name) for class_name in self.classes_of(username)
+            ]
+        return [self.class_events(class_name) for class_name in self.classes_of(username)
+                if class_name in classes]
+
+    def agenda(self, username: str) -> List[Event]:
+        """Agenda complet d'un utilisateur (privé + classes), trié par date"""
+        sources = self.sources(username)
+        if not self.materialize:
+            return _ALL.run(sources)[0]
+
+        signature = tuple((id(source), source.version) for source in sources)
+        cached = self._views.get(username)
+        if cached is not None and cached[0] == signature:
+            self._views.move_to_end(username)
+            return cached[1]
+        events = _ALL.run(sources)[0]
+        self._views[username] = (signature, events)
+        self._views.move_to_end(username)
+        while len(self._views) > self.max_views:
+            self._views.popitem(last=False)
+        return events
+
+    def query(self, username: str, query: EventQuery, after=None, limit: Optional[int] = None):
+        """Exécute une requête sur l'agenda complet ; retourne (événements, curseur)"""
+        return query.run(self.sources(username, query.classes), after, limit)
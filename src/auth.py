@@ -0,0 +1,180 @@
+# src/auth.py
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from functools import lru_cache
+from typing import Optional
+
+from src.logging_setup import get_logger
+from src.metrics import password_hash_duration, token_verifications
+
+logger = get_logger('auth')
+
+# ---- Mots de passe ----
+#
+# Format stocké : pbkdf2_sha256$<itérations>$<sel base64>$<hachage base64>.
+# Les anciennes fiches ("fakehashed" + mot de passe) restent acceptées et
+# sont re-hachées à la connexion suivante (needs_rehash). Le calcul est
+# volontairement coûteux : les appelants asynchrones le passent au thread pool.
+
+PASSWORD_ITERATIONS = int(os.getenv('AUTH_PASSWORD_ITERATIONS', '200000'))
+_ALGORITHM = 'pbkdf2_sha256'
+_LEGACY_PREFIX = 'fakehashed'
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+
+
+def hash_password(password: str, iterations: int = None) -> str:
+    """Hachage PBKDF2-SHA256 salé d'un mot de passe"""
+    iterations = iterations or PASSWORD_ITERATIONS
+    salt = secrets.token_bytes(16)
+    with password_hash_duration.labels(operation='hash').time():
+        digest = _pbkdf2(password, salt, iterations)
+    return f"{_ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Compare un mot de passe à son hachage stocké (temps constant)"""
+    if hashed.startswith(_LEGACY_PREFIX):
+        return hmac.compare_digest((_LEGACY_PREFIX + password).encode(), hashed.encode())
+    try:
+        algorithm, iterations, salt, digest = hashed.split('$')
+        if algorithm != _ALGORITHM:
+            return False
+        with password_hash_duration.labels(operation='verify').time():
+            computed = _pbkdf2(password, _unb64(salt), int(iterations))
+        return hmac.compare_digest(computed, _unb64(digest))
+    except ValueError:
+        return False
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Vrai pour une fiche ancienne ou hachée avec moins d'itérations qu'aujourd'hui"""
+    parts = hashed.split('$')
+    return len(parts) != 4 or parts[0] != _ALGORITHM or int(parts[1]) < PASSWORD_ITERATIONS
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    return hash_password(secrets.token_hex(8))
+
+
+def verify_unknown_user(password: str) -> bool:
+    """Vérification factice pour un utilisateur inconnu : la réponse prend le
+    même temps que pour un mot de passe incorrect (pas d'énumération des comptes)"""
+    verify_password(password, _dummy_hash())
+    return False
+
+
+# ---- Tokens ----
+#
+# JWT HS256 (en-tête fixe, alg imposé) : la signature et l'expiration se
+# vérifient sans accès à la base. AUTH_SECRET doit être partagé par tous les
+# workers ; sans lui, un secret aléatoire est tiré au démarrage et les tokens
+# ne survivent ni au redémarrage ni au passage d'un worker à l'autre.
+
+TOKEN_TTL = int(os.getenv('AUTH_TOKEN_TTL', '28800'))  # 8 heures
+FEED_TOKEN_TTL = int(os.getenv('AUTH_FEED_TOKEN_TTL', str(365 * 86400)))  # 1 an
+FEED_SCOPE = 'feed'  # tokens d'abonnement .ics : lecture des flux seulement
+_HEADER = _b64(json.dumps({'alg': 'HS256', 'typ': 'JWT'}, separators=(',', ':')).encode())
+
+_secret = os.getenv('AUTH_SECRET', '').encode()
+if not _secret:
+    _secret = secrets.token_bytes(32)
+    logger.warning("AUTH_SECRET non défini : secret de signature aléatoire, propre à ce processus")
+
+
+class InvalidToken(ValueError):
+    """Token mal formé, mal signé ou expiré"""
+
+
+# État HMAC initialisé une fois avec la clé, copié pour chaque signature
+_mac = hmac.new(_secret, digestmod=hashlib.sha256)
+
+
+def _sign(signing_input: str) -> str:
+    mac = _mac.copy()
+    mac.update(signing_input.encode())
+    return _b64(mac.digest())
+
+
+def create_token(username: str, ttl: int = None, now: float = None, **extra) -> str:
+    """Token signé pour `username`, valable `ttl` secondes (revendications
+    `extra` en plus)"""
+    issued = int(now if now is not None else time.time())
+    claims = {'sub': username, 'iat': issued, 'exp': issued + (ttl or TOKEN_TTL), **extra}
+    signing_input = f"{_HEADER}.{_b64(json.dumps(claims, separators=(',', ':')).encode())}"
+    return f"{signing_input}.{_sign(signing_input)}"
+
+
+def decode_token(token: str, now: float = None) -> dict:
+    """Revendications d'un token valide ; lève InvalidToken sinon"""
+    try:
+        header, payload, signature = token.split('.')
+    except ValueError:
+        token_verifications.labels(result='invalid').inc()
+        raise InvalidToken("Token mal formé") from None
+    if header != _HEADER or not hmac.compare_digest(signature.encode(), _sign(f"{header}.{payload}").encode()):
+        token_verifications.labels(result='invalid').inc()
+        raise InvalidToken("Signature invalide")
+    try:
+        claims = json.loads(_unb64(payload))
+        expires = float(claims['exp'])
+        if not isinstance(claims['sub'], str):
+            raise TypeError(claims['sub'])
+    except (ValueError, KeyError, TypeError):
+        token_verifications.labels(result='invalid').inc()
+        raise InvalidToken("Revendications invalides") from None
+    if expires <= (now if now is not None else time.time()):
+        token_verifications.labels(result='expired').inc()
+        raise InvalidToken("Token expiré")
+    token_verifications.labels(result='valid').inc()
+    return claims
+
+
+def token_subject(token: str) -> Optional[tuple]:
+    """(utilisateur, expiration) d'un token d'accès valide, ou None (un token
+    d'abonnement ne donne pas accès à l'API)"""
+    try:
+        claims = decode_token(token)
+    except InvalidToken:
+        return None
+    if 'scope' in claims:
+        return None
+    return claims['sub'], claims['exp']
+
+
+# ---- Tokens d'abonnement (.ics) ----
+#
+# Les applications de calendrier mettent le token dans l'URL, qui finit dans
+# les journaux d'accès : ces tokens-là ne servent qu'à lire les flux, et sont
+# révoqués d'un coup en changeant la génération de l'utilisateur.
+
+def create_feed_token(username: str, generation: int) -> str:
+    """Token d'abonnement de `username` pour sa génération actuelle"""
+    return create_token(username, ttl=FEED_TOKEN_TTL, scope=FEED_SCOPE, gen=generation)
+
+
+def feed_token_subject(token: str) -> Optional[tuple]:
+    """(utilisateur, génération) d'un token d'abonnement valide, ou None"""
+    try:
+        claims = decode_token(token)
+    except InvalidToken:
+        return None
+    if claims.get('scope') != FEED_SCOPE or not isinstance(claims.get('gen'), int):
+        return None
+    return claims['sub'], claims['gen']
@@ -0,0 +1,267 @@
+# src/bulk_io.py
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import re
+from datetime import datetime, timezone
+from typing import List
+
+from pydantic import ValidationError
+
+from src.models import Event, PriorityLevel
+from src.pagination import STREAM_PAGE_SIZE
+
+# Formats acceptés à l'import et produits à l'export
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'ics': 'text/calendar; charset=utf-8',
+}
+_FORMATS_BY_MEDIA_TYPE = {media_type.split(';')[0]: fmt for fmt, media_type in MEDIA_TYPES.items()}
+CSV_COLUMNS = ('title', 'date', 'priority')
+
+# Priorités iCalendar (RFC 5545) : 1-4 haute, 5 moyenne, 6-9 basse, 0 indéfinie
+_ICS_PRIORITIES = {PriorityLevel.P1: 1, PriorityLevel.P2: 5, PriorityLevel.P3: 9}
+
+
+class BulkFormatError(ValueError):
+    """Import invalide ; `errors` liste les problèmes (ligne ou élément concerné)"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def format_for(content_type: str) -> str:
+    """Format d'import d'après le Content-Type (json par défaut)"""
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    return _FORMATS_BY_MEDIA_TYPE.get(media_type, 'json')
+
+
+# ---- Import ----
+
+def parse_events(body: bytes, fmt: str, max_events: int = None) -> List[Event]:
+    """Décode et valide tous les événements en une passe.
+
+    Toutes les erreurs sont collectées : l'import est accepté en entier ou
+    refusé en entier (BulkFormatError).
+    """
+    try:
+        text = body.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise BulkFormatError(["Le contenu doit être encodé en UTF-8"])
+    if fmt == 'json':
+        try:
+            records = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise BulkFormatError([f"JSON invalide : {e}"])
+        if not isinstance(records, list):
+            raise BulkFormatError(["Un tableau JSON d'événements est attendu"])
+        records = list(enumerate(records, 1))
+    elif fmt == 'ndjson':
+        records = _ndjson_records(text)
+    elif fmt == 'csv':
+        records = _csv_records(text)
+    elif fmt == 'ics':
+        records = _ics_records(text)
+    else:
+        raise BulkFormatError([f"Format inconnu : {fmt}"])
+
+    if max_events is not None and len(records) > max_events:
+        raise BulkFormatError([f"Trop d'événements ({len(records)}, maximum {max_events})"])
+
+    events, errors = [], []
+    for position, record in records:
+        try:
+            events.append(Event.model_validate(record))
+        except ValidationError as e:
+            details = ", ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            errors.append(f"#{position}: {details}")
+    if errors:
+        raise BulkFormatError(errors)
+    return events
+
+
+def _ndjson_records(text: str):
+    records, errors = [], []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            records.append((line_number, json.loads(line)))
+        except json.JSONDecodeError as e:
+            errors.append(f"#{line_number}: JSON invalide ({e.msg})")
+    if errors:
+        raise BulkFormatError(errors)
+    return records
+
+
+def _csv_records(text: str):
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [column for column in ('title', 'date') if column not in (reader.fieldnames or ())]
+    if missing:
+        raise BulkFormatError([f"Colonnes manquantes : {', '.join(missing)}"])
+    records = []
+    for row in reader:
+        record = {column: row[column] for column in CSV_COLUMNS if row.get(column)}
+        records.append((reader.line_num, record))
+    return records
+
+
+_ICS_ESCAPES = re.compile(r'\\([\\;,nN])')
+
+
+def _ics_unescape(value: str) -> str:
+    return _ICS_ESCAPES.sub(lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value)
+
+
+def _ics_date(value: str, params: str):
+    """DTSTART : AAAAMMJJ, AAAAMMJJTHHMMSS (heure locale) ou ...Z (UTC)"""
+    if len(value) == 8 or ('VALUE=DATE' in params.upper() and 'DATE-TIME' not in params.upper()):
+        return datetime.strptime(value, '%Y%m%d')
+    if value.endswith('Z'):
+        return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+    return datetime.strptime(value, '%Y%m%dT%H%M%S')
+
+
+def _ics_priority(value: str):
+    level = int(value)
+    if 1 <= level <= 4:
+        return PriorityLevel.P1
+    if 6 <= level <= 9:
+        return PriorityLevel.P3
+    return PriorityLevel.P2
+
+
+def _ics_records(text: str):
+    # Déplie les lignes longues (continuation commençant par une espace)
+    lines = []
+    for line in text.splitlines():
+        if line[:1] in (' ', '\t') and lines:
+            lines[-1] += line[1:]
+        else:
+            lines.append(line)
+
+    records, errors = [], []
+    current = None
+    for line_number, line in enumerate(lines, 1):
+        name_params, _, value = line.partition(':')
+        name, _, params = name_params.partition(';')
+        name = name.upper()
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            current = (line_number, {})
+        elif name == 'END' and value.upper() == 'VEVENT' and current is not None:
+            records.append(current)
+            current = None
+        elif current is not None:
+            try:
+                if name == 'SUMMARY':
+                    current[1]['title'] = _ics_unescape(value)
+                elif name == 'DTSTART':
+                    current[1]['date'] = _ics_date(value, params)
+                elif name == 'PRIORITY':
+                    current[1]['priority'] = _ics_priority(value)
+            except ValueError:
+                errors.append(f"#{line_number}: valeur {name} invalide ({value})")
+    if errors:
+        raise BulkFormatError(errors)
+    return records
+
+
+# ---- Export ----
+
+def _ics_escape(value: str) -> str:
+    return (value.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def _ics_fold(line: str) -> str:
+    """Coupe les lignes à 75 octets (RFC 5545)"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, current = [], ''
+    for char in line:
+        limit = 75 if not parts else 74
+        if len((current + char).encode()) > limit:
+            parts.append(current)
+            current = char
+        else:
+            current += char
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _ics_datetime(date: datetime) -> str:
+    if date.tzinfo is not None:
+        return date.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    return date.strftime('%Y%m%dT%H%M%S')  # heure locale "flottante"
+
+
+def ics_event(event: Event, stamp: str) -> str:
+    """Bloc VEVENT d'un événement (UID = identifiant de l'événement)"""
+    uid = event.id or hashlib.sha1(f"{event.title}|{event.date.isoformat()}".encode()).hexdigest()
+    return ''.join(_ics_fold(line) for line in (
+        'BEGIN:VEVENT',
+        f'UID:{uid}@agenda-scolaire',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART:{_ics_datetime(event.date)}',
+        f'SUMMARY:{_ics_escape(event.title)}',
+        f'PRIORITY:{_ICS_PRIORITIES[event.priority]}',
+        'END:VEVENT',
+    ))
+
+
+ICS_HEADER = 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//AgendaScolaire//FR\r\nCALSCALE:GREGORIAN\r\n'
+ICS_FOOTER = 'END:VCALENDAR\r\n'
+
+
+def ics_calendar(events) -> bytes:
+    """Calendrier iCalendar complet (flux .ics)"""
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    return (ICS_HEADER + ''.join(ics_event(event, stamp) for event in events) + ICS_FOOTER).encode()
+
+
+def _csv_rows(events) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for event in events:
+        writer.writerow((event.title, event.date.isoformat(), event.priority.value))
+    return buffer.getvalue()
+
+
+async def stream_events(fetch_page, fmt: str):
+    """Exporte un agenda page par page dans le format demandé (mémoire bornée)"""
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    if fmt == 'json':
+        yield b'['
+    elif fmt == 'csv':
+        yield (','.join(CSV_COLUMNS) + '\n').encode()
+    elif fmt == 'ics':
+        yield ICS_HEADER.encode()
+
+    after, first = None, True
+    while True:
+        events, after = fetch_page(after, STREAM_PAGE_SIZE)
+        if events:
+            if fmt == 'json':
+                chunk = b','.join(event.model_dump_json().encode() for event in events)
+                yield chunk if first else b',' + chunk
+            elif fmt == 'ndjson':
+                yield b''.join(event.model_dump_json().encode() + b'\n' for event in events)
+            elif fmt == 'csv':
+                yield _csv_rows(events).encode()
+            else:
+                yield ''.join(ics_event(event, stamp) for event in events).encode()
+            first = False
+        if after is None:
+            break
+        await asyncio.sleep(0)  # laisse la main aux autres requêtes entre deux pages
+
+    if fmt == 'json':
+        yield b']'
+    elif fmt == 'ics':
+        yield ICS_FOOTER.encode()
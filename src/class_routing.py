@@ -0,0 +1,110 @@
+# src/class_routing.py
+import threading
+
+import pika
+
+from src.rabbitmq_pool import RabbitMQPool, PoolUnavailable
+from src.logging_setup import get_logger
+
+logger = get_logger('routing')
+
+# Exchange topic des événements de classe : une clé de routage par classe,
+# une queue par utilisateur liée aux classes dont il est membre
+CLASS_EXCHANGE = 'class_events'
+
+
+def class_routing_key(class_name: str) -> str:
+    return f'class.{class_name}'
+
+
+def user_queue(username: str) -> str:
+    return f'user.{username}'
+
+
+def declare_user_queue(channel, username: str) -> str:
+    """Déclare l'exchange des classes et la queue d'un utilisateur"""
+    channel.exchange_declare(exchange=CLASS_EXCHANGE, exchange_type='topic')
+    queue_name = user_queue(username)
+    channel.queue_declare(queue=queue_name)
+    return queue_name
+
+
+class ClassBindings:
+    """Liaisons queue utilisateur <-> classe sur l'exchange topic.
+
+    Les liaisons suivent les listes d'élèves : `sync` les crée au démarrage
+    depuis le stockage, `bind` / `unbind` les ajustent quand une liste change.
+    Quel que soit le nombre de classes, un consommateur n'écoute que les
+    queues des utilisateurs qui l'intéressent.
+
+    L'état voulu est gardé en mémoire : après un échec (broker absent au
+    démarrage, connexion perdue, queues non durables perdues au redémarrage
+    du broker), il est rejoué en entier par le pool sur le premier canal
+    prêté, donc avant toute nouvelle publication.
+    """
+
+    def __init__(self, pool: RabbitMQPool):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._bound = set()    # (utilisateur, classe) à lier
+        self._unbound = set()  # liaisons retirées dont la suppression n'est pas confirmée
+        pool.add_reconnect_hook(self._restore)
+
+    def _record(self, changes):
+        with self._lock:
+            for username, class_name, bind in changes:
+                if bind:
+                    self._bound.add((username, class_name))
+                    self._unbound.discard((username, class_name))
+                else:
+                    self._bound.discard((username, class_name))
+                    self._unbound.add((username, class_name))
+
+    def _send(self, channel, changes):
+        self.pool.declare_exchange(channel, CLASS_EXCHANGE)
+        for username, class_name, bind in changes:
+            self.pool.declare_queue(channel, user_queue(username))
+            if bind:
+                channel.queue_bind(queue=user_queue(username), exchange=CLASS_EXCHANGE,
+                                   routing_key=class_routing_key(class_name))
+            else:
+                channel.queue_unbind(queue=user_queue(username), exchange=CLASS_EXCHANGE,
+                                     routing_key=class_routing_key(class_name))
+
+    def _apply(self, changes) -> bool:
+        """Enregistre puis applique des (utilisateur, classe, lier?) ; en cas
+        d'échec, l'état voulu sera rejoué à la reconnexion (False)"""
+        changes = list(changes)
+        self._record(changes)
+        try:
+            with self.pool.acquire() as channel:
+                self._send(channel, changes)
+        except (PoolUnavailable, pika.exceptions.AMQPError) as e:
+            logger.warning("Erreur de mise à jour des liaisons de classe, nouvel essai à la reconnexion : %s", e)
+            self.pool.request_resync()
+            return False
+        with self._lock:
+            self._unbound.difference_update((u, c) for u, c, bind in changes if not bind)
+        return True
+
+    def _restore(self, channel):
+        """Hook du pool : rejoue toutes les liaisons voulues (et les retraits en attente)"""
+        with self._lock:
+            changes = [(u, c, True) for u, c in self._bound] + [(u, c, False) for u, c in self._unbound]
+            unbound = set(self._unbound)
+        if not changes:
+            return
+        self._send(channel, changes)
+        with self._lock:
+            self._unbound -= unbound
+        logger.info("Liaisons de classe rétablies", extra={'bindings': len(changes)})
+
+    def sync(self, memberships) -> bool:
+        """Lie chaque membre à ses classes : itérable de (classe, utilisateur)"""
+        return self._apply((username, class_name, True) for class_name, username in memberships)
+
+    def bind(self, username: str, class_name: str) -> bool:
+        return self._apply([(username, class_name, True)])
+
+    def unbind(self, username: str, class_name: str) -> bool:
+        return self._apply([(username, class_name, False)])
@@ -0,0 +1,196 @@
+# src/coalescer.py
+import os
+import threading
+import time
+from typing import Optional
+
+from src.metrics import coalesced_messages, digest_size
+from src.outbox import Outbox
+from src.wire_format import EventMessage, encode, encode_digest
+from src.logging_setup import get_logger
+
+logger = get_logger('coalescer')
+
+
+def supersede(previous: EventMessage, message: EventMessage) -> Optional[EventMessage]:
+    """Ce qu'il reste à notifier quand `message` suit `previous` pour le même
+    événement (None : plus rien, l'événement a été créé puis supprimé)"""
+    if previous.action == 'created':
+        if message.action == 'deleted':
+            return None
+        if message.action == 'updated':
+            return message._replace(action='created')
+    return message
+
+
+class _Group:
+    __slots__ = ('exchange', 'routing_key', 'deadline', 'messages')
+
+    def __init__(self, exchange: str, routing_key: str, deadline: float):
+        self.exchange = exchange
+        self.routing_key = routing_key
+        self.deadline = deadline
+        self.messages = {}  # événement -> dernier message (ordre du premier changement)
+
+
+class Coalescer:
+    """Regroupe les notifications par destinataire (clé de routage + exchange,
+    et éventuellement l'utilisateur) pendant `window` secondes.
+
+    Les changements successifs d'un même événement se remplacent (supersede) ;
+    à l'échéance, un groupe d'un seul message part tel quel, un groupe plus
+    grand part en un résumé (au plus `max_digest` changements par résumé).
+    Avec `window` <= 0, les messages sont déposés directement dans l'outbox.
+    Le thread de vidage démarre au premier dépôt (un par processus) ; c'est
+    lui qui publie, résumés pleins compris : `put` ne publie jamais.
+    """
+
+    def __init__(self, outbox: Outbox, window: float = 2.0, max_digest: int = 200, clock=time.monotonic):
+        self.outbox = outbox
+        self.window = window
+        self.max_digest = max_digest
+        self.clock = clock
+        self._start_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """État propre au processus (comme l'outbox : un worker forké repart à vide)"""
+        self._pid = os.getpid()
+        self._groups = {}  # (exchange, clé de routage, destinataire) -> groupe, par ordre de création
+        self._ready = []   # résumés pleins, à publier sans attendre l'échéance
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    # ---- Côté producteurs (handlers) ----
+
+    def put(self, routing_key: str, message: EventMessage, exchange: str = '', recipient: str = None) -> bool:
+        """Dépose un message ; retourne False seulement si l'outbox le refuse
+        (dépôt direct, sans regroupement)"""
+        return self.put_many([(routing_key, message, exchange, recipient)]) == 1
+
+    def put_many(self, messages) -> int:
+        """Dépose des (routing_key, message, exchange, destinataire) ; retourne
+        le nombre de messages acceptés"""
+        if self.window <= 0:
+            accepted = 0
+            for routing_key, message, exchange, _ in messages:
+                body, content_type = encode(message)
+                accepted += self.outbox.put(routing_key, body, exchange=exchange, content_type=content_type)
+            return accepted
+
+        self._ensure_started()
+        accepted = 0
+        with self._condition:
+            for routing_key, message, exchange, recipient in messages:
+                key = (exchange, routing_key, recipient)
+                group = self._groups.get(key)
+                if group is None:
+                    group = self._groups[key] = _Group(exchange, routing_key, self.clock() + self.window)
+                    if len(self._groups) == 1:
+                        self._condition.notify()  # premier groupe en attente : on réveille le thread
+                self._add(group, message)
+                accepted += 1
+                if len(group.messages) >= self.max_digest:
+                    # Résumé plein : publié par le thread de vidage, pas par l'appelant
+                    self._ready.append(self._groups.pop(key))
+                    self._condition.notify()
+        return accepted
+
+    def _add(self, group: _Group, message: EventMessage):
+        # Sans identifiant, un message ne remplace rien ; un rappel ne remplace pas un changement
+        event_key = (message.event_id, message.action == 'reminder') if message.event_id else object()
+        previous = group.messages.get(event_key)
+        if previous is None:
+            group.messages[event_key] = message
+            return
+        merged = supersede(previous, message)
+        if merged is None:
+            del group.messages[event_key]
+            coalesced_messages.labels(outcome='cancelled').inc(2)
+        else:
+            group.messages[event_key] = merged
+            coalesced_messages.labels(outcome='superseded').inc()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='notification-coalescer', daemon=True)
+                self._thread.start()
+
+    # ---- Thread de vidage ----
+
+    def _publish(self, group: _Group):
+        messages = list(group.messages.values())
+        if not messages:
+            return  # tout a été annulé
+        if len(messages) == 1:
+            body, content_type = encode(messages[0])
+            coalesced_messages.labels(outcome='single').inc()
+        else:
+            body, content_type = encode_digest(messages)
+            coalesced_messages.labels(outcome='digested').inc(len(messages))
+            digest_size.observe(len(messages))
+        if not self.outbox.put(group.routing_key, body, exchange=group.exchange, content_type=content_type):
+            logger.warning("Notification refusée par l'outbox", extra={'routing_key': group.routing_key,
+                                                                        'changes': len(messages)})
+
+    def _due_groups(self):
+        """Attend qu'au moins un groupe soit plein ou arrive à échéance et les
+        retire (None à l'arrêt, une fois tout publié)"""
+        with self._condition:
+            while True:
+                if self._stopping:
+                    groups = self._take_all()
+                    return groups or None
+                if self._ready:
+                    groups, self._ready = self._ready, []
+                    return groups
+                if not self._groups:
+                    self._condition.wait()
+                    continue
+                # Groupes rangés par création, donc par échéance
+                delay = next(iter(self._groups.values())).deadline - self.clock()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                now = self.clock()
+                due = [key for key, group in self._groups.items() if group.deadline <= now]
+                return [self._groups.pop(key) for key in due]
+
+    def _run(self):
+        while True:
+            groups = self._due_groups()
+            if groups is None:
+                return
+            for group in groups:
+                try:
+                    self._publish(group)
+                except Exception as e:
+                    logger.exception("Erreur lors de la publication d'un résumé : %s", e)
+
+    def _take_all(self):
+        groups = self._ready + list(self._groups.values())
+        self._ready, self._groups = [], {}
+        return groups
+
+    def flush(self):
+        """Publie immédiatement tous les groupes en attente"""
+        with self._condition:
+            groups = self._take_all()
+        for group in groups:
+            self._publish(group)
+
+    def close(self, timeout: float = 5.0):
+        """Publie ce qui est en attente puis arrête le thread"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
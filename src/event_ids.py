@@ -0,0 +1,39 @@
+# src/event_ids.py
+import os
+import threading
+import time
+
+# Identifiants au format ULID : 48 bits d'horodatage (ms) + 80 bits aléatoires,
+# encodés en 26 caractères base32 de Crockford. L'ordre lexicographique suit
+# l'ordre de création ; dans une même milliseconde la partie aléatoire est
+# incrémentée pour garder des identifiants croissants.
+
+_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_RANDOM_BITS = 80
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(_ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def new_event_id() -> str:
+    """Nouvel identifiant unique, triable par date de création"""
+    global _last_ms, _last_random
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms <= _last_ms:
+            now_ms = _last_ms
+            _last_random = (_last_random + 1) % (1 << _RANDOM_BITS)
+        else:
+            _last_random = int.from_bytes(os.urandom(10), 'big')
+        _last_ms = now_ms
+        random_part = _last_random
+    return _encode((now_ms << _RANDOM_BITS) | random_part, 26)
@@ -0,0 +1,81 @@
+# src/event_query.py
+from datetime import datetime, timedelta
+from functools import lru_cache
+from heapq import merge
+from itertools import islice
+from typing import FrozenSet, Iterable, Optional
+
+from src.agenda_store import date_key
+from src.models import PriorityLevel
+
+
+@lru_cache(maxsize=1024)
+def parse_day(value: str) -> datetime:
+    """Date 'jj/mm/aaaa' de l'API (les mêmes dates reviennent souvent)"""
+    return datetime.strptime(value, "%d/%m/%Y")
+
+
+def day_bounds(day: Optional[datetime]):
+    """Bornes [début, fin[ d'un jour (ou (None, None))"""
+    if day is None:
+        return None, None
+    start = date_key(day).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=1)
+
+
+def _sort_key(entry):
+    return entry[0]
+
+
+def take_page(entries, limit: Optional[int]):
+    """Coupe une itération triée de ((date, clé), événement) en
+    (événements, clé de tri du dernier si la suite existe)"""
+    if limit is None:
+        return [event for _, event in entries], None
+    page = list(islice(entries, limit + 1))
+    if len(page) > limit:
+        return [event for _, event in page[:limit]], page[limit - 1][0]
+    return [event for _, event in page], None
+
+
+class EventQuery:
+    """Critères de filtrage communs aux agendas et aux classes.
+
+    - start / end : plage de dates [start, end[
+    - priorities : ensemble de priorités acceptées (None = toutes)
+    - classes : classes dont on veut les événements (None = agenda complet)
+    """
+
+    def __init__(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 priorities: Optional[Iterable[PriorityLevel]] = None,
+                 classes: Optional[Iterable[str]] = None):
+        self.start = date_key(start) if start is not None else None
+        self.end = date_key(end) if end is not None else None
+        self.priorities: Optional[FrozenSet[PriorityLevel]] = frozenset(priorities) if priorities else None
+        self.classes: Optional[FrozenSet[str]] = frozenset(classes) if classes else None
+
+    @classmethod
+    def from_params(cls, date: Optional[str] = None, date_from: Optional[str] = None,
+                    date_to: Optional[str] = None, priorities=None, classes=None) -> "EventQuery":
+        """Construit la requête depuis les paramètres de l'API (dates 'jj/mm/aaaa').
+
+        `date` est un jour exact ; `date_from` / `date_to` sont inclusifs.
+        Lève ValueError si une date est invalide.
+        """
+        start = end = None
+        if date:
+            start, end = day_bounds(parse_day(date))
+        if date_from:
+            start = max(filter(None, (start, parse_day(date_from))))
+        if date_to:
+            to_end = parse_day(date_to) + timedelta(days=1)
+            end = min(filter(None, (end, to_end)))
+        return cls(start, end, priorities, classes)
+
+    def run(self, stores, after=None, limit: Optional[int] = None):
+        """Exécute la requête sur des AgendaStore (coupes par bisect sur l'index
+        des dates) et fusionne les résultats dans l'ordre (date, clé)"""
+        sources = [store.iter_sorted(after, self.start, self.end, self.priorities) for store in stores]
+        if len(sources) == 1:
+            return take_page(sources[0], limit)
+        return take_page(merge(*sources, key=_sort_key), limit)
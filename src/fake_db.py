@@ -53,3 +53,7 @@ fake_classes_db = {
         "students": ["YannBerl"]  # Les élèves inscrits dans la classe CG
     }
 }
+
+
+# Agendas privés indexés (un AgendaStore par utilisateur, créé à la demande)
+fake_agendas_db = {}
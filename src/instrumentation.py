@@ -0,0 +1,143 @@
+# src/instrumentation.py
+import asyncio
+import os
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from src.logging_setup import get_logger
+from src.metrics import event_loop_lag, http_request_duration, largest_agenda, stored_events
+
+logger = get_logger('instrumentation')
+
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', '0.5'))        # secondes entre deux mesures
+SIZE_GAUGES_INTERVAL = float(os.getenv('SIZE_GAUGES_INTERVAL', '15'))   # secondes entre deux relevés
+
+UNMATCHED_ROUTE = '<unmatched>'  # 404 : le chemin demandé ne devient pas un libellé
+
+# Libellé `class` des métriques : liste fixe (METRICS_CLASS_LABELS=M321,CG) ou,
+# à défaut, les METRICS_CLASS_TOP_K premières classes existantes rencontrées
+METRICS_CLASS_LABELS = [c for c in os.getenv('METRICS_CLASS_LABELS', '').split(',') if c]
+METRICS_CLASS_TOP_K = int(os.getenv('METRICS_CLASS_TOP_K', '20'))
+OTHER_LABEL = 'other'
+
+
+# ---- Latence des requêtes par route ----
+
+class MetricsMiddleware:
+    """Mesure chaque requête HTTP dans agenda_http_request_duration_seconds.
+
+    Le libellé `route` est le modèle de la route qui a traité la requête
+    (ex. /classe/{class_name}/events) : le nombre de séries reste borné
+    quel que soit le nombre de classes, d'utilisateurs ou d'événements.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._templates = None  # endpoint -> modèle de chemin
+
+    def route_template(self, scope) -> str:
+        route = scope.get('route')
+        if route is not None:
+            return route.path
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._templates is None:
+            # Le routeur range l'endpoint retenu dans le scope : une table
+            # endpoint -> modèle, construite une fois, suffit à retrouver la route
+            templates = {}
+            for route in scope['app'].routes:
+                templates.setdefault(getattr(route, 'endpoint', None), getattr(route, 'path', UNMATCHED_ROUTE))
+            self._templates = templates
+        return self._templates.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_duration.labels(
+                method=scope['method'],
+                route=self.route_template(scope),
+                status=f'{status_code // 100}xx',
+            ).observe(time.perf_counter() - start)
+
+
+# ---- Libellés à cardinalité bornée ----
+
+class BoundedLabel:
+    """Convertit une valeur libre (nom de classe) en libellé de métrique.
+
+    Au plus `limit` valeurs distinctes obtiennent leur propre série ; les
+    suivantes, et celles que `exists` refuse (classe inconnue, chemin
+    arbitraire envoyé par un client), sont regroupées sous "other". Une
+    valeur admise le reste : renommer ses séries après coup rendrait les
+    compteurs incohérents. Avec une liste autorisée, seules ses valeurs
+    sont admises.
+    """
+
+    def __init__(self, allowed=(), limit: int = 20, other: str = OTHER_LABEL):
+        self.allowed = frozenset(allowed)
+        self.limit = limit
+        self.other = other
+        self._admitted = set(self.allowed)
+        self._lock = threading.Lock()
+
+    def __call__(self, value: str, exists=None) -> str:
+        if value in self._admitted:
+            return value
+        if self.allowed or len(self._admitted) >= self.limit:
+            return self.other
+        if exists is not None and not exists(value):
+            return self.other
+        with self._lock:
+            if value in self._admitted or len(self._admitted) < self.limit:
+                self._admitted.add(value)
+                return value
+        return self.other
+
+
+class_label = BoundedLabel(METRICS_CLASS_LABELS, METRICS_CLASS_TOP_K)
+
+
+# ---- Sondes périodiques (tâches de fond du worker) ----
+
+async def monitor_event_loop(interval: float = LOOP_LAG_INTERVAL):
+    """Mesure le retard de réveil de la boucle : au-delà de quelques ms,
+    un traitement synchrone bloque la boucle"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = loop.time() - start - interval
+        event_loop_lag.observe(max(lag, 0.0))
+        if lag > 0.25:
+            logger.warning("Boucle d'événements bloquée", extra={'lag_ms': round(lag * 1000, 1)})
+
+
+def refresh_size_gauges(repo):
+    for event_type, (total, largest) in repo.size_stats().items():
+        stored_events.labels(type=event_type).set(total)
+        largest_agenda.labels(type=event_type).set(largest)
+
+
+async def monitor_sizes(repo, interval: float = SIZE_GAUGES_INTERVAL):
+    """Relève périodiquement la taille des agendas (hors du chemin des requêtes)"""
+    while True:
+        try:
+            await run_in_threadpool(refresh_size_gauges, repo)
+        except Exception:
+            logger.exception("Relevé des tailles d'agenda impossible")
+        await asyncio.sleep(interval)
@@ -0,0 +1,263 @@
+# src/logging_setup.py
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from src.metrics import log_records
+
+# ---- Configuration (variables d'environnement) ----
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')                 # json ou text
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))   # enregistrements en attente d'écriture
+# Taux d'échantillonnage par logger : "agenda.access=0.1,agenda.notifications=0.1".
+# Les avertissements et erreurs ne sont jamais échantillonnés
+LOG_SAMPLING = os.getenv('LOG_SAMPLING', 'agenda.access=0.1,agenda.notifications=0.1')
+
+ROOT_LOGGER = 'agenda'
+
+# Identifiant de la requête en cours (propagé aux threads du threadpool)
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger de l'application : get_logger('outbox') -> 'agenda.outbox'"""
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+# ---- Masquage des secrets ----
+
+SECRET_FIELDS = {'password', 'hashed_password', 'token', 'access_token', 'authorization'}
+_SECRET_PATTERNS = (
+    (re.compile(r'(?i)\b(bearer\s+)\S+'), r'\1***'),
+    (re.compile(r'(?i)\b((?:access_)?token=)[^&\s]+'), r'\1***'),
+    (re.compile(r'(?i)\b(password=)\S+'), r'\1***'),
+    (re.compile(r'fakehashed\S*'), '***'),
+    (re.compile(r'pbkdf2_sha256\$\S+'), '***'),
+)
+
+
+def redact(text: str) -> str:
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+# ---- Mise en forme (exécutée par le thread d'écriture) ----
+
+# Attributs standards d'un LogRecord : le reste vient de `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'request_id'}
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {
+        key: '***' if key in SECRET_FIELDS else value
+        for key, value in record.__dict__.items()
+        if key not in _RECORD_ATTRIBUTES and not key.startswith('_')
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement : ts, level, logger, request_id, msg, champs extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        if getattr(record, 'request_id', None):
+            data['request_id'] = record.request_id
+        data['msg'] = redact(record.getMessage())
+        for key, value in _extra_fields(record).items():
+            data.setdefault(key, value)  # un champ extra ne masque pas ts, level...
+        if record.exc_text:
+            data['exc'] = redact(record.exc_text)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Sortie lisible pour le développement (mêmes masquages que le JSON)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record)} {record.levelname} {record.name}"
+        if getattr(record, 'request_id', None):
+            line += f" [{record.request_id}]"
+        line += f" {redact(record.getMessage())}"
+        extra = _extra_fields(record)
+        if extra:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in extra.items())
+        if record.exc_text:
+            line += '\n' + redact(record.exc_text)
+        return line
+
+
+# ---- Filtres (exécutés dans le thread appelant, avant la mise en file) ----
+
+def parse_sampling(spec: str) -> dict:
+    """"agenda.access=0.1,..." -> {'agenda.access': 0.1, ...}"""
+    rates = {}
+    for item in spec.split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Ne garde qu'une fraction des messages DEBUG/INFO des loggers bavards"""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def rate_for(self, name: str) -> float:
+        # Le préfixe le plus long l'emporte : agenda.access.static avant agenda.access
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            if rate < 1.0:
+                record.sample_rate = rate  # permet de ré-extrapoler les volumes
+            return True
+        log_records.labels(outcome='sampled_out').inc()
+        return False
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """Dépose l'enregistrement dans une file bornée sans jamais bloquer :
+    le formatage et l'écriture sur stdout sont faits par un thread dédié"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Seulement ce qui dépend du contexte appelant : message et traceback
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records.labels(outcome='dropped').inc()
+        else:
+            log_records.labels(outcome='queued').inc()
+
+
+# ---- Mise en place ----
+
+_listener = None
+_pid = None
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None):
+    """Branche le logger 'agenda' sur la file et démarre le thread d'écriture
+    (une fois par processus)"""
+    global _listener, _pid
+    if _pid == os.getpid():
+        return
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+    records = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = AsyncQueueHandler(records)
+    handler.addFilter(SamplingFilter(parse_sampling(LOG_SAMPLING)))
+    handler.addFilter(RequestIdFilter())
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    for old in list(logger.handlers):
+        logger.removeHandler(old)
+    logger.addHandler(handler)
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    _pid = os.getpid()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Écrit les enregistrements encore en file puis arrête le thread"""
+    global _listener, _pid
+    if _listener is not None and _pid == os.getpid():
+        _listener.stop()
+    _listener, _pid = None, None
+
+
+def set_level(level: str, name: str = ROOT_LOGGER) -> str:
+    """Change le niveau d'un logger à chaud ; retourne le niveau appliqué"""
+    level = level.upper()
+    if not isinstance(logging.getLevelName(level), int):
+        raise ValueError(f"Niveau de log inconnu : {level}")
+    logging.getLogger(name).setLevel(level)
+    return level
+
+
+def get_levels() -> dict:
+    """Niveaux effectifs du logger racine et des loggers de l'application déjà créés"""
+    names = [ROOT_LOGGER] + sorted(
+        name for name in logging.Logger.manager.loggerDict if name.startswith(ROOT_LOGGER + '.')
+    )
+    return {name: logging.getLevelName(logging.getLogger(name).getEffectiveLevel()) for name in names}
+
+
+# ---- Identifiant de requête (middleware ASGI) ----
+
+class RequestContextMiddleware:
+    """Attribue un identifiant à chaque requête (en-tête X-Request-ID repris
+    s'il est fourni), le renvoie dans la réponse et journalise l'accès"""
+
+    def __init__(self, app):
+        self.app = app
+        self.access = get_logger('access')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        incoming = dict(scope['headers']).get(b'x-request-id', b'').decode('latin-1')
+        rid = incoming[:64] if incoming else uuid.uuid4().hex[:16]
+        token = request_id.set(rid)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                message['headers'] = [*message.get('headers', ()), (b'x-request-id', rid.encode('latin-1'))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if self.access.isEnabledFor(logging.INFO):
+                self.access.info("requête traitée", extra={
+                    'method': scope['method'], 'path': scope['path'], 'status': status_code,
+                    'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+                })
+            request_id.reset(token)
@@ -1,43 +1,131 @@
 # ---- Import des bibliothèques nécessaires ----
-from typing import Annotated, List, Optional
+import asyncio
+import hmac
+import os
+import time
+from typing import Annotated, List, Literal, Optional
 from datetime import datetime
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from pydantic import TypeAdapter
 
 # Import de nos modules personnalisés
 from src.models import UserInDB, Event, PriorityLevel
-from src.publisher import publish_class_event, publish_private_event, publish_private_event_update
-from src.fake_db import fake_users_db, fake_classes_db  
+from src.publisher import (publish_class_event, publish_private_event, publish_private_event_update,
+                           publish_bulk_events, close_publisher, class_bindings)
+from src.repository import create_repository
+from src.session_cache import SessionCache
+from src.auth import (create_feed_token, create_token, feed_token_subject, hash_password, needs_rehash,
+                      token_subject, verify_password, verify_unknown_user)
+from src.pagination import encode_cursor, decode_cursor, stream_ndjson
+from src.bulk_io import BulkFormatError, MEDIA_TYPES, format_for, ics_calendar, parse_events, stream_events
+from src.response_cache import VersionedCache, etag_matches, make_etag
+from src.event_query import EventQuery
 from src.notification_manager import NotificationManager
-from src.metrics import api_requests, notifications_sent, events_total
+from src.reminder_scheduler import ReminderScheduler, sent_horizon
+from src.metrics import api_requests, class_requests, events_total
+from src.logging_setup import RequestContextMiddleware, configure_logging, get_levels, get_logger, set_level
+from src.instrumentation import MetricsMiddleware, class_label, monitor_event_loop, monitor_sizes
+from src import profiler
 
 # ---- Configuration de FastAPI et du gestionnaire de notifications ----
+configure_logging()  # LOG_LEVEL, LOG_FORMAT (json ou text), LOG_SAMPLING
+logger = get_logger('api')
 app = FastAPI()
+app.add_middleware(MetricsMiddleware)         # latence par modèle de route
+app.add_middleware(RequestContextMiddleware)  # X-Request-ID et journal des accès
 notification_manager = NotificationManager()
+repo = create_repository()  # AGENDA_STORAGE=memory (défaut) ou sqlite
+# Rappels indexés par id d'événement ; chaque envoi est réservé dans le stockage
+# (pas de doublon après un redémarrage ni entre workers)
+reminders = ReminderScheduler(notification_manager.publish_notification, claim=repo.claim_reminder)
+
+# Tokens déjà vérifiés -> utilisateur (borné en taille et en durée)
+session_cache = SessionCache(maxsize=int(os.getenv('AUTH_CACHE_SIZE', '10000')),
+                             ttl=float(os.getenv('AUTH_CACHE_TTL', '300')))
+ics_feeds = VersionedCache('ics', maxsize=10000)  # flux .ics déjà encodés
+class_responses = VersionedCache('class_events', maxsize=5000)  # lectures de classe en JSON encodé
+events_json = TypeAdapter(List[Event])
+
+def owner_name(username: str, full_name: Optional[str] = None) -> str:
+    """Nom de l'utilisateur dans ses notifications privées (rappels compris) :
+    nom complet, sinon identifiant"""
+    return full_name or username
+
+def class_changed(class_name: str):
+    """Libère les réponses en cache d'une classe modifiée par ce processus
+    (les autres workers voient le changement de version)"""
+    class_responses.invalidate_group(class_name)
+    ics_feeds.invalidate(("class", class_name))
+
+def cached_class_json(class_name: str, key, load_events) -> Response:
+    """Liste d'événements d'une classe encodée une seule fois par version"""
+    version = repo.class_version(class_name)
+    body = class_responses.get(key, version)
+    if body is None:
+        body = events_json.dump_json(load_events())
+        class_responses.set(key, version, body, group=class_name)
+    return Response(content=body, media_type="application/json")
+
+def count_class_request(endpoint: str, class_name: str):
+    """Compte une requête de classe : `endpoint` est le modèle de route, la
+    classe n'a sa propre série que si elle existe (et reste dans la limite)"""
+    api_requests.labels(endpoint=endpoint).inc()
+    class_requests.labels(endpoint, class_label(class_name, exists=class_exists)).inc()
+
+def class_exists(class_name: str) -> bool:
+    return repo.get_class(class_name) is not None
 
 # ---- Configuration OAuth2 pour l'authentification ----
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Les applications de calendrier ne savent pas envoyer d'en-tête Authorization :
+# les flux .ics acceptent aussi un token d'abonnement en paramètre (?token=...),
+# distinct du token d'accès (lecture des flux seulement, révocable)
+oauth2_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
-def fake_hash_password(password: str):
-    """Simulation du hachage de mot de passe"""
-    return "fakehashed" + password
-
-def get_user(db, username: str):
+def get_user(username: str):
     """Récupère un utilisateur depuis la base de données"""
-    if username in db:
-        user_dict = db[username]
+    user_dict = repo.get_user(username)
+    if user_dict:
         return UserInDB(**user_dict)
 
-def fake_decode_token(token):
-    """Simule le décodage du token"""
-    user = get_user(fake_users_db, token)
+def authenticate(token: str):
+    """Utilisateur d'un token signé. La signature et l'expiration se vérifient
+    sans la base ; l'utilisateur validé est mis en cache (au plus jusqu'à
+    l'expiration du token)"""
+    user = session_cache.get(token)
+    if user is None:
+        subject = token_subject(token)
+        if subject is None:
+            return None
+        username, expires = subject
+        user = get_user(username)
+        if user:
+            session_cache.set(token, user, ttl=expires - time.time())
     return user
 
+def authenticate_feed(token: str):
+    """Utilisateur d'un token d'abonnement, s'il n'a pas été révoqué depuis"""
+    subject = feed_token_subject(token)
+    if subject is None:
+        return None
+    username, generation = subject
+    user = get_user(username)
+    if user and user.feed_generation == generation:
+        return user
+    return None
+
+def update_user(username: str, **changes):
+    """Modifie la fiche d'un utilisateur et invalide ses sessions en cache"""
+    repo.update_user(username, **changes)
+    session_cache.invalidate_user(username)
+
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     """Vérifie et retourne l'utilisateur actuel basé sur le token"""
-    user = fake_decode_token(token)
+    user = authenticate(token)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -54,26 +142,102 @@ async def get_current_active_user(
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_feed_user(
+    header_token: Annotated[Optional[str], Depends(oauth2_optional)],
+    token: Optional[str] = None,
+):
+    """Utilisateur d'un flux .ics : token d'accès en en-tête, ou token
+    d'abonnement dans l'URL (un token d'accès n'y est pas accepté)"""
+    if header_token:
+        user = authenticate(header_token)
+    else:
+        user = authenticate_feed(token) if token else None
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if user.disabled:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
+def get_taught_class(class_name: str, current_user: UserInDB) -> dict:
+    """Classe dont l'utilisateur courant est l'enseignant (403/404 sinon)"""
+    if current_user.role != "enseignant":
+        raise HTTPException(status_code=403, detail="Seuls les enseignants peuvent modifier une classe")
+    class_info = repo.get_class(class_name)
+    if class_info is None:
+        raise HTTPException(status_code=404, detail="Classe non trouvée")
+    if class_info["teacher"] != current_user.username:
+        raise HTTPException(status_code=403, detail=f"Vous n'êtes pas l'enseignant de la classe {class_name}.")
+    return class_info
+
+# ---- Pagination des lectures ----
+
+DEFAULT_PAGE_SIZE = 50
+
+# Paramètres communs des lectures de listes (sans paramètre : liste complète)
+PageLimit = Annotated[Optional[int], Query(ge=1, le=1000)]
+PageCursor = Annotated[Optional[str], Query()]
+PageFormat = Annotated[Optional[Literal["json", "ndjson"]], Query(alias="format")]
+
+def paginated(fetch_page, limit: Optional[int], cursor: Optional[str], response_format: Optional[str]):
+    """Réponse paginée ({"events", "next_cursor"}) ou flux NDJSON trié par date"""
+    try:
+        after = decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+    if response_format == "ndjson":
+        return StreamingResponse(stream_ndjson(fetch_page, after), media_type="application/x-ndjson")
+    events, next_after = fetch_page(after, limit or DEFAULT_PAGE_SIZE)
+    return {"events": events, "next_cursor": encode_cursor(next_after)}
+
+def wants_page(limit, cursor, response_format) -> bool:
+    return limit is not None or cursor is not None or response_format is not None
+
+# ---- Filtres (moteur commun aux deux endpoints /filter) ----
+
+ALL_EVENTS = EventQuery()
+
+def split_values(values: Optional[List[str]]) -> List[str]:
+    """Accepte ?p=a&p=b aussi bien que ?p=a,b"""
+    return [value for raw in values or () for value in raw.split(",") if value]
+
+def get_event_query(
+    date: Optional[str] = None,
+    date_from: Annotated[Optional[str], Query(alias="from")] = None,
+    date_to: Annotated[Optional[str], Query(alias="to")] = None,
+    priority: Annotated[Optional[List[str]], Query()] = None,
+) -> EventQuery:
+    """Jour exact (date), plage inclusive (from/to) et priorités multiples"""
+    try:
+        priorities = [PriorityLevel(value) for value in split_values(priority)]
+        return EventQuery.from_params(date, date_from, date_to, priorities)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Filtre invalide (dates jj/mm/aaaa, priorités P1, P2 ou P3)")
+
 @app.post("/token")
 async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
     """Endpoint pour la connexion"""
     api_requests.labels(endpoint='/token').inc()
-    
-    print("Tentative de connexion avec l'utilisateur:", form_data.username)
-    user_dict = fake_users_db.get(form_data.username)
+
+    user_dict = repo.get_user(form_data.username)
     if not user_dict:
-        print("Utilisateur introuvable dans la base de données fictive.")
+        await run_in_threadpool(verify_unknown_user, form_data.password)
+        logger.warning("Connexion refusée : utilisateur inconnu", extra={'user': form_data.username})
         raise HTTPException(status_code=400, detail="Incorrect username or password")
 
     user = UserInDB(**user_dict)
-    hashed_password = fake_hash_password(form_data.password)
-    print("Mot de passe haché:", hashed_password)
-    if not hashed_password == user.hashed_password:
-        print("Le mot de passe haché ne correspond pas.")
+    # Hachage coûteux : hors de la boucle d'événements
+    if not await run_in_threadpool(verify_password, form_data.password, user.hashed_password):
+        logger.warning("Connexion refusée : mot de passe incorrect", extra={'user': form_data.username})
         raise HTTPException(status_code=400, detail="Incorrect username or password")
+    if needs_rehash(user.hashed_password):
+        update_user(user.username, hashed_password=await run_in_threadpool(hash_password, form_data.password))
 
-    print("Connexion réussie pour l'utilisateur:", form_data.username)
-    return {"access_token": user.username, "token_type": "bearer"}
+    logger.info("Connexion réussie", extra={'user': form_data.username})
+    return {"access_token": create_token(user.username), "token_type": "bearer"}
 
 # ----- CREATE ----- 
 
@@ -92,17 +256,15 @@ async def add_private_event(
         event.date = datetime.strptime(event.date, "%d/%m/%Y")
     
     # Ajoute l'événement à l'agenda
-    current_user.private_agenda.append(event)
-    fake_users_db[current_user.username]["private_agenda"] = current_user.private_agenda
+    repo.add_private_event(current_user.username, event)
     
     # Publication et notification
-    publish_private_event(event)
-    notification_manager.send_notification(event)
-    notifications_sent.labels(priority=event.priority.value).inc()
+    publish_private_event(event, owner=current_user.username)
+    reminders.schedule(event.id, event, user_name=owner_name(current_user.username, current_user.full_name))
     
     return {
         "message": "Événement privé ajouté",
-        "agenda": current_user.private_agenda
+        "agenda": repo.agenda(current_user.username)
     }
 
 @app.post("/classe/{class_name}")
@@ -113,136 +275,349 @@ async def create_shared_event(
 ):
     """Crée un événement partagé pour une classe"""
     # Incrémentation des métriques
-    api_requests.labels(endpoint=f'/classe/{class_name}').inc()
+    count_class_request('/classe/{class_name}', class_name)
     events_total.labels(type='shared').inc()
     
     # Vérifications
     if current_user.role != "enseignant":
         raise HTTPException(status_code=403, detail="Seuls les enseignants peuvent créer des événements partagés.")
     
-    class_info = fake_classes_db.get(class_name)
+    class_info = repo.get_class(class_name)
     if class_info is None or class_info["teacher"] != current_user.username:
         raise HTTPException(status_code=403, detail=f"Vous n'êtes pas l'enseignant de la classe {class_name}.")
     
-    if "events" not in class_info:
-        class_info["events"] = []
-
-    # Ajoute aux agendas des élèves
-    for student_username in class_info["students"]:
-        student = get_user(fake_users_db, student_username)
-        if student:
-            student.private_agenda.append(event)
-            fake_users_db[student.username]["private_agenda"] = student.private_agenda
-
-    # Ajoute à la classe
-    class_info["events"].append(event)
-    fake_classes_db[class_name] = class_info
+    # Ajoute à la classe (une seule copie, jointe aux agendas des élèves à la lecture)
+    repo.add_class_event(class_name, event)
+    class_changed(class_name)
 
     # Notifications
-    message = f"{current_user.full_name} a ajouté une affectation | Échéance: {event.date.strftime('%d/%m/%Y')} | Classe: {class_name}"
-    publish_class_event(message, class_name)
-    notification_manager.send_notification(event, class_name=class_name)
-    notifications_sent.labels(priority=event.priority.value).inc()
+    publish_class_event('created', event, class_name, author=current_user.full_name)
+    reminders.schedule(event.id, event, class_name=class_name)
 
     return {
         "message": f"Événement partagé créé pour la classe {class_name}"
     }
     
+# ----- IMPORT GROUPÉ (JSON, NDJSON, CSV ou iCalendar) -----
+
+BULK_MAX_EVENTS = 10000
+
+BulkFormat = Annotated[Optional[Literal["json", "ndjson", "csv", "ics"]], Query(alias="format")]
+
+async def read_bulk_events(request: Request, import_format: Optional[str]) -> List[Event]:
+    """Lit le corps de la requête (format d'après ?format= ou le Content-Type)
+    et valide tous les événements en une passe (422 avec la liste des erreurs).
+    L'analyse (jusqu'à BULK_MAX_EVENTS modèles) se fait dans le thread pool"""
+    body = await request.body()
+    try:
+        return await run_in_threadpool(parse_events, body,
+                                       import_format or format_for(request.headers.get("content-type")),
+                                       max_events=BULK_MAX_EVENTS)
+    except BulkFormatError as e:
+        raise HTTPException(status_code=422, detail=e.errors[:100])
+
+@app.post("/users/me/agenda/bulk")
+async def import_private_events(
+    request: Request,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    import_format: BulkFormat = None,
+):
+    """Importe des événements privés en une seule transaction"""
+    api_requests.labels(endpoint='/users/me/agenda/bulk').inc()
+    events = await read_bulk_events(request, import_format)
+
+    repo.add_private_events(current_user.username, events)
+    events_total.labels(type='private').inc(len(events))
+
+    publish_bulk_events(events, owner=current_user.username)
+    user_name = owner_name(current_user.username, current_user.full_name)
+    for event in events:
+        reminders.schedule(event.id, event, user_name=user_name)
+    return {"message": f"{len(events)} événement(s) privé(s) importé(s)"}
+
+@app.post("/classe/{class_name}/events/bulk")
+async def import_shared_events(
+    class_name: str,
+    request: Request,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    import_format: BulkFormat = None,
+):
+    """Importe des événements de classe (ex. l'horaire d'un semestre) en une seule transaction"""
+    count_class_request('/classe/{class_name}/events/bulk', class_name)
+    get_taught_class(class_name, current_user)
+    events = await read_bulk_events(request, import_format)
+
+    repo.add_class_events(class_name, events)
+    class_changed(class_name)
+    events_total.labels(type='shared').inc(len(events))
+
+    publish_bulk_events(events, class_name=class_name, author=current_user.full_name)
+    for event in events:
+        reminders.schedule(event.id, event, class_name=class_name)
+    return {"message": f"{len(events)} événement(s) importé(s) dans la classe {class_name}"}
+
     # ----- READ ----- 
 
 @app.get("/users/me/agenda")
 async def read_private_events(
     current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    limit: PageLimit = None,
+    cursor: PageCursor = None,
+    response_format: PageFormat = None,
 ):
-    """Récupère tous les événements privés de l'utilisateur"""
+    """Récupère tous les événements privés de l'utilisateur (paginés si demandé)"""
     api_requests.labels(endpoint='/users/me/agenda').inc()
-        
-    return current_user.private_agenda
+
+    if wants_page(limit, cursor, response_format):
+        return paginated(
+            lambda after, n: repo.query_agenda(current_user.username, ALL_EVENTS, after, n),
+            limit, cursor, response_format,
+        )
+    return repo.agenda(current_user.username)
 
 @app.get("/classe/{class_name}/events")
 async def read_shared_events(
     class_name: str,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    limit: PageLimit = None,
+    cursor: PageCursor = None,
+    response_format: PageFormat = None,
 ):
-    """Récupère les événements d'une classe"""
-    api_requests.labels(endpoint=f'/classe/{class_name}/events').inc()
+    """Récupère les événements d'une classe (paginés si demandé)"""
+    count_class_request('/classe/{class_name}/events', class_name)
     
-    class_info = fake_classes_db.get(class_name)
+    class_info = repo.get_class(class_name)
     if class_info is None:
         raise HTTPException(status_code=404, detail="Classe non trouvée")
 
-    if current_user.role == "eleve" and current_user.username not in class_info["students"]:
+    if current_user.role == "eleve" and not repo.is_student(class_name, current_user.username):
         raise HTTPException(status_code=403, detail="Vous n'êtes pas abonné à cette classe")
 
-    return class_info.get("events", [])
+    if wants_page(limit, cursor, response_format):
+        return paginated(
+            lambda after, n: repo.query_class_events(class_name, ALL_EVENTS, after, n),
+            limit, cursor, response_format,
+        )
+    return cached_class_json(class_name, (class_name, "events"), lambda: repo.class_events(class_name))
+
+# ----- EXPORT (mêmes formats que l'import, en flux) -----
+
+def export_response(fetch_page, export_format: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_events(fetch_page, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
+
+@app.get("/users/me/agenda/export")
+async def export_private_events(
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    export_format: Annotated[Literal["json", "ndjson", "csv", "ics"], Query(alias="format")] = "json",
+):
+    """Exporte l'agenda complet de l'utilisateur"""
+    api_requests.labels(endpoint='/users/me/agenda/export').inc()
+    return export_response(
+        lambda after, n: repo.query_agenda(current_user.username, ALL_EVENTS, after, n),
+        export_format, f"agenda-{current_user.username}",
+    )
+
+@app.get("/classe/{class_name}/events/export")
+async def export_shared_events(
+    class_name: str,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    export_format: Annotated[Literal["json", "ndjson", "csv", "ics"], Query(alias="format")] = "json",
+):
+    """Exporte les événements d'une classe"""
+    count_class_request('/classe/{class_name}/events/export', class_name)
+
+    class_info = repo.get_class(class_name)
+    if class_info is None:
+        raise HTTPException(status_code=404, detail="Classe non trouvée")
+
+    if current_user.role == "eleve" and not repo.is_student(class_name, current_user.username):
+        raise HTTPException(status_code=403, detail="Vous n'êtes pas abonné à cette classe")
+
+    return export_response(
+        lambda after, n: repo.query_class_events(class_name, ALL_EVENTS, after, n),
+        export_format, f"classe-{class_name}",
+    )
+
+# ----- FLUX ICALENDAR (ETag + 304 selon la version de l'agenda) -----
+
+# À changer si le rendu des flux change : les anciennes ETag ne valent plus
+ICS_FEED_VERSION = 1
+
+def ics_response(key, version: str, if_none_match: Optional[str], load_events) -> Response:
+    """304 si le client a déjà cette version ; sinon le flux en cache ou
+    rendu une seule fois par version"""
+    etag = make_etag(ICS_FEED_VERSION, *key, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        ics_feeds.not_modified()
+        return Response(status_code=304, headers=headers)
+    body = ics_feeds.get(key, version)
+    if body is None:
+        body = ics_calendar(load_events())
+        ics_feeds.set(key, version, body)
+    return Response(content=body, media_type=MEDIA_TYPES["ics"], headers=headers)
+
+@app.post("/users/me/feed-token")
+async def create_feed_link(current_user: Annotated[UserInDB, Depends(get_current_active_user)]):
+    """Token d'abonnement à mettre dans l'URL des flux .ics (lecture seule)"""
+    api_requests.labels(endpoint='/users/me/feed-token').inc()
+    token = create_feed_token(current_user.username, current_user.feed_generation)
+    return {"feed_token": token, "url": f"/users/me/agenda.ics?token={token}"}
+
+@app.delete("/users/me/feed-token")
+async def revoke_feed_links(current_user: Annotated[UserInDB, Depends(get_current_active_user)]):
+    """Révoque tous les tokens d'abonnement de l'utilisateur"""
+    api_requests.labels(endpoint='/users/me/feed-token').inc()
+    update_user(current_user.username, feed_generation=current_user.feed_generation + 1)
+    return {"message": "Tokens d'abonnement révoqués"}
+
+@app.get("/users/me/agenda.ics")
+async def private_agenda_feed(
+    current_user: Annotated[UserInDB, Depends(get_feed_user)],
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    """Agenda complet de l'utilisateur au format iCalendar (abonnement)"""
+    api_requests.labels(endpoint='/users/me/agenda.ics').inc()
+    username = current_user.username
+    return ics_response(("user", username), repo.agenda_version(username), if_none_match,
+                        lambda: repo.agenda(username))
+
+@app.get("/classe/{class_name}/events.ics")
+async def class_events_feed(
+    class_name: str,
+    current_user: Annotated[UserInDB, Depends(get_feed_user)],
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    """Événements d'une classe au format iCalendar (abonnement)"""
+    count_class_request('/classe/{class_name}/events.ics', class_name)
+
+    class_info = repo.get_class(class_name)
+    if class_info is None:
+        raise HTTPException(status_code=404, detail="Classe non trouvée")
+
+    if current_user.role == "eleve" and not repo.is_student(class_name, current_user.username):
+        raise HTTPException(status_code=403, detail="Vous n'êtes pas abonné à cette classe")
+
+    return ics_response(("class", class_name), repo.class_version(class_name), if_none_match,
+                        lambda: repo.class_events(class_name))
 
 # ----- FILTER -----
 
 @app.get("/users/me/agenda/filter")
 async def filter_private_events(
     current_user: Annotated[UserInDB, Depends(get_current_active_user)],
-    date: Optional[str] = None,
-    priority: Optional[PriorityLevel] = None,
+    query: Annotated[EventQuery, Depends(get_event_query)],
+    classes: Annotated[Optional[List[str]], Query()] = None,
+    limit: PageLimit = None,
+    cursor: PageCursor = None,
+    response_format: PageFormat = None,
 ):
-    """Filtre les événements privés par date et/ou priorité"""
+    """Filtre l'agenda par date ou plage de dates, priorités et classes"""
     api_requests.labels(endpoint='/users/me/agenda/filter').inc()
-    
-    filtered_events = current_user.private_agenda
-
-    # Filtre par date
-    if date:
-        target_date = datetime.strptime(date, "%d/%m/%Y")
-        filtered_events = [
-            event for event in filtered_events 
-            if event.date.date() == target_date.date()
-        ]
-
-    # Filtre par priorité
-    if priority:
-        filtered_events = [
-            event for event in filtered_events 
-            if event.priority == priority
-        ]
 
-    return filtered_events
+    # Restreint aux événements des classes demandées (sinon agenda complet)
+    if classes:
+        query.classes = frozenset(split_values(classes))
+    if wants_page(limit, cursor, response_format):
+        return paginated(
+            lambda after, n: repo.query_agenda(current_user.username, query, after, n),
+            limit, cursor, response_format,
+        )
+    return repo.query_agenda(current_user.username, query)[0]
 
 @app.get("/classe/{class_name}/events/filter")
 async def filter_shared_events(
     class_name: str,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)],
-    date: Optional[str] = None,
-    priority: Optional[PriorityLevel] = None,
+    query: Annotated[EventQuery, Depends(get_event_query)],
+    limit: PageLimit = None,
+    cursor: PageCursor = None,
+    response_format: PageFormat = None,
 ):
-    """Filtre les événements d'une classe par date et/ou priorité"""
-    api_requests.labels(endpoint=f'/classe/{class_name}/events/filter').inc()
+    """Filtre les événements d'une classe par date ou plage de dates et priorités"""
+    count_class_request('/classe/{class_name}/events/filter', class_name)
     
-    class_info = fake_classes_db.get(class_name)
+    class_info = repo.get_class(class_name)
     if class_info is None:
         raise HTTPException(status_code=404, detail="Classe non trouvée")
 
-    if current_user.role == "eleve" and current_user.username not in class_info["students"]:
+    if current_user.role == "eleve" and not repo.is_student(class_name, current_user.username):
         raise HTTPException(status_code=403, detail="Vous n'êtes pas abonné à cette classe")
 
-    filtered_events = class_info.get("events", [])
+    if wants_page(limit, cursor, response_format):
+        return paginated(
+            lambda after, n: repo.query_class_events(class_name, query, after, n),
+            limit, cursor, response_format,
+        )
+    filter_key = (class_name, "filter", query.start, query.end, query.priorities)
+    return cached_class_json(class_name, filter_key, lambda: repo.query_class_events(class_name, query)[0])
+
+# ----- UPDATE -----
+
+def event_date(updated_event: Event) -> datetime:
+    if type(updated_event.date) == str:
+        return datetime.strptime(updated_event.date, "%d/%m/%Y")
+    return updated_event.date
 
-    # Filtre par date
-    if date:
-        target_date = datetime.strptime(date, "%d/%m/%Y")
-        filtered_events = [
-            event for event in filtered_events 
-            if event.date.date() == target_date.date()
-        ]
+def check_shared_write(class_name: str, current_user: UserInDB, action: str):
+    """Seul un enseignant peut modifier/supprimer les événements d'une classe existante"""
+    if current_user.role != "enseignant":
+        raise HTTPException(status_code=403, detail=f"Seuls les enseignants peuvent {action} des événements partagés")
+    if repo.get_class(class_name) is None:
+        raise HTTPException(status_code=404, detail="Classe non trouvée")
 
-    # Filtre par priorité
-    if priority:
-        filtered_events = [
-            event for event in filtered_events 
-            if event.priority == priority
-        ]
+def private_event_id(username: str, event_title: str) -> str:
+    """Identifiant du premier événement privé portant ce titre (routes by_title)"""
+    event_id = repo.private_event_id(username, event_title)
+    if event_id is None:
+        raise HTTPException(status_code=404, detail="Événement avec ce titre non trouvé")
+    return event_id
 
-    return filtered_events
+def class_event_id(class_name: str, event_title: str) -> str:
+    """Identifiant du premier événement de classe portant ce titre (routes by_title)"""
+    event_id = repo.class_event_id(class_name, event_title)
+    if event_id is None:
+        raise HTTPException(status_code=404, detail="Événement avec ce titre non trouvé")
+    return event_id
 
-# ----- UPDATE -----
+def update_private_event_by_id(current_user: UserInDB, event_id: str, updated_event: Event):
+    """Mise à jour d'un événement privé (index des identifiants, O(1))"""
+    found_event = repo.update_private_event(
+        current_user.username, event_id, updated_event.title, event_date(updated_event), updated_event.priority
+    )
+    if found_event is None:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
+
+    # Notification
+    publish_private_event_update(found_event, owner=current_user.username)
+    reminders.schedule(found_event.id, found_event, user_name=owner_name(current_user.username, current_user.full_name))
+
+    return {
+        "message": "Événement privé mis à jour",
+        "event": found_event
+    }
+
+def update_shared_event_by_id(class_name: str, event_id: str, updated_event: Event, current_user: UserInDB):
+    """Mise à jour d'un événement partagé : les agendas des élèves le voient directement"""
+    found_event = repo.update_class_event(
+        class_name, event_id, updated_event.title, event_date(updated_event), updated_event.priority
+    )
+    if found_event is None:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
+    class_changed(class_name)
+
+    # Notification de la mise à jour
+    publish_class_event('updated', found_event, class_name, author=current_user.full_name)
+    reminders.schedule(found_event.id, found_event, class_name=class_name)
+
+    return {
+        "message": f"Événement partagé modifié pour la classe {class_name}",
+        "event": found_event
+    }
 
 @app.put("/users/me/agenda/by_title/{event_title}")
 async def update_private_event(
@@ -252,35 +627,18 @@ async def update_private_event(
 ):
     """Mise à jour d'un événement privé par titre"""
     api_requests.labels(endpoint='/users/me/agenda/update').inc()
-    
-    # Recherche de l'événement
-    found_event = None
-    for event in current_user.private_agenda:
-        if event.title == event_title:
-            found_event = event
-            break
-
-    if found_event is None:
-        raise HTTPException(status_code=404, detail="Événement avec ce titre non trouvé")
+    event_id = private_event_id(current_user.username, event_title)
+    return update_private_event_by_id(current_user, event_id, updated_event)
 
-    # Mise à jour de l'événement
-    found_event.title = updated_event.title
-    if type(updated_event.date) == str:
-        found_event.date = datetime.strptime(updated_event.date, "%d/%m/%Y")
-    else:
-        found_event.date = updated_event.date
-    found_event.priority = updated_event.priority
-
-    # Mise à jour base de données et notification
-    fake_users_db[current_user.username]["private_agenda"] = current_user.private_agenda
-    publish_private_event_update(found_event)
-    notification_manager.send_notification(found_event, user_name=current_user.full_name)
-    notifications_sent.labels(priority=found_event.priority.value).inc()
-
-    return {
-        "message": "Événement privé mis à jour",
-        "event": found_event
-    }
+@app.put("/users/me/agenda/by_id/{event_id}")
+async def update_private_event_id(
+    event_id: str,
+    updated_event: Event,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """Mise à jour d'un événement privé par identifiant"""
+    api_requests.labels(endpoint='/users/me/agenda/update').inc()
+    return update_private_event_by_id(current_user, event_id, updated_event)
 
 @app.put("/classe/{class_name}/events/by_title/{event_title}")
 async def update_shared_event(
@@ -289,57 +647,56 @@ async def update_shared_event(
     updated_event: Event, 
     current_user: Annotated[UserInDB, Depends(get_current_active_user)]
 ):
-    """Mise à jour d'un événement partagé"""
-    api_requests.labels(endpoint=f'/classe/{class_name}/events/update').inc()
+    """Mise à jour d'un événement partagé par titre"""
+    count_class_request('/classe/{class_name}/events/update', class_name)
+    check_shared_write(class_name, current_user, "modifier")
+    event_id = class_event_id(class_name, event_title)
+    return update_shared_event_by_id(class_name, event_id, updated_event, current_user)
+
+@app.put("/classe/{class_name}/events/by_id/{event_id}")
+async def update_shared_event_id(
+    class_name: str,
+    event_id: str,
+    updated_event: Event,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """Mise à jour d'un événement partagé par identifiant"""
+    count_class_request('/classe/{class_name}/events/update', class_name)
+    check_shared_write(class_name, current_user, "modifier")
+    return update_shared_event_by_id(class_name, event_id, updated_event, current_user)
     
-    if current_user.role != "enseignant":
-        raise HTTPException(status_code=403, detail="Seuls les enseignants peuvent modifier des événements partagés")
+# ----- DELETE -----
 
-    class_info = fake_classes_db.get(class_name)
-    if class_info is None:
-        raise HTTPException(status_code=404, detail="Classe non trouvée")
+def delete_private_event_by_id(current_user: UserInDB, event_id: str):
+    deleted_event = repo.delete_private_event(current_user.username, event_id)
+    if deleted_event is None:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
 
-    # Recherche de l'événement
-    found_event = None
-    for event in class_info.get("events", []):
-        if event.title == event_title:
-            found_event = event
-            break
+    # Notification de suppression
+    reminders.cancel(deleted_event.id)
+    notification_manager.send_notification(deleted_event, user_name=owner_name(current_user.username, current_user.full_name))
 
-    if found_event is None:
-        raise HTTPException(status_code=404, detail="Événement avec ce titre non trouvé")
+    return {
+        "message": "Événement privé supprimé",
+        "deleted_event": deleted_event
+    }
 
-    # Mise à jour de l'événement
-    found_event.title = updated_event.title
-    if type(updated_event.date) == str:
-        found_event.date = datetime.strptime(updated_event.date, "%d/%m/%Y")
-    else:
-        found_event.date = updated_event.date
-    found_event.priority = updated_event.priority
-
-    # Mise à jour des agendas des élèves
-    for student_username in class_info["students"]:
-        student = get_user(fake_users_db, student_username)
-        if student:
-            for private_event in student.private_agenda:
-                if private_event.title == event_title:
-                    private_event.title = updated_event.title
-                    private_event.date = found_event.date
-                    private_event.priority = updated_event.priority
-            fake_users_db[student.username]["private_agenda"] = student.private_agenda
+def delete_shared_event_by_id(class_name: str, event_id: str, current_user: UserInDB):
+    # Suppression de l'événement (disparaît aussi des agendas des élèves)
+    deleted_event = repo.delete_class_event(class_name, event_id)
+    if deleted_event is None:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
+    class_changed(class_name)
 
-    # Notification de la mise à jour
-    message = f"{current_user.full_name} a mis à jour '{event_title}' | Nouvelle échéance: {found_event.date.strftime('%d/%m/%Y')}"
-    publish_class_event(message, class_name)
-    notification_manager.send_notification(found_event, class_name=class_name)
-    notifications_sent.labels(priority=found_event.priority.value).inc()
+    # Notification de suppression
+    publish_class_event('deleted', deleted_event, class_name, author=current_user.full_name)
+    reminders.cancel(deleted_event.id)
+    notification_manager.send_notification(deleted_event, class_name=class_name)
 
     return {
-        "message": f"Événement partagé modifié pour la classe {class_name}",
-        "event": found_event
+        "message": f"Événement supprimé de la classe {class_name}",
+        "deleted_event": deleted_event
     }
-    
-# ----- DELETE -----
 
 @app.delete("/users/me/agenda/by_title/{event_title}")
 async def delete_private_event(
@@ -348,25 +705,17 @@ async def delete_private_event(
 ):
     """Supprime un événement privé par titre"""
     api_requests.labels(endpoint='/users/me/agenda/delete').inc()
-    
-    # Recherche et suppression de l'événement
-    for i, event in enumerate(current_user.private_agenda):
-        if event.title == event_title:
-            deleted_event = current_user.private_agenda.pop(i)
-            
-            # Mise à jour de la base de données
-            fake_users_db[current_user.username]["private_agenda"] = current_user.private_agenda
-            
-            # Notification de suppression
-            notification_manager.send_notification(deleted_event, user_name=current_user.full_name)
-            notifications_sent.labels(priority=deleted_event.priority.value).inc()
-            
-            return {
-                "message": "Événement privé supprimé",
-                "deleted_event": deleted_event
-            }
-    
-    raise HTTPException(status_code=404, detail="Événement avec ce titre non trouvé")
+    event_id = private_event_id(current_user.username, event_title)
+    return delete_private_event_by_id(current_user, event_id)
+
+@app.delete("/users/me/agenda/by_id/{event_id}")
+async def delete_private_event_id(
+    event_id: str,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """Supprime un événement privé par identifiant"""
+    api_requests.labels(endpoint='/users/me/agenda/delete').inc()
+    return delete_private_event_by_id(current_user, event_id)
 
 @app.delete("/classe/{class_name}/events/by_title/{event_title}")
 async def delete_shared_event(
@@ -374,50 +723,148 @@ async def delete_shared_event(
     event_title: str,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)]
 ):
-    """Supprime un événement partagé d'une classe"""
-    api_requests.labels(endpoint=f'/classe/{class_name}/events/delete').inc()
-    
-    if current_user.role != "enseignant":
-        raise HTTPException(status_code=403, detail="Seuls les enseignants peuvent supprimer des événements partagés")
-    
-    class_info = fake_classes_db.get(class_name)
-    if class_info is None:
-        raise HTTPException(status_code=404, detail="Classe non trouvée")
-    
-    # Recherche et suppression de l'événement
-    deleted_event = None
-    events = class_info.get("events", [])
-    for i, event in enumerate(events):
-        if event.title == event_title:
-            deleted_event = events.pop(i)
-            break
-    
-    if deleted_event is None:
-        raise HTTPException(status_code=404, detail="Événement avec ce titre non trouvé")
-    
-    # Suppression dans les agendas des élèves
-    for student_username in class_info["students"]:
-        student = get_user(fake_users_db, student_username)
-        if student:
-            student.private_agenda = [
-                event for event in student.private_agenda 
-                if event.title != event_title
-            ]
-            fake_users_db[student.username]["private_agenda"] = student.private_agenda
-    
-    # Notification de suppression
-    message = f"L'événement '{event_title}' a été supprimé de la classe {class_name}"
-    publish_class_event(message, class_name)
-    notification_manager.send_notification(deleted_event, class_name=class_name)
-    notifications_sent.labels(priority=deleted_event.priority.value).inc()
-    
-    return {
-        "message": f"Événement supprimé de la classe {class_name}",
-        "deleted_event": deleted_event
-    }
+    """Supprime un événement partagé d'une classe par titre"""
+    count_class_request('/classe/{class_name}/events/delete', class_name)
+    check_shared_write(class_name, current_user, "supprimer")
+    event_id = class_event_id(class_name, event_title)
+    return delete_shared_event_by_id(class_name, event_id, current_user)
+
+@app.delete("/classe/{class_name}/events/by_id/{event_id}")
+async def delete_shared_event_id(
+    class_name: str,
+    event_id: str,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """Supprime un événement partagé d'une classe par identifiant"""
+    count_class_request('/classe/{class_name}/events/delete', class_name)
+    check_shared_write(class_name, current_user, "supprimer")
+    return delete_shared_event_by_id(class_name, event_id, current_user)
+
+# ----- Élèves d'une classe (liaisons RabbitMQ mises à jour à chaud) -----
+
+@app.post("/classe/{class_name}/students/{username}")
+async def add_student(
+    class_name: str,
+    username: str,
+    response: Response,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """Inscrit un élève : il reçoit désormais les événements de la classe
+    (202 si la liaison RabbitMQ est différée jusqu'à la reconnexion)"""
+    count_class_request('/classe/{class_name}/students/add', class_name)
+    get_taught_class(class_name, current_user)
+    if repo.get_user(username) is None:
+        raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+
+    if not repo.add_student(class_name, username):
+        raise HTTPException(status_code=409, detail=f"{username} est déjà inscrit dans la classe {class_name}")
+    if not await run_in_threadpool(class_bindings.bind, username, class_name):
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": f"{username} a été inscrit dans la classe {class_name} ; "
+                           "abonnement aux notifications en attente de RabbitMQ"}
+    return {"message": f"{username} a été inscrit dans la classe {class_name}"}
+
+@app.delete("/classe/{class_name}/students/{username}")
+async def remove_student(
+    class_name: str,
+    username: str,
+    response: Response,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """Désinscrit un élève : ses notifications de classe s'arrêtent
+    (202 si le retrait de la liaison RabbitMQ est différé)"""
+    count_class_request('/classe/{class_name}/students/delete', class_name)
+    get_taught_class(class_name, current_user)
+
+    if not repo.remove_student(class_name, username):
+        raise HTTPException(status_code=404, detail=f"{username} n'est pas inscrit dans la classe {class_name}")
+    if not await run_in_threadpool(class_bindings.unbind, username, class_name):
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": f"{username} a été désinscrit de la classe {class_name} ; "
+                           "arrêt des notifications en attente de RabbitMQ"}
+    return {"message": f"{username} a été désinscrit de la classe {class_name}"}
+
+# ----- Administration : niveau de log à chaud -----
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+def require_admin(x_admin_token: Annotated[Optional[str], Header()] = None):
+    """Routes d'administration : désactivées (404) tant que ADMIN_TOKEN n'est pas défini"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Jeton d'administration invalide")
+
+@app.get("/admin/log-level", dependencies=[Depends(require_admin)])
+async def read_log_levels():
+    """Niveaux de log effectifs de ce worker"""
+    return get_levels()
+
+@app.put("/admin/log-level", dependencies=[Depends(require_admin)])
+async def change_log_level(level: str, logger_name: Annotated[str, Query(alias="logger")] = "agenda"):
+    """Change le niveau d'un logger (agenda ou agenda.*) sans redémarrer ;
+    s'applique au worker qui reçoit la requête"""
+    if logger_name != "agenda" and not logger_name.startswith("agenda."):
+        raise HTTPException(status_code=400, detail="Seuls les loggers agenda.* sont modifiables")
+    try:
+        applied = set_level(level, logger_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.warning("Niveau de log modifié", extra={'logger_name': logger_name, 'new_level': applied})
+    return {"logger": logger_name, "level": applied}
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_worker(
+    seconds: Annotated[float, Query(gt=0, le=profiler.MAX_SECONDS)] = 10,
+    interval_ms: Annotated[float, Query(ge=1, le=1000)] = 10,
+):
+    """Profil par échantillonnage du worker (PROFILER_ENABLED=1) : piles au
+    format "collapsed", à passer à flamegraph.pl ou speedscope"""
+    if not profiler.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        counts = await run_in_threadpool(profiler.sample_stacks, seconds, interval_ms / 1000)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(content=profiler.collapsed(counts), media_type="text/plain; charset=utf-8")
+
+# ----- Démarrage : rappels des événements à venir -----
+background_tasks = []  # sondes lancées au démarrage, annulées à l'arrêt
+
+@app.on_event("startup")
+async def startup_event():
+    """Recharge les rappels depuis le stockage, démarre le planificateur
+    et crée les liaisons des classes"""
+    now = datetime.now()
+    repo.prune_reminders(sent_horizon(now))
+    names = {}  # identifiant -> nom, une lecture par propriétaire
+
+    def stored_owner_name(username):
+        if username is not None and username not in names:
+            user = repo.get_user(username) or {}
+            names[username] = owner_name(username, user.get("full_name"))
+        return names.get(username)
+
+    reminders.load(
+        ((event.id, event, class_name, stored_owner_name(owner))
+         for owner, class_name, event in repo.upcoming_events(now)),
+        sent=repo.sent_reminders(sent_horizon(now)),
+    )
+    reminders.start()
+    # Queues des utilisateurs liées à leurs classes sur l'exchange topic
+    await run_in_threadpool(class_bindings.sync, list(repo.memberships()))
+    # Sondes : retard de la boucle asyncio et taille des agendas
+    background_tasks.extend((
+        asyncio.create_task(monitor_event_loop()),
+        asyncio.create_task(monitor_sizes(repo)),
+    ))
 
 # ----- Nettoyage à l'arrêt de l'application -----
 @app.on_event("shutdown")
 async def shutdown_event():
     """Ferme proprement les connexions à l'arrêt de l'application"""
-    notification_manager.close()
\ No newline at end of file
+    for task in background_tasks:
+        task.cancel()
+    reminders.close()
+    close_publisher()
+    repo.close()
\ No newline at end of file
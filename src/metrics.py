@@ -1,6 +1,18 @@
-from prometheus_client import start_http_server, Counter
+import logging
+import os
+from prometheus_client import start_http_server, Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, multiprocess
 
-start_http_server(8002)
+# Avec plusieurs workers uvicorn, PROMETHEUS_MULTIPROC_DIR permet d'agréger
+# les métriques de tous les processus ; seul le premier obtient le port 8002
+if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+else:
+    registry = REGISTRY
+try:
+    start_http_server(8002, registry=registry)
+except OSError:
+    logging.getLogger("agenda.metrics").warning("Port 8002 déjà utilisé : les métriques sont exposées par un autre worker")
 
 # Compteur pour suivre le nombre de requêtes à l'API
 api_requests = Counter(
@@ -21,4 +33,141 @@ events_total = Counter(
     'agenda_events_total', 
     'Nombre total d\'événements',
     ['type']  # private ou shared 
-)
\ No newline at end of file
+)
+
+# Connexions RabbitMQ ouvertes dans le pool du publisher
+rabbitmq_pool_size = Gauge(
+    'agenda_rabbitmq_pool_size',
+    'Nombre de connexions RabbitMQ dans le pool',
+    ['state']  # idle (libre) ou busy (en cours d'utilisation)
+)
+
+# Temps d'attente pour obtenir un canal du pool
+rabbitmq_pool_wait = Histogram(
+    'agenda_rabbitmq_pool_wait_seconds',
+    'Temps d\'attente pour obtenir un canal RabbitMQ du pool'
+)
+
+# Messages en attente dans l'outbox du publisher
+outbox_queue_depth = Gauge(
+    'agenda_outbox_queue_depth',
+    'Nombre de messages en attente de publication'
+)
+
+# Délai entre le dépôt d'un message et sa confirmation par RabbitMQ
+outbox_publish_latency = Histogram(
+    'agenda_outbox_publish_latency_seconds',
+    'Délai entre le dépôt d\'un message et sa confirmation par RabbitMQ'
+)
+
+# Devenir des messages de l'outbox
+outbox_messages = Counter(
+    'agenda_outbox_messages',
+    'Nombre de messages traités par l\'outbox',
+    ['outcome']  # published, failed, dropped ou spilled
+)
+
+# Efficacité du cache des sessions (utilisateurs authentifiés)
+session_cache_requests = Counter(
+    'agenda_session_cache_requests',
+    'Consultations du cache des sessions',
+    ['result']  # hit ou miss
+)
+
+# Efficacité des caches de réponses (flux iCalendar...)
+response_cache_requests = Counter(
+    'agenda_response_cache_requests',
+    'Consultations des caches de réponses encodées',
+    ['cache', 'result']  # result : hit, miss ou not_modified (304)
+)
+
+# Taux de succès de chaque cache de réponses depuis le démarrage
+response_cache_hit_ratio = Gauge(
+    'agenda_response_cache_hit_ratio',
+    'Part des lectures servies par le cache de réponses',
+    ['cache']
+)
+
+# Devenir des enregistrements de log (la sortie est écrite par un thread dédié)
+log_records = Counter(
+    'agenda_log_records',
+    'Enregistrements de log émis par l\'application',
+    ['outcome']  # queued, sampled_out (échantillonnage) ou dropped (file pleine)
+)
+
+# Durée des requêtes HTTP par route : modèle de chemin (/classe/{class_name}/events),
+# jamais le chemin réel, et famille de statut (2xx, 4xx, 5xx)
+http_request_duration = Histogram(
+    'agenda_http_request_duration_seconds',
+    'Durée de traitement des requêtes HTTP',
+    ['method', 'route', 'status'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+
+# Durée d'un basic_publish : avec confirmation, inclut l'aller-retour jusqu'à l'accusé du broker
+rabbitmq_publish_duration = Histogram(
+    'agenda_rabbitmq_publish_seconds',
+    'Durée des publications vers RabbitMQ',
+    ['mode'],  # confirmed (outbox, attend l'accusé) ou direct (pool.publish)
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1)
+)
+
+# Durée de publication d'un lot complet de l'outbox
+outbox_batch_duration = Histogram(
+    'agenda_outbox_batch_seconds',
+    'Durée de publication d\'un lot de l\'outbox'
+)
+
+# Taille des données stockées (relevée périodiquement, pas à chaque requête)
+stored_events = Gauge(
+    'agenda_stored_events',
+    'Nombre d\'événements stockés',
+    ['type'],  # private ou shared
+    multiprocess_mode='max'
+)
+largest_agenda = Gauge(
+    'agenda_largest_agenda_events',
+    'Nombre d\'événements du plus grand agenda privé (ou de la plus grande classe)',
+    ['type'],
+    multiprocess_mode='max'
+)
+
+# Retard de la boucle asyncio : un handler qui bloque la boucle retarde toutes les requêtes
+event_loop_lag = Histogram(
+    'agenda_event_loop_lag_seconds',
+    'Retard de réveil de la boucle d\'événements asyncio',
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+)
+
+# Requêtes des endpoints de classe, par classe. Le libellé `class` est borné
+# (liste autorisée ou K premières classes existantes, le reste dans "other")
+class_requests = Counter(
+    'agenda_class_requests',
+    'Nombre de requêtes sur les endpoints de classe',
+    ['endpoint', 'class']  # endpoint : modèle de route (/classe/{class_name}/events)
+)
+
+# Authentification : hachage des mots de passe (thread pool) et vérification des tokens
+password_hash_duration = Histogram(
+    'agenda_password_hash_seconds',
+    'Durée du hachage ou de la vérification d\'un mot de passe',
+    ['operation'],  # hash ou verify
+    buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+)
+token_verifications = Counter(
+    'agenda_token_verifications',
+    'Tokens vérifiés hors cache',
+    ['result']  # valid, expired ou invalid
+)
+
+# Regroupement des notifications : messages reçus et devenir, taille des résumés
+coalesced_messages = Counter(
+    'agenda_coalesced_messages',
+    'Messages passés par l\'étape de regroupement',
+    ['outcome']  # superseded (remplacé), cancelled (créé puis supprimé), single ou digested (publié)
+)
+digest_size = Histogram(
+    'agenda_digest_messages',
+    'Nombre de changements par résumé publié',
+    buckets=(2, 3, 5, 10, 20, 50, 100, 200, 500)
+)
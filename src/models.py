@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional
 from datetime import datetime
 from enum import Enum
 
@@ -14,11 +14,15 @@ class Role(str, Enum):
     ENSEIGNANT = "enseignant"
     ELEVE = "eleve"
 
+# Longueur maximale d'un titre (en caractères)
+TITLE_MAX_LENGTH = 500
+
 # Modèle de données pour un événement
 class Event(BaseModel):
-    title: str
+    title: str = Field(max_length=TITLE_MAX_LENGTH)
     date: datetime 
     priority: PriorityLevel = PriorityLevel.P2  # par défaut prio moyenne
+    id: Optional[str] = None  # identifiant unique (ULID) attribué par le serveur
 
 # Modèle utilisateurs (enseignants ou élèves)
 class User(BaseModel):
@@ -28,7 +32,9 @@ class User(BaseModel):
     email: str | None = None
     disabled: bool | None = None
     role: Role  
+    feed_generation: int = 0  # incrémenté pour révoquer les tokens d'abonnement .ics
 
 # Modèle utilisateur pour le stock en base de données
+# (l'agenda privé est stocké à part, voir fake_agendas_db)
 class UserInDB(User):
-    private_agenda: List[Event] = []  # chaque user a un agenda privé
\ No newline at end of file
+    pass
\ No newline at end of file
@@ -1,21 +1,22 @@
 # src/notification_manager.py
+import logging
 from datetime import datetime, timezone
 from src.models import Event, PriorityLevel
-import pika
+from src.coalescer import Coalescer
+from src.metrics import notifications_sent
+from src.wire_format import EventMessage, describe
+from src.logging_setup import get_logger
+
+logger = get_logger('notifications')
 
 class NotificationManager:
-    def __init__(self):
-        # Connexion à RabbitMQ
-        try:
-            self.connection = pika.BlockingConnection(pika.ConnectionParameters(host='localhost'))
-            self.channel = self.connection.channel()
-            self.channel.queue_declare(queue='notifications')
-        except:
-            print("RabbitMQ n'est pas disponible. Démarrez d'abord docker-compose up")
-            self.connection = None
-            self.channel = None
+    def __init__(self, coalescer: Coalescer = None):
+        # Les notifications passent par le regroupement puis l'outbox du
+        # publisher : aucun appel à pika n'est fait depuis les handlers
+        if coalescer is None:
+            from src.publisher import coalescer
+        self.coalescer = coalescer
 
-    # Le reste du code reste exactement le même
     def check_notification_timing(self, event: Event) -> bool:
         """Vérifie quand envoyer la notification selon la priorité"""
         days_until_event = (event.date.replace(tzinfo=None) - datetime.now()).days
@@ -27,36 +28,20 @@ class NotificationManager:
         else:                                     # Infos
             return days_until_event == 0          # Le jour même
 
-    def send_notification(self, event: Event, class_name: str = None):
-        """Envoie une notification pour un événement"""
-        if not self.channel:  # Vérifie si RabbitMQ est disponible
-            return
-            
+    def send_notification(self, event: Event, class_name: str = None, user_name: str = None):
+        """Envoie une notification pour un événement (si l'échéance est proche)"""
         if not self.check_notification_timing(event):
             return
-        # Crée le message selon la priorité
-        if event.priority == PriorityLevel.P1:
-            prefix = "URGENT!"
-        elif event.priority == PriorityLevel.P2:
-            prefix = "Rappel:"
-        else:
-            prefix = "Info:"
-        # Format du message
-        message = f"{prefix} {event.title} - échéance: {event.date.strftime('%d/%m/%Y')}"
-        if class_name:
-            message = f"[Classe {class_name}] {message}"
-        try:
-            # Envoie le message
-            self.channel.basic_publish(
-                exchange='',
-                routing_key='notifications',
-                body=message
-            )
-            print(f"Notification envoyée: {message}")
-        except Exception as e:
-            print(f"Erreur d'envoi: {e}")
+        self.publish_notification(event, class_name, user_name)
 
-    def close(self):
-        """Ferme la connexion RabbitMQ"""
-        if self.connection and not self.connection.is_closed:
-            self.connection.close()
\ No newline at end of file
+    def publish_notification(self, event: Event, class_name: str = None, user_name: str = None):
+        """Publie la notification sans vérifier l'échéance (rappels planifiés)"""
+        message = EventMessage('reminder', event.title, event.date, event.priority,
+                               class_name=class_name, event_id=event.id, author=user_name)
+        # Dépose le message (regroupé par classe ou par auteur), les threads
+        # du regroupement et de l'outbox se chargent de l'envoi
+        if self.coalescer.put('notifications', message, recipient=class_name or user_name):
+            notifications_sent.labels(priority=event.priority.value).inc()
+            if logger.isEnabledFor(logging.INFO):  # describe() n'est calculé que si le message sera émis
+                logger.info("Notification mise en file : %s", describe(message),
+                            extra={'event_id': event.id, 'class_name': class_name})
@@ -0,0 +1,220 @@
+# src/outbox.py
+import asyncio
+import base64
+import json
+import os
+import queue
+import threading
+import time
+import weakref
+
+import pika
+
+from src.metrics import (outbox_queue_depth, outbox_publish_latency, outbox_messages,
+                         outbox_batch_duration, rabbitmq_publish_duration)
+from src.rabbitmq_pool import RabbitMQPool, PoolUnavailable
+from src.logging_setup import get_logger
+
+logger = get_logger('outbox')
+
+# Politiques quand la file est pleine
+BLOCK = 'block'   # l'appelant attend une place (au plus put_timeout secondes), hors boucle asyncio
+DROP = 'drop'     # le message est abandonné
+SPILL = 'spill'   # le message est écrit sur disque et republié plus tard
+
+
+def _on_event_loop() -> bool:
+    """Vrai si l'appelant est le thread d'une boucle asyncio en cours"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class Outbox:
+    """File d'attente bornée vidée par un thread de publication dédié.
+
+    Les handlers FastAPI déposent leurs messages avec `put` sans jamais
+    toucher à pika ; le thread publie par lots avec confirmations du broker.
+    `put` est thread-safe : seul le thread de publication utilise les canaux.
+    Depuis la boucle asyncio, `put` n'attend jamais : avec la politique BLOCK,
+    une file pleine y abandonne le message (comme DROP) au lieu de geler le worker.
+    """
+
+    def __init__(self, pool: RabbitMQPool, maxsize: int = 10000, batch_size: int = 100,
+                 policy: str = BLOCK, put_timeout: float = 1.0,
+                 spill_path: str = 'outbox_spill.jsonl', retry_delay: float = 2.0):
+        if policy not in (BLOCK, DROP, SPILL):
+            raise ValueError(f"Politique de file inconnue : {policy}")
+        self.pool = pool
+        self.batch_size = batch_size
+        self.policy = policy
+        self.put_timeout = put_timeout
+        self.spill_path = spill_path
+        self.retry_delay = retry_delay
+        self.maxsize = maxsize
+        self._confirmed_channels = weakref.WeakSet()
+        self._spill_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """État propre au processus : un worker forké repart d'une file vide
+        et démarre son propre thread de publication"""
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self.maxsize)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    # ---- Côté producteurs (handlers) ----
+
+    def put(self, routing_key: str, body, exchange: str = '', content_type: str = None) -> bool:
+        """Dépose un message (texte ou octets) ; ne bloque que si la politique est
+        BLOCK et que l'appelant n'est pas la boucle asyncio"""
+        self._ensure_started()
+        message = (exchange, routing_key, body, content_type, time.monotonic())
+        try:
+            if self.policy == BLOCK and not _on_event_loop():
+                self._queue.put(message, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(message)
+        except queue.Full:
+            if self.policy == SPILL:
+                self._spill([message])
+                outbox_messages.labels(outcome='spilled').inc()
+                return True
+            outbox_messages.labels(outcome='dropped').inc()
+            logger.warning("Outbox pleine, message abandonné", extra={'routing_key': routing_key})
+            return False
+        outbox_queue_depth.set(self._queue.qsize())
+        return True
+
+    def put_many(self, messages) -> int:
+        """Dépose un lot de (routing_key, corps, exchange, content_type) ;
+        retourne le nombre de messages acceptés"""
+        return sum(self.put(routing_key, body, exchange, content_type)
+                   for routing_key, body, exchange, content_type in messages)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='outbox-publisher', daemon=True)
+                self._thread.start()
+
+    # ---- Débordement sur disque ----
+
+    def _spill(self, messages):
+        with self._spill_lock:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for exchange, routing_key, body, content_type, _ in messages:
+                    data = {'exchange': exchange, 'routing_key': routing_key, 'content_type': content_type}
+                    if isinstance(body, bytes):
+                        data['body_b64'] = base64.b64encode(body).decode('ascii')
+                    else:
+                        data['body'] = body
+                    f.write(json.dumps(data) + '\n')
+
+    def _load_spill(self):
+        """Relit (et vide) le fichier de débordement"""
+        with self._spill_lock:
+            if not os.path.exists(self.spill_path):
+                return []
+            with open(self.spill_path, encoding='utf-8') as f:
+                lines = f.readlines()
+            os.remove(self.spill_path)
+        now = time.monotonic()
+        messages = []
+        for line in lines:
+            data = json.loads(line)
+            body = base64.b64decode(data['body_b64']) if 'body_b64' in data else data['body']
+            messages.append((data['exchange'], data['routing_key'], body, data.get('content_type'), now))
+        return messages
+
+    # ---- Thread de publication ----
+
+    def _next_batch(self):
+        """Attend un premier message puis prend tout ce qui est prêt (jusqu'à batch_size)"""
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            # Période creuse : on entretient les connexions du pool
+            self.pool.keepalive()
+            return self._load_spill() if self.policy == SPILL else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        outbox_queue_depth.set(self._queue.qsize())
+        return batch
+
+    def _publish_batch(self, pending: list):
+        """Publie le lot sur un seul canal ; retire chaque message confirmé de `pending`"""
+        with self.pool.acquire() as channel:
+            if channel not in self._confirmed_channels:
+                channel.confirm_delivery()
+                self._confirmed_channels.add(channel)
+            while pending:
+                exchange, routing_key, body, content_type, enqueued_at = pending[0]
+                if exchange:
+                    self.pool.declare_exchange(channel, exchange)
+                else:
+                    self.pool.declare_queue(channel, routing_key)
+                # Heure (murale) de mise en file : le subscriber en déduit le retard
+                sent_at = time.time() - (time.monotonic() - enqueued_at)
+                properties = pika.BasicProperties(content_type=content_type, headers={'x-sent-at': sent_at})
+                publish_start = time.perf_counter()
+                try:
+                    # Canal en mode confirmation : l'appel rend la main à l'accusé du broker
+                    channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body,
+                                          properties=properties)
+                except (pika.exceptions.NackError, pika.exceptions.UnroutableError) as e:
+                    outbox_messages.labels(outcome='failed').inc()
+                    logger.error("Message refusé par RabbitMQ : %s", e, extra={'routing_key': routing_key})
+                else:
+                    rabbitmq_publish_duration.labels(mode='confirmed').observe(time.perf_counter() - publish_start)
+                    outbox_messages.labels(outcome='published').inc()
+                    outbox_publish_latency.observe(time.monotonic() - enqueued_at)
+                pending.pop(0)
+
+    def _run(self):
+        pending = []
+        while not (self._stopping.is_set() and not pending and self._queue.empty()):
+            if not pending:
+                pending = self._next_batch()
+                if not pending:
+                    continue
+            try:
+                with outbox_batch_duration.time():
+                    self._publish_batch(pending)
+            except (PoolUnavailable, pika.exceptions.AMQPError) as e:
+                logger.warning("Publication différée : %s", e)
+                if self._stopping.is_set():
+                    break
+                self._stopping.wait(self.retry_delay)
+        # Arrêt : ce qui n'a pas pu être publié est conservé sur disque si possible
+        leftovers = pending + self._drain_queue()
+        if leftovers and self.policy == SPILL:
+            self._spill(leftovers)
+        elif leftovers:
+            logger.error("%d message(s) non publié(s) à l'arrêt", len(leftovers))
+
+    def _drain_queue(self):
+        messages = []
+        while True:
+            try:
+                messages.append(self._queue.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self, timeout: float = 5.0):
+        """Vide la file (dans la limite de `timeout`) puis arrête le thread"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
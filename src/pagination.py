@@ -0,0 +1,44 @@
+# src/pagination.py
+import asyncio
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from src.agenda_store import date_key
+
+# Taille des pages lues en interne pour le streaming NDJSON
+STREAM_PAGE_SIZE = 500
+
+
+def encode_cursor(after) -> Optional[str]:
+    """Curseur opaque (base64 url) à partir d'une clé de tri (date, clé)"""
+    if after is None:
+        return None
+    raw = json.dumps([after[0].isoformat(), after[1]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]):
+    """Inverse de encode_cursor ; lève ValueError si le curseur est invalide.
+    Une date avec fuseau (curseur fabriqué par le client) est ramenée, comme
+    les clés de tri, en UTC sans fuseau"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, key = json.loads(raw)
+        return date_key(datetime.fromisoformat(date)), int(key)
+    except (ValueError, TypeError, OverflowError) as e:
+        raise ValueError("Curseur invalide") from e
+
+
+async def stream_ndjson(fetch_page, after=None):
+    """Génère un événement JSON par ligne, page par page (mémoire bornée)"""
+    while True:
+        events, after = fetch_page(after, STREAM_PAGE_SIZE)
+        if events:
+            yield b"".join(event.model_dump_json().encode() + b"\n" for event in events)
+        if after is None:
+            return
+        await asyncio.sleep(0)  # laisse la main aux autres requêtes entre deux pages
@@ -0,0 +1,61 @@
+# src/profiler.py
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Profileur par échantillonnage, activé seulement avec PROFILER_ENABLED=1 :
+# relève périodiquement la pile de chaque thread du worker (temps réel,
+# threads en attente compris). La sortie "collapsed" (une pile par ligne,
+# frames séparées par ';', suivie du nombre d'échantillons) se lit avec
+# flamegraph.pl, speedscope ou inferno.
+
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED') == '1'
+MAX_SECONDS = 60
+
+_running = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Un profil est déjà en cours dans ce worker"""
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> list:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> Counter:
+    """Échantillonne les piles pendant `seconds` ; retourne pile -> nombre d'échantillons"""
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy("Un profil est déjà en cours")
+    try:
+        me = threading.get_ident()
+        counts = Counter()
+        deadline = time.perf_counter() + min(seconds, MAX_SECONDS)
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = [names.get(ident, f'thread-{ident}')] + _stack(frame)
+                counts[';'.join(stack)] += 1
+            time.sleep(interval)
+        return counts
+    finally:
+        _running.release()
+
+
+def collapsed(counts: Counter) -> str:
+    """Format "collapsed" des flamegraphs : `frame;frame;frame N` par ligne"""
+    return ''.join(f"{stack} {count}\n" for stack, count in counts.most_common())
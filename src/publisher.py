@@ -1,66 +1,82 @@
-import pika
-from src.models import Event
-
-
-# Fonction pour établir une connexion à RabbitMQ
-def get_rabbitmq_connection():
-    try:
-        connection = pika.BlockingConnection(pika.ConnectionParameters(host='localhost'))
-        channel = connection.channel()
-        return connection, channel
-    except pika.exceptions.AMQPConnectionError:
-        print("Erreur de connexion à RabbitMQ")
-        return None, None
-
-
-# Publier un événement privé (création)
-def publish_private_event(event: Event):
-    connection, channel = get_rabbitmq_connection()
-    if connection is None or channel is None:
-        print("Impossible d'envoyer l'événement privé, connexion échouée.")
-        return
+import os
+from typing import List
 
-    # Déclarer la queue pour les événements privés
-    channel.queue_declare(queue='private_events')
-
-    # Publier l'événement
-    message = f"Événement privé : {event.title}, Date : {event.date}, Priorité : {event.priority}"
-    channel.basic_publish(exchange='', routing_key='private_events', body=message)
+from src.class_routing import CLASS_EXCHANGE, ClassBindings, class_routing_key
+from src.coalescer import Coalescer
+from src.models import Event
+from src.outbox import Outbox
+from src.rabbitmq_pool import RabbitMQPool
+from src.wire_format import EventMessage
 
-    # Fermer la connexion
-    connection.close()
 
+# Pool partagé de connexions RabbitMQ (ouvertes à la demande puis réutilisées)
+pool = RabbitMQPool(host='localhost')
 
-# Publier la mise à jour d'un événement privé
-def publish_private_event_update(event: Event):
-    connection, channel = get_rabbitmq_connection()
-    if connection is None or channel is None:
-        print("Impossible d'envoyer la mise à jour de l'événement privé, connexion échouée.")
-        return
+# File d'envoi asynchrone : les handlers déposent, un thread dédié publie
+outbox = Outbox(
+    pool,
+    maxsize=int(os.getenv('OUTBOX_MAXSIZE', '10000')),
+    policy=os.getenv('OUTBOX_POLICY', 'block'),  # block, drop ou spill
+    spill_path=os.getenv('OUTBOX_SPILL_PATH', 'outbox_spill.jsonl'),
+)
 
-    # Déclarer la queue pour les événements privés mis à jour
-    channel.queue_declare(queue='private_event_updates')
+# Regroupement des notifications avant l'outbox : par classe ou par utilisateur,
+# pendant NOTIFY_COALESCE_WINDOW secondes (0 : publication immédiate)
+coalescer = Coalescer(
+    outbox,
+    window=float(os.getenv('NOTIFY_COALESCE_WINDOW', '2')),
+    max_digest=int(os.getenv('NOTIFY_DIGEST_MAX', '200')),
+)
 
-    # Publier la mise à jour
-    message = f"Mise à jour événement privé : {event.title}, Nouvelle date : {event.date}, Priorité : {event.priority}"
-    channel.basic_publish(exchange='', routing_key='private_event_updates', body=message)
+# Liaisons des queues utilisateurs aux classes (exchange topic)
+class_bindings = ClassBindings(pool)
 
-    # Fermer la connexion
-    connection.close()
 
+def publish_event_message(routing_key: str, message: EventMessage, exchange: str = '',
+                          recipient: str = None) -> bool:
+    """Dépose le message dans l'étape de regroupement (encodé en binaire ou
+    JSON selon MESSAGE_FORMAT) ; `recipient` sépare les groupes par utilisateur"""
+    return coalescer.put(routing_key, message, exchange=exchange, recipient=recipient)
 
-# Publier un événement partagé (création ou mise à jour)
-def publish_class_event(message: str, class_name: str):
-    connection, channel = get_rabbitmq_connection()
-    if connection is None or channel is None:
-        print(f"Impossible d'envoyer l'événement partagé pour la classe {class_name}, connexion échouée.")
-        return
 
-    # Déclarer la queue pour les événements de classe
-    channel.queue_declare(queue=f'class_events_{class_name}')
+# Publier un événement privé (création)
+def publish_private_event(event: Event, owner: str = None):
+    message = EventMessage('created', event.title, event.date, event.priority, event_id=event.id)
+    publish_event_message('private_events', message, recipient=owner)
 
-    # Publier l'événement
-    channel.basic_publish(exchange='', routing_key=f'class_events_{class_name}', body=message)
 
-    # Fermer la connexion
-    connection.close()
+# Publier la mise à jour d'un événement privé
+def publish_private_event_update(event: Event, owner: str = None):
+    message = EventMessage('updated', event.title, event.date, event.priority, event_id=event.id)
+    publish_event_message('private_event_updates', message, recipient=owner)
+
+
+# Publier un événement partagé (création, mise à jour ou suppression) : routé
+# vers les queues des membres de la classe par la clé class.<nom>
+def publish_class_event(action: str, event: Event, class_name: str, author: str = None):
+    message = EventMessage(action, event.title, event.date, event.priority,
+                           class_name=class_name, event_id=event.id, author=author)
+    publish_event_message(class_routing_key(class_name), message, exchange=CLASS_EXCHANGE)
+
+
+# Publier un import groupé : les messages sont déposés ensemble et partent
+# en résumés (ou par lots sur un seul canal sans regroupement)
+def publish_bulk_events(events: List[Event], class_name: str = None, author: str = None, owner: str = None):
+    if class_name is None:
+        routing_key, exchange = 'private_events', ''
+    else:
+        routing_key, exchange = class_routing_key(class_name), CLASS_EXCHANGE
+    messages = [
+        (routing_key, EventMessage('created', event.title, event.date, event.priority,
+                                   class_name=class_name, event_id=event.id, author=author), exchange, owner)
+        for event in events
+    ]
+    return coalescer.put_many(messages)
+
+
+# Publier les groupes en attente, vider la file puis fermer les connexions
+# du pool (arrêt de l'application)
+def close_publisher():
+    coalescer.close()
+    outbox.close()
+    pool.close()
@@ -0,0 +1,266 @@
+# src/rabbitmq_pool.py
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import pika
+
+from src.logging_setup import get_logger
+from src.metrics import rabbitmq_pool_size, rabbitmq_pool_wait, rabbitmq_publish_duration
+
+logger = get_logger('rabbitmq')
+
+
+class PoolUnavailable(Exception):
+    """Levée quand aucun canal RabbitMQ ne peut être obtenu"""
+
+
+class _PooledChannel:
+    """Une connexion persistante et son canal"""
+
+    __slots__ = ("connection", "channel")
+
+    def __init__(self, connection, channel):
+        self.connection = connection
+        self.channel = channel
+
+    def is_usable(self) -> bool:
+        """Vérifie la connexion (et traite les heartbeats en attente)"""
+        if self.connection.is_closed or self.channel.is_closed:
+            return False
+        try:
+            self.connection.process_data_events(time_limit=0)
+        except pika.exceptions.AMQPError:
+            return False
+        return True
+
+    def close(self):
+        try:
+            if self.connection.is_open:
+                self.connection.close()
+        except pika.exceptions.AMQPError:
+            pass
+
+
+class RabbitMQPool:
+    """Pool de connexions/canaux RabbitMQ réutilisés entre les publications"""
+
+    def __init__(self, host: str = 'localhost', max_size: int = 4,
+                 acquire_timeout: float = 5.0, retry_delay: float = 5.0,
+                 heartbeat: int = 30):
+        self.host = host
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.retry_delay = retry_delay      # pause après un échec de connexion
+        self.heartbeat = heartbeat          # secondes, négocié avec le broker
+        self._reconnect_hooks = []          # hook(canal) : état à rétablir sur le broker
+        self._reset()
+
+    def _reset(self):
+        """(Ré)initialise l'état du pool pour le processus courant"""
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()      # canaux libres (le plus récent d'abord)
+        self._lock = threading.Lock()
+        self._size = 0                      # nombre de connexions ouvertes
+        self._declared_queues = set()       # queues déjà déclarées sur le broker
+        self._declared_exchanges = set()    # exchanges déjà déclarés
+        self._next_attempt = 0.0
+        self._last_keepalive = time.monotonic()
+        self._resync = False                # hooks à rejouer avant le prochain prêt de canal
+
+    def _check_fork(self):
+        """Après un fork (workers uvicorn/gunicorn), les sockets du parent
+        ne doivent pas être réutilisées : on repart d'un pool vide"""
+        if self._pid != os.getpid():
+            self._reset()
+
+    # ---- Gestion des connexions ----
+
+    def _connect(self) -> _PooledChannel:
+        """Ouvre une nouvelle connexion (sauf si le broker vient d'échouer)"""
+        if time.monotonic() < self._next_attempt:
+            raise PoolUnavailable("RabbitMQ indisponible, nouvel essai plus tard")
+        try:
+            connection = pika.BlockingConnection(pika.ConnectionParameters(
+                host=self.host,
+                heartbeat=self.heartbeat,
+                blocked_connection_timeout=self.acquire_timeout,
+            ))
+            channel = connection.channel()
+        except pika.exceptions.AMQPError as e:
+            self._next_attempt = time.monotonic() + self.retry_delay
+            self._resync = True
+            raise PoolUnavailable(f"Erreur de connexion à RabbitMQ : {e}") from e
+        return _PooledChannel(connection, channel)
+
+    def _checkout(self) -> _PooledChannel:
+        """Prend un canal libre, en ouvre un nouveau ou attend qu'un se libère"""
+        self._check_fork()
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                entry = None
+
+            if entry is None:
+                with self._lock:
+                    can_create = self._size < self.max_size
+                    if can_create:
+                        self._size += 1
+                if can_create:
+                    try:
+                        entry = self._connect()
+                    except PoolUnavailable:
+                        self._release_slot()
+                        raise
+                    self._update_size_metrics()
+                    self._run_reconnect_hooks(entry)
+                    return entry
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolUnavailable("Aucun canal RabbitMQ libre")
+                try:
+                    entry = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    raise PoolUnavailable("Aucun canal RabbitMQ libre")
+
+            if entry.is_usable():
+                self._run_reconnect_hooks(entry)
+                return entry
+            # Connexion morte (broker redémarré, heartbeat manqué...) : on la remplace
+            self._discard(entry)
+
+    def _release_slot(self):
+        with self._lock:
+            self._size -= 1
+        self._update_size_metrics()
+
+    def _discard(self, entry: _PooledChannel):
+        """Ferme une connexion défaillante ; les déclarations seront refaites"""
+        entry.close()
+        self._declared_queues.clear()
+        self._declared_exchanges.clear()
+        self._resync = True
+        self._release_slot()
+
+    # ---- Rétablissement après une panne ----
+
+    def add_reconnect_hook(self, hook):
+        """`hook(canal)` est appelé sur le premier canal prêté après un échec
+        de connexion, une connexion perdue ou `request_resync` : il rétablit
+        l'état attendu sur le broker (liaisons...) avant toute publication"""
+        self._reconnect_hooks.append(hook)
+
+    def request_resync(self):
+        """Rejoue les hooks au prochain prêt de canal (ex. après un échec isolé)"""
+        self._resync = True
+
+    def _run_reconnect_hooks(self, entry: _PooledChannel):
+        with self._lock:
+            if not self._resync or not self._reconnect_hooks:
+                return
+            self._resync = False
+        try:
+            for hook in self._reconnect_hooks:
+                hook(entry.channel)
+        except pika.exceptions.AMQPError:
+            self._discard(entry)  # les hooks seront rejoués au prochain prêt
+            raise
+        except BaseException:
+            self._resync = True
+            self._idle.put(entry)
+            raise
+
+    def _update_size_metrics(self):
+        idle = self._idle.qsize()
+        rabbitmq_pool_size.labels(state='idle').set(idle)
+        rabbitmq_pool_size.labels(state='busy').set(max(self._size - idle, 0))
+
+    @contextmanager
+    def acquire(self):
+        """Prête un canal du pool le temps d'un bloc `with`"""
+        start = time.perf_counter()
+        entry = self._checkout()
+        rabbitmq_pool_wait.observe(time.perf_counter() - start)
+        try:
+            yield entry.channel
+        except pika.exceptions.AMQPError:
+            self._discard(entry)
+            raise
+        except BaseException:
+            self._idle.put(entry)
+            self._update_size_metrics()
+            raise
+        else:
+            self._idle.put(entry)
+            self._update_size_metrics()
+
+    def keepalive(self):
+        """Traite les heartbeats des connexions libres pour qu'elles ne soient
+        pas fermées par le broker pendant les périodes creuses"""
+        self._check_fork()
+        if time.monotonic() - self._last_keepalive < self.heartbeat / 2:
+            return
+        self._last_keepalive = time.monotonic()
+        entries = []
+        while True:
+            try:
+                entries.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for entry in reversed(entries):
+            if entry.is_usable():
+                self._idle.put(entry)
+            else:
+                self._discard(entry)
+        self._update_size_metrics()
+
+    # ---- Publication ----
+
+    def declare_queue(self, channel, queue_name: str):
+        """Déclare une queue une seule fois par connexion au broker"""
+        if queue_name not in self._declared_queues:
+            channel.queue_declare(queue=queue_name)
+            self._declared_queues.add(queue_name)
+
+    def declare_exchange(self, channel, exchange: str, exchange_type: str = 'topic'):
+        """Déclare un exchange une seule fois par connexion au broker"""
+        if exchange not in self._declared_exchanges:
+            channel.exchange_declare(exchange=exchange, exchange_type=exchange_type)
+            self._declared_exchanges.add(exchange)
+
+    def publish(self, routing_key: str, body: str, exchange: str = '') -> bool:
+        """Publie un message ; réessaie une fois sur une connexion neuve"""
+        for attempt in range(2):
+            try:
+                with self.acquire() as channel:
+                    if exchange:
+                        self.declare_exchange(channel, exchange)
+                    else:
+                        self.declare_queue(channel, routing_key)
+                    with rabbitmq_publish_duration.labels(mode='direct').time():
+                        channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body)
+                return True
+            except PoolUnavailable as e:
+                logger.warning("%s", e)
+                return False
+            except pika.exceptions.AMQPError as e:
+                if attempt:
+                    logger.error("Erreur d'envoi : %s", e, extra={'routing_key': routing_key})
+        return False
+
+    def close(self):
+        """Ferme toutes les connexions libres du pool"""
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            entry.close()
+            self._release_slot()
+        self._declared_queues.clear()
+        self._declared_exchanges.clear()
@@ -0,0 +1,161 @@
+# src/reminder_scheduler.py
+import heapq
+import threading
+from datetime import datetime, timedelta
+from itertools import count
+
+from src.agenda_store import date_key
+from src.models import Event, PriorityLevel
+from src.logging_setup import get_logger
+
+logger = get_logger('reminders')
+
+# Règles de rappel : combien de jours avant l'échéance notifier
+REMINDER_DAYS = {
+    PriorityLevel.P1: 2,   # Examens : J-2
+    PriorityLevel.P2: 1,   # Devoirs : J-1
+    PriorityLevel.P3: 0,   # Infos : le jour même
+}
+
+
+def reminder_time(event: Event) -> datetime:
+    """Moment du rappel : début du jour J-n selon la priorité"""
+    day = date_key(event.date).replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=REMINDER_DAYS[event.priority])
+
+
+def sent_horizon(now: datetime) -> datetime:
+    """Échéance en deçà de laquelle un rappel envoyé ne concerne plus qu'un
+    événement passé (jamais rechargé) : inutile de s'en souvenir"""
+    return now - timedelta(days=max(REMINDER_DAYS.values()) + 1)
+
+
+class ReminderScheduler:
+    """Planificateur de rappels basé sur un tas trié par échéance.
+
+    Un thread dort jusqu'au prochain rappel (ou jusqu'à ce qu'un rappel
+    plus proche soit ajouté) : pas de scrutation périodique. Ajouts en
+    O(log n) ; les annulations marquent l'entrée, retirée du tas quand
+    elle arrive en tête (ou lors d'un compactage).
+
+    Avant chaque envoi, `claim(event, échéance)` réserve le rappel dans le
+    stockage partagé (AgendaRepository.claim_reminder) : un rappel déjà
+    envoyé, par un redémarrage précédent ou un autre worker, n'est pas
+    renvoyé ; un seul worker envoie chaque rappel.
+    """
+
+    def __init__(self, notify, clock=datetime.now, claim=None):
+        self.notify = notify        # notify(event, class_name, user_name)
+        self.clock = clock
+        self.claim = claim          # claim(event, échéance) -> bool
+        self._heap = []             # [échéance, n° d'ordre, id du rappel, données]
+        self._entries = {}          # id du rappel -> entrée du tas
+        self._order = count()
+        self._cancelled = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---- Planification ----
+
+    def schedule(self, reminder_id, event: Event, class_name: str = None, user_name: str = None):
+        """(Re)planifie le rappel d'un événement ; rien si l'échéance est passée"""
+        with self._condition:
+            self._cancel(reminder_id)
+            if date_key(event.date) < self.clock():
+                return
+            due = reminder_time(event)
+            entry = [due, next(self._order), reminder_id, (event, class_name, user_name)]
+            self._entries[reminder_id] = entry
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:
+                self._condition.notify()  # nouveau rappel le plus proche : on réveille le thread
+
+    def cancel(self, reminder_id):
+        with self._condition:
+            self._cancel(reminder_id)
+
+    def _cancel(self, reminder_id):
+        entry = self._entries.pop(reminder_id, None)
+        if entry is None:
+            return
+        entry[2] = None
+        self._cancelled += 1
+        if self._cancelled > 1024 and self._cancelled > len(self._heap) // 2:
+            # Trop d'entrées annulées : on reconstruit le tas
+            self._heap = [e for e in self._heap if e[2] is not None]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def load(self, reminders, sent=None):
+        """Recharge les rappels depuis le stockage : (id, événement, classe,
+        propriétaire), le propriétaire étant le nom transmis comme user_name
+        pour un événement privé (None pour une classe). `sent` ({id: échéance},
+        voir AgendaRepository.sent_reminders) écarte les rappels échus déjà
+        envoyés"""
+        sent = sent or {}
+        with self._condition:
+            now = self.clock()
+            for reminder_id, event, class_name, owner in reminders:
+                if date_key(event.date) < now:
+                    continue
+                due = reminder_time(event)
+                if due <= now and sent.get(reminder_id) == due:
+                    continue
+                entry = [due, next(self._order), reminder_id, (event, class_name, owner)]
+                self._entries[reminder_id] = entry
+                self._heap.append(entry)
+            heapq.heapify(self._heap)
+            self._condition.notify()
+
+    # ---- Thread d'envoi ----
+
+    def _pop_due(self):
+        """Attend le prochain rappel dû et le retire du tas (None à l'arrêt)"""
+        with self._condition:
+            while not self._stopping:
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+                    self._cancelled -= 1
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = (self._heap[0][0] - self.clock()).total_seconds()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                entry = heapq.heappop(self._heap)
+                del self._entries[entry[2]]
+                return entry[0], entry[3]
+            return None
+
+    def _run(self):
+        while True:
+            popped = self._pop_due()
+            if popped is None:
+                return
+            due, (event, class_name, user_name) = popped
+            try:
+                if self.claim is not None and not self.claim(event, due):
+                    continue  # déjà envoyé (ou événement modifié ailleurs)
+                self.notify(event, class_name, user_name)
+            except Exception as e:
+                logger.exception("Erreur lors de l'envoi d'un rappel : %s", e)
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+                self._thread.start()
+
+    def close(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
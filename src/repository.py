@@ -0,0 +1,805 @@
+# src/repository.py
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from src.agenda_store import AgendaStore, date_key
+from src.event_ids import new_event_id
+from src.agenda_views import AgendaViews
+from src.event_query import EventQuery, take_page
+from src.models import Event, PriorityLevel
+
+
+class AgendaRepository(ABC):
+    """Interface de stockage des utilisateurs, classes et événements.
+
+    Les événements sont adressés par leur identifiant (ULID attribué à
+    l'ajout) ; `*_event_id` retrouve l'identifiant du premier événement
+    portant un titre, pour les routes by_title. `agenda` retourne la vue complète d'un
+    utilisateur (événements privés + événements de ses classes) triée par date.
+
+    Les méthodes `query_*` exécutent une EventQuery dans l'ordre (date, clé)
+    et retournent (événements, curseur) : le curseur est la clé de tri du
+    dernier événement retourné, ou None s'il n'y a plus rien après.
+    Sans `limit`, tous les résultats sont retournés.
+
+    Dates : une date avec fuseau est relue avec son décalage d'origine, mais
+    triée et filtrée en UTC ; une date naïve est prise telle quelle (voir
+    agenda_store.date_key). Les deux backends suivent cette convention.
+
+    Classe abstraite : un backend qui n'implémente pas toutes les méthodes
+    échoue dès sa création.
+    """
+
+    # ---- Utilisateurs ----
+    @abstractmethod
+    def get_user(self, username: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def update_user(self, username: str, **changes):
+        ...
+
+    # ---- Classes ----
+    @abstractmethod
+    def get_class(self, class_name: str) -> Optional[dict]:
+        """Retourne {"teacher": ..., "students": [...]} ou None"""
+
+    @abstractmethod
+    def is_student(self, class_name: str, username: str) -> bool:
+        ...
+
+    @abstractmethod
+    def add_student(self, class_name: str, username: str) -> bool:
+        """Inscrit un élève ; False s'il l'était déjà"""
+
+    @abstractmethod
+    def remove_student(self, class_name: str, username: str) -> bool:
+        """Désinscrit un élève ; False s'il n'était pas inscrit"""
+
+    @abstractmethod
+    def memberships(self):
+        """Itère les (classe, utilisateur) : enseignant et élèves de chaque classe"""
+
+    # ---- Agenda d'un utilisateur ----
+    @abstractmethod
+    def agenda(self, username: str) -> List[Event]:
+        ...
+
+    @abstractmethod
+    def query_agenda(self, username: str, query: EventQuery,
+                     after: Optional[Tuple[datetime, int]] = None, limit: Optional[int] = None):
+        ...
+
+    @abstractmethod
+    def add_private_event(self, username: str, event: Event) -> Event:
+        ...
+
+    @abstractmethod
+    def add_private_events(self, username: str, events: List[Event]) -> List[Event]:
+        """Ajoute plusieurs événements en une seule transaction"""
+
+    @abstractmethod
+    def private_event_id(self, username: str, title: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def update_private_event(self, username: str, event_id: str, new_title: str,
+                             new_date: datetime, new_priority: PriorityLevel) -> Optional[Event]:
+        ...
+
+    @abstractmethod
+    def delete_private_event(self, username: str, event_id: str) -> Optional[Event]:
+        ...
+
+    # ---- Événements de classe ----
+    @abstractmethod
+    def class_events(self, class_name: str) -> List[Event]:
+        ...
+
+    @abstractmethod
+    def query_class_events(self, class_name: str, query: EventQuery,
+                           after: Optional[Tuple[datetime, int]] = None, limit: Optional[int] = None):
+        ...
+
+    @abstractmethod
+    def add_class_event(self, class_name: str, event: Event) -> Event:
+        ...
+
+    @abstractmethod
+    def add_class_events(self, class_name: str, events: List[Event]) -> List[Event]:
+        """Ajoute plusieurs événements en une seule transaction"""
+
+    @abstractmethod
+    def class_event_id(self, class_name: str, title: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def update_class_event(self, class_name: str, event_id: str, new_title: str,
+                           new_date: datetime, new_priority: PriorityLevel) -> Optional[Event]:
+        ...
+
+    @abstractmethod
+    def delete_class_event(self, class_name: str, event_id: str) -> Optional[Event]:
+        ...
+
+    # ---- Versions (ETag des flux, caches de réponses) ----
+    @abstractmethod
+    def agenda_version(self, username: str) -> str:
+        """Version opaque de l'agenda complet : change à chaque écriture de
+        l'agenda privé ou d'une classe de l'utilisateur, et à chaque inscription"""
+
+    @abstractmethod
+    def class_version(self, class_name: str) -> str:
+        """Version opaque des événements d'une classe"""
+
+    # ---- Rappels ----
+    @abstractmethod
+    def upcoming_events(self, since: datetime):
+        """Itère les (propriétaire, classe, événement) dont la date est >= since"""
+
+    @abstractmethod
+    def claim_reminder(self, event: Event, due: datetime) -> bool:
+        """Réserve l'envoi du rappel de `event` prévu à `due` : False s'il a déjà
+        été envoyé (par ce processus ou un autre worker) ou si l'événement a
+        changé depuis sa planification"""
+
+    @abstractmethod
+    def sent_reminders(self, since: datetime) -> dict:
+        """Rappels déjà envoyés dont l'échéance est >= since : {id: échéance}"""
+
+    @abstractmethod
+    def prune_reminders(self, before: datetime):
+        """Oublie les rappels envoyés dont l'échéance est < before"""
+
+    # ---- Statistiques (jauges de taille) ----
+    @abstractmethod
+    def size_stats(self) -> dict:
+        """Nombre d'événements stockés et taille du plus grand agenda, par type :
+        {'private': (total, max par utilisateur), 'shared': (total, max par classe)}"""
+
+    def close(self):
+        pass
+
+
+# ---- Backend mémoire (dictionnaires de fake_db + AgendaStore) ----
+
+def _event_id_by_title(store: AgendaStore, title: str) -> Optional[str]:
+    key = store.find_by_title(title)
+    return store.get(key).id if key is not None else None
+
+
+def _update_by_id(store: AgendaStore, event_id, new_title, new_date, new_priority) -> Optional[Event]:
+    key = store.find_by_id(event_id)
+    if key is None:
+        return None
+    return store.update(key, new_title, new_date, new_priority)
+
+
+def _delete_by_id(store: AgendaStore, event_id) -> Optional[Event]:
+    key = store.find_by_id(event_id)
+    if key is None:
+        return None
+    return store.remove(key)
+
+
+class MemoryRepository(AgendaRepository):
+    """Stockage en mémoire du processus, indexé par AgendaStore"""
+
+    def __init__(self, users_db: dict, classes_db: dict, agendas_db: dict, loader=None):
+        self.users_db = users_db
+        self.classes_db = classes_db
+        self.views = AgendaViews(users_db, classes_db, agendas_db, loader=loader)
+        # Les versions des AgendaStore repartent de 0 à chaque démarrage :
+        # la génération les distingue de celles d'un processus précédent
+        self._generation = uuid.uuid4().hex[:8]
+        # Rappels envoyés : propres au processus, comme le reste de ce backend
+        self._reminders_sent = {}  # id -> échéance
+        self._roster_version = 0
+
+    def get_user(self, username):
+        return self.users_db.get(username)
+
+    def update_user(self, username, **changes):
+        self.users_db[username].update(changes)
+
+    def get_class(self, class_name):
+        class_info = self.classes_db.get(class_name)
+        if class_info is None:
+            return None
+        return {"teacher": class_info["teacher"], "students": class_info["students"]}
+
+    def is_student(self, class_name, username):
+        return class_name in self.views.classes_of(username)
+
+    def add_student(self, class_name, username):
+        students = self.classes_db[class_name]["students"]
+        if username in students:
+            return False
+        students.append(username)
+        self._roster_version += 1
+        self.views.roster_changed()
+        return True
+
+    def remove_student(self, class_name, username):
+        students = self.classes_db[class_name]["students"]
+        if username not in students:
+            return False
+        students.remove(username)
+        self._roster_version += 1
+        self.views.roster_changed()
+        return True
+
+    def memberships(self):
+        for class_name, class_info in list(self.classes_db.items()):
+            yield class_name, class_info["teacher"]
+            for student in list(class_info["students"]):
+                yield class_name, student
+
+    def agenda(self, username):
+        return self.views.agenda(username)
+
+    def query_agenda(self, username, query, after=None, limit=None):
+        return self.views.query(username, query, after, limit)
+
+    def add_private_event(self, username, event):
+        event.id = new_event_id()
+        self.views.private_agenda(username).add(event)
+        return event
+
+    def add_private_events(self, username, events):
+        agenda = self.views.private_agenda(username)
+        for event in events:
+            event.id = new_event_id()
+            agenda.add(event)
+        return events
+
+    def private_event_id(self, username, title):
+        return _event_id_by_title(self.views.private_agenda(username), title)
+
+    def update_private_event(self, username, event_id, new_title, new_date, new_priority):
+        return _update_by_id(self.views.private_agenda(username), event_id, new_title, new_date, new_priority)
+
+    def delete_private_event(self, username, event_id):
+        return _delete_by_id(self.views.private_agenda(username), event_id)
+
+    def class_events(self, class_name):
+        return list(self.views.class_events(class_name))
+
+    def query_class_events(self, class_name, query, after=None, limit=None):
+        return query.run([self.views.class_events(class_name)], after, limit)
+
+    def add_class_event(self, class_name, event):
+        event.id = new_event_id()
+        self.views.class_events(class_name).add(event)
+        return event
+
+    def add_class_events(self, class_name, events):
+        store = self.views.class_events(class_name)
+        for event in events:
+            event.id = new_event_id()
+            store.add(event)
+        return events
+
+    def class_event_id(self, class_name, title):
+        return _event_id_by_title(self.views.class_events(class_name), title)
+
+    def update_class_event(self, class_name, event_id, new_title, new_date, new_priority):
+        return _update_by_id(self.views.class_events(class_name), event_id, new_title, new_date, new_priority)
+
+    def delete_class_event(self, class_name, event_id):
+        return _delete_by_id(self.views.class_events(class_name), event_id)
+
+    def agenda_version(self, username):
+        versions = [str(source.version) for source in self.views.sources(username)]
+        return f"{self._generation}:{self._roster_version}:{'.'.join(versions)}"
+
+    def class_version(self, class_name):
+        return f"{self._generation}:{self.views.class_events(class_name).version}"
+
+    def upcoming_events(self, since):
+        # Seuls les agendas déjà chargés : un parcours ne génère pas le jeu synthétique
+        for username, agenda in list(self.views.agendas_db.items()):
+            for _, event in agenda.iter_sorted(start=since):
+                yield username, None, event
+        for class_name, class_info in list(self.classes_db.items()):
+            events = class_info.get("events")
+            if events is None:
+                continue
+            for _, event in events.iter_sorted(start=since):
+                yield None, class_name, event
+
+    def claim_reminder(self, event, due):
+        if self._reminders_sent.get(event.id) == due:
+            return False
+        self._reminders_sent[event.id] = due
+        return True
+
+    def sent_reminders(self, since):
+        return {event_id: due for event_id, due in self._reminders_sent.items() if due >= since}
+
+    def prune_reminders(self, before):
+        self._reminders_sent = {event_id: due for event_id, due in self._reminders_sent.items() if due >= before}
+
+    def size_stats(self):
+        private = [len(agenda) for agenda in list(self.views.agendas_db.values())]
+        shared = [len(class_info.get("events") or ()) for class_info in list(self.classes_db.values())]
+        return {
+            'private': (sum(private), max(private, default=0)),
+            'shared': (sum(shared), max(shared, default=0)),
+        }
+
+
+# ---- Backend SQLite (fichier partagé entre plusieurs workers) ----
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    full_name TEXT,
+    email TEXT,
+    hashed_password TEXT NOT NULL,
+    disabled INTEGER,
+    role TEXT NOT NULL,
+    feed_generation INTEGER NOT NULL DEFAULT 0  -- révocation des tokens d'abonnement
+);
+CREATE TABLE IF NOT EXISTS classes (
+    name TEXT PRIMARY KEY,
+    teacher TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS class_students (
+    class_name TEXT NOT NULL,
+    username TEXT NOT NULL,
+    PRIMARY KEY (class_name, username)
+);
+CREATE INDEX IF NOT EXISTS idx_class_students_user ON class_students (username);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    owner TEXT,          -- événement privé : propriétaire
+    class_name TEXT,     -- événement de classe : classe
+    title TEXT NOT NULL,
+    date TEXT NOT NULL,  -- clé de tri 'YYYY-MM-DD HH:MM:SS.ffffff' (en UTC si la date a un fuseau)
+    priority TEXT NOT NULL,
+    uid TEXT,            -- identifiant public (ULID)
+    utc_offset INTEGER   -- décalage d'origine en secondes (NULL : date naïve)
+);
+CREATE INDEX IF NOT EXISTS idx_events_owner_date ON events (owner, date);
+CREATE INDEX IF NOT EXISTS idx_events_class_date ON events (class_name, date);
+CREATE INDEX IF NOT EXISTS idx_events_owner_title ON events (owner, title);
+CREATE INDEX IF NOT EXISTS idx_events_class_title ON events (class_name, title);
+CREATE TABLE IF NOT EXISTS versions (
+    scope TEXT PRIMARY KEY,  -- 'user:<nom>' (agenda privé, inscriptions) ou 'class:<nom>'
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reminders_sent (
+    event_id TEXT PRIMARY KEY,  -- uid de l'événement
+    due TEXT NOT NULL           -- échéance du dernier rappel envoyé (même format que events.date)
+);
+"""
+
+_EVENT_COLUMNS = "title, date, priority, uid, utc_offset"
+
+_SQL_USER = ("SELECT username, full_name, email, hashed_password, disabled, role, feed_generation "
+             "FROM users WHERE username = ?")
+_SQL_AGENDA = (
+    f"SELECT id, {_EVENT_COLUMNS} FROM events WHERE owner = ? "
+    f"UNION ALL SELECT id, {_EVENT_COLUMNS} FROM events WHERE class_name IN "
+    "(SELECT class_name FROM class_students WHERE username = ?) "
+    "ORDER BY date, id"
+)
+
+
+def _scope(owner: Optional[str], class_name: Optional[str]) -> str:
+    return f"user:{owner}" if owner is not None else f"class:{class_name}"
+
+
+def _sql_date(date: datetime) -> str:
+    """Clé de tri stockée : même convention que le backend mémoire (date_key)"""
+    return date_key(date).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _sql_offset(date: datetime) -> Optional[int]:
+    offset = date.utcoffset()
+    return None if offset is None else int(offset.total_seconds())
+
+
+def _row_date(value: str, offset: Optional[int]) -> datetime:
+    """Date relue : naïve, ou avec son décalage d'origine"""
+    date = datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f")
+    if offset is None:
+        return date
+    return date.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(seconds=offset)))
+
+
+def _row_to_event(row) -> Event:
+    return Event(title=row[0], date=_row_date(row[1], row[4]), priority=PriorityLevel(row[2]), id=row[3])
+
+
+def _query_conditions(query: EventQuery, after):
+    """Conditions SQL (et paramètres) d'une EventQuery, hors classes"""
+    sql, params = "", []
+    if after is not None:
+        sql += " AND (date, id) > (?, ?)"
+        params += [_sql_date(after[0]), after[1]]
+    if query.start is not None:
+        sql += " AND date >= ?"
+        params.append(_sql_date(query.start))
+    if query.end is not None:
+        sql += " AND date < ?"
+        params.append(_sql_date(query.end))
+    if query.priorities is not None:
+        sql += f" AND priority IN ({', '.join('?' * len(query.priorities))})"
+        params += sorted(priority.value for priority in query.priorities)
+    return sql, params
+
+
+def _query_rows(conn, sql: str, params: list, limit: Optional[int]):
+    """Exécute une requête (id, titre, date, priorité) -> (événements, curseur)"""
+    if limit is not None:
+        sql += " LIMIT ?"
+        params = params + [limit + 1]
+    entries = (((datetime.strptime(row[2], "%Y-%m-%d %H:%M:%S.%f"), row[0]), _row_to_event(row[1:]))
+               for row in conn.execute(sql, params))
+    return take_page(entries, limit)
+
+
+class SQLiteRepository(AgendaRepository):
+    """Stockage SQLite embarqué (mode WAL) avec un pool de connexions.
+
+    Les requêtes sont des chaînes constantes : sqlite3 garde leurs
+    statements préparés dans le cache de chaque connexion.
+    """
+
+    def __init__(self, path: str = 'agenda.db', pool_size: int = 4,
+                 seed_users: dict = None, seed_classes: dict = None, seed_events=None):
+        self.path = path
+        self._pool = queue.Queue()
+        self._write_lock = threading.Lock()  # un seul écrivain SQLite à la fois
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+        self._migrate()
+        if seed_users:
+            self._seed(seed_users, seed_classes or {}, seed_events or ())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256,
+                               isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def _transaction(self):
+        """Transaction d'écriture (BEGIN IMMEDIATE pour éviter les deadlocks WAL)"""
+        with self._write_lock, self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _migrate(self):
+        """Ajoute les identifiants publics, les décalages horaires et les
+        générations de tokens d'abonnement aux bases créées avant leur
+        introduction (les dates existantes restent naïves)"""
+        with self._transaction() as conn:
+            if "feed_generation" not in [row[1] for row in conn.execute("PRAGMA table_info(users)")]:
+                conn.execute("ALTER TABLE users ADD COLUMN feed_generation INTEGER NOT NULL DEFAULT 0")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(events)")]
+            if "uid" not in columns:
+                conn.execute("ALTER TABLE events ADD COLUMN uid TEXT")
+            if "utc_offset" not in columns:
+                conn.execute("ALTER TABLE events ADD COLUMN utc_offset INTEGER")
+            missing = conn.execute("SELECT id FROM events WHERE uid IS NULL ORDER BY id").fetchall()
+            conn.executemany("UPDATE events SET uid = ? WHERE id = ?",
+                             [(new_event_id(), row[0]) for row in missing])
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_events_uid ON events (uid)")
+
+    def _seed(self, users: dict, classes: dict, events=()):
+        """Remplit une base vide (un seul worker y parvient grâce à BEGIN IMMEDIATE).
+        `events` : lots (propriétaire, classe, événements), consommés seulement ici"""
+        with self._transaction() as conn:
+            if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0:
+                self._insert_seed(conn, users, classes)
+                for owner, class_name, batch in events:
+                    self._insert_many(conn, owner, class_name, batch)
+
+    def _insert_seed(self, conn, users: dict, classes: dict):
+        conn.executemany(
+            "INSERT INTO users (username, full_name, email, hashed_password, disabled, role) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(u["username"], u.get("full_name"), u.get("email"), u["hashed_password"],
+              int(bool(u.get("disabled"))), u["role"]) for u in users.values()],
+        )
+        for class_name, class_info in classes.items():
+            conn.execute("INSERT INTO classes VALUES (?, ?)", (class_name, class_info["teacher"]))
+            conn.executemany("INSERT INTO class_students VALUES (?, ?)",
+                             [(class_name, student) for student in class_info["students"]])
+
+    # ---- Utilisateurs ----
+
+    def get_user(self, username):
+        with self._connection() as conn:
+            row = conn.execute(_SQL_USER, (username,)).fetchone()
+        if row is None:
+            return None
+        return {"username": row[0], "full_name": row[1], "email": row[2],
+                "hashed_password": row[3], "disabled": bool(row[4]), "role": row[5], "feed_generation": row[6]}
+
+    def update_user(self, username, **changes):
+        allowed = {"full_name", "email", "hashed_password", "disabled", "role", "feed_generation"}
+        columns = [column for column in changes if column in allowed]
+        if not columns:
+            return
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        with self._transaction() as conn:
+            conn.execute(f"UPDATE users SET {assignments} WHERE username = ?",
+                         [changes[column] for column in columns] + [username])
+
+    # ---- Classes ----
+
+    def get_class(self, class_name):
+        with self._connection() as conn:
+            row = conn.execute("SELECT teacher FROM classes WHERE name = ?", (class_name,)).fetchone()
+            if row is None:
+                return None
+            students = [r[0] for r in conn.execute(
+                "SELECT username FROM class_students WHERE class_name = ?", (class_name,))]
+        return {"teacher": row[0], "students": students}
+
+    def is_student(self, class_name, username):
+        with self._connection() as conn:
+            return conn.execute("SELECT 1 FROM class_students WHERE class_name = ? AND username = ?",
+                                (class_name, username)).fetchone() is not None
+
+    def add_student(self, class_name, username):
+        with self._transaction() as conn:
+            cursor = conn.execute("INSERT OR IGNORE INTO class_students VALUES (?, ?)", (class_name, username))
+            if cursor.rowcount == 0:
+                return False
+            self._bump(conn, _scope(username, None))
+            return True
+
+    def remove_student(self, class_name, username):
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM class_students WHERE class_name = ? AND username = ?",
+                                  (class_name, username))
+            if cursor.rowcount == 0:
+                return False
+            self._bump(conn, _scope(username, None))
+            return True
+
+    def memberships(self):
+        with self._connection() as conn:
+            rows = conn.execute("SELECT name, teacher FROM classes "
+                                "UNION ALL SELECT class_name, username FROM class_students").fetchall()
+        yield from rows
+
+    # ---- Agenda d'un utilisateur ----
+
+    def agenda(self, username):
+        with self._connection() as conn:
+            return [_row_to_event(row[1:]) for row in conn.execute(_SQL_AGENDA, (username, username))]
+
+    def query_agenda(self, username, query, after=None, limit=None):
+        conditions, params = _query_conditions(query, after)
+        class_sql = (f"SELECT id, {_EVENT_COLUMNS} FROM events WHERE class_name IN "
+                     f"(SELECT class_name FROM class_students WHERE username = ?){conditions}")
+        class_params = [username] + params
+        if query.classes is not None:
+            class_sql += f" AND class_name IN ({', '.join('?' * len(query.classes))})"
+            class_params += sorted(query.classes)
+            sql, all_params = class_sql, class_params
+        else:
+            sql = f"SELECT id, {_EVENT_COLUMNS} FROM events WHERE owner = ?{conditions} UNION ALL {class_sql}"
+            all_params = [username] + params + class_params
+        with self._connection() as conn:
+            return _query_rows(conn, sql + " ORDER BY date, id", all_params, limit)
+
+    def _insert(self, conn, owner, class_name, event: Event):
+        self._insert_many(conn, owner, class_name, [event])
+
+    def _insert_many(self, conn, owner, class_name, events: List[Event]):
+        for event in events:
+            event.id = new_event_id()
+        conn.executemany("INSERT INTO events (owner, class_name, title, date, priority, uid, utc_offset) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         [(owner, class_name, event.title, _sql_date(event.date), event.priority.value, event.id,
+                           _sql_offset(event.date)) for event in events])
+        self._bump(conn, _scope(owner, class_name))
+
+    def _bump(self, conn, scope: str):
+        """Incrémente la version d'un agenda (dans la transaction d'écriture)"""
+        conn.execute("INSERT INTO versions VALUES (?, 1) "
+                     "ON CONFLICT (scope) DO UPDATE SET version = version + 1", (scope,))
+
+    def _event_id(self, scope_column, scope, title):
+        with self._connection() as conn:
+            row = conn.execute(f"SELECT uid FROM events WHERE {scope_column} = ? AND title = ? ORDER BY id LIMIT 1",
+                               (scope, title)).fetchone()
+        return row[0] if row else None
+
+    def _update(self, scope_column, scope, event_id, new_title, new_date, new_priority):
+        with self._transaction() as conn:
+            cursor = conn.execute(f"UPDATE events SET title = ?, date = ?, priority = ?, utc_offset = ? "
+                                  f"WHERE uid = ? AND {scope_column} = ?",
+                                  (new_title, _sql_date(new_date), new_priority.value, _sql_offset(new_date),
+                                   event_id, scope))
+            if cursor.rowcount == 0:
+                return None
+            self._bump(conn, f"{'user' if scope_column == 'owner' else 'class'}:{scope}")
+        return Event(title=new_title, date=new_date, priority=new_priority, id=event_id)
+
+    def _delete(self, scope_column, scope, event_id):
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT id, {_EVENT_COLUMNS} FROM events WHERE uid = ? AND {scope_column} = ?",
+                               (event_id, scope)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM events WHERE id = ?", (row[0],))
+            self._bump(conn, f"{'user' if scope_column == 'owner' else 'class'}:{scope}")
+        return _row_to_event(row[1:])
+
+    def add_private_event(self, username, event):
+        with self._transaction() as conn:
+            self._insert(conn, username, None, event)
+        return event
+
+    def add_private_events(self, username, events):
+        with self._transaction() as conn:
+            self._insert_many(conn, username, None, events)
+        return events
+
+    def private_event_id(self, username, title):
+        return self._event_id("owner", username, title)
+
+    def update_private_event(self, username, event_id, new_title, new_date, new_priority):
+        return self._update("owner", username, event_id, new_title, new_date, new_priority)
+
+    def delete_private_event(self, username, event_id):
+        return self._delete("owner", username, event_id)
+
+    # ---- Événements de classe ----
+
+    def class_events(self, class_name):
+        with self._connection() as conn:
+            rows = conn.execute(f"SELECT {_EVENT_COLUMNS} FROM events WHERE class_name = ? ORDER BY id",
+                                (class_name,))
+            return [_row_to_event(row) for row in rows]
+
+    def query_class_events(self, class_name, query, after=None, limit=None):
+        conditions, params = _query_conditions(query, after)
+        sql = f"SELECT id, {_EVENT_COLUMNS} FROM events WHERE class_name = ?{conditions} ORDER BY date, id"
+        with self._connection() as conn:
+            return _query_rows(conn, sql, [class_name] + params, limit)
+
+    def add_class_event(self, class_name, event):
+        with self._transaction() as conn:
+            self._insert(conn, None, class_name, event)
+        return event
+
+    def add_class_events(self, class_name, events):
+        with self._transaction() as conn:
+            self._insert_many(conn, None, class_name, events)
+        return events
+
+    def class_event_id(self, class_name, title):
+        return self._event_id("class_name", class_name, title)
+
+    def update_class_event(self, class_name, event_id, new_title, new_date, new_priority):
+        return self._update("class_name", class_name, event_id, new_title, new_date, new_priority)
+
+    def delete_class_event(self, class_name, event_id):
+        return self._delete("class_name", class_name, event_id)
+
+    # ---- Versions ----
+
+    def agenda_version(self, username):
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT scope, version FROM versions WHERE scope = ? OR scope IN "
+                "(SELECT 'class:' || class_name FROM class_students WHERE username = ?) ORDER BY scope",
+                (_scope(username, None), username)).fetchall()
+        return ".".join(f"{scope}={version}" for scope, version in rows)
+
+    def class_version(self, class_name):
+        with self._connection() as conn:
+            row = conn.execute("SELECT version FROM versions WHERE scope = ?",
+                               (_scope(None, class_name),)).fetchone()
+        return str(row[0] if row else 0)
+
+    def upcoming_events(self, since):
+        with self._connection() as conn:
+            rows = conn.execute(f"SELECT owner, class_name, {_EVENT_COLUMNS} FROM events WHERE date >= ?",
+                                (_sql_date(since),)).fetchall()
+        for row in rows:
+            yield row[0], row[1], _row_to_event(row[2:])
+
+    def claim_reminder(self, event, due):
+        # Un seul worker gagne : insertion, ou remplacement d'une échéance
+        # différente (événement déplacé), et seulement si l'événement stocké
+        # a toujours la date et la priorité planifiées
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO reminders_sent (event_id, due) SELECT ?, ? "
+                "WHERE EXISTS (SELECT 1 FROM events WHERE uid = ? AND date = ? AND priority = ?) "
+                "ON CONFLICT (event_id) DO UPDATE SET due = excluded.due WHERE due <> excluded.due",
+                (event.id, _sql_date(due), event.id, _sql_date(event.date), event.priority.value))
+            return cursor.rowcount == 1
+
+    def sent_reminders(self, since):
+        with self._connection() as conn:
+            rows = conn.execute("SELECT event_id, due FROM reminders_sent WHERE due >= ?",
+                                (_sql_date(since),)).fetchall()
+        return {event_id: datetime.strptime(due, "%Y-%m-%d %H:%M:%S.%f") for event_id, due in rows}
+
+    def prune_reminders(self, before):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM reminders_sent WHERE due < ?", (_sql_date(before),))
+
+    def size_stats(self):
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT owner IS NOT NULL, SUM(n), MAX(n) FROM "
+                "(SELECT owner, class_name, COUNT(*) AS n FROM events GROUP BY owner, class_name) "
+                "GROUP BY owner IS NOT NULL").fetchall()
+        stats = {'private': (0, 0), 'shared': (0, 0)}
+        for is_private, total, largest in rows:
+            stats['private' if is_private else 'shared'] = (total, largest)
+        return stats
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+def create_repository() -> AgendaRepository:
+    """Choisit le backend selon AGENDA_STORAGE (memory par défaut, ou sqlite)
+    et le jeu de données initial selon AGENDA_DATASET (demo par défaut, ou synthetic)"""
+    dataset = os.getenv('AGENDA_DATASET', 'demo')
+    backend = os.getenv('AGENDA_STORAGE', 'memory')
+    if backend not in ('memory', 'sqlite'):
+        raise ValueError(f"Backend de stockage inconnu : {backend}")
+
+    if dataset == 'synthetic':
+        from src.synthetic_db import dataset_from_env
+
+        synthetic = dataset_from_env()
+        if backend == 'sqlite':
+            return SQLiteRepository(
+                path=os.getenv('AGENDA_SQLITE_PATH', 'agenda.db'),
+                seed_users=synthetic.users_db(),
+                seed_classes=synthetic.classes_db(),
+                seed_events=synthetic.event_batches(),
+            )
+        return MemoryRepository(*synthetic.load(os.getenv('SYNTH_MODE', 'lazy')))
+    if dataset != 'demo':
+        raise ValueError(f"Jeu de données inconnu : {dataset}")
+
+    from src.fake_db import fake_users_db, fake_classes_db, fake_agendas_db
+
+    if backend == 'sqlite':
+        return SQLiteRepository(
+            path=os.getenv('AGENDA_SQLITE_PATH', 'agenda.db'),
+            seed_users=fake_users_db,
+            seed_classes=fake_classes_db,
+        )
+    return MemoryRepository(fake_users_db, fake_classes_db, fake_agendas_db)
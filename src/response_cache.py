@@ -0,0 +1,98 @@
+# src/response_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from src.metrics import response_cache_requests, response_cache_hit_ratio
+
+
+def make_etag(*parts) -> str:
+    """ETag fort dérivé de la version d'une ressource"""
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:24]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Vrai si l'en-tête If-None-Match désigne cette ETag (ou '*')"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]  # comparaison faible, comme le veut If-None-Match
+        if candidate == etag or candidate == "*":
+            return True
+    return False
+
+
+class VersionedCache:
+    """Réponses déjà encodées, indexées par ressource (LRU).
+
+    Chaque entrée mémorise la version de la ressource au moment de
+    l'encodage : une écriture change la version et l'entrée n'est plus
+    servie, même si l'écriture vient d'un autre worker. Les entrées
+    peuvent aussi être rangées par groupe (ex. une classe) pour être
+    libérées d'un coup par le processus qui écrit.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024):
+        self.name = name                # libellé des métriques
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # clé -> (version, contenu, groupe)
+        self._groups = {}               # groupe -> clés
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, version) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] == version
+            if hit:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+            ratio = self._hits / (self._hits + self._misses)
+        response_cache_requests.labels(cache=self.name, result='hit' if hit else 'miss').inc()
+        response_cache_hit_ratio.labels(cache=self.name).set(ratio)
+        return entry[1] if hit else None
+
+    def set(self, key, version, content: bytes, group=None):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, content, group)
+            if group is not None:
+                self._groups.setdefault(group, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, _, group = self._entries.pop(key)
+        if group is not None:
+            keys = self._groups[group]
+            keys.discard(key)
+            if not keys:
+                del self._groups[group]
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_group(self, group):
+        """Oublie toutes les réponses d'un groupe (ressource modifiée)"""
+        with self._lock:
+            for key in list(self._groups.get(group, ())):
+                self._remove(key)
+
+    def not_modified(self):
+        """Compte une requête servie par un 304 (rien n'est relu ni encodé)"""
+        response_cache_requests.labels(cache=self.name, result='not_modified').inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
@@ -0,0 +1,68 @@
+# src/session_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from src.metrics import session_cache_requests
+from src.models import UserInDB
+
+
+class SessionCache:
+    """Cache des utilisateurs déjà validés, indexé par token (LRU + TTL).
+
+    Évite de revérifier la signature du token et de reconstruire un UserInDB
+    à chaque requête authentifiée. Les
+    entrées expirent après `ttl` secondes et doivent être invalidées dès que
+    la fiche de l'utilisateur change (`invalidate_user`).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # token -> (expiration, utilisateur)
+        self._tokens_by_user = {}       # username -> tokens en cache
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[UserInDB]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(token)
+                session_cache_requests.labels(result='hit').inc()
+                return entry[1]
+            if entry is not None:
+                self._remove(token)
+        session_cache_requests.labels(result='miss').inc()
+        return None
+
+    def set(self, token: str, user: UserInDB, ttl: Optional[float] = None):
+        """Mémorise l'utilisateur d'un token ; `ttl` raccourcit la durée de
+        l'entrée (par exemple jusqu'à l'expiration du token)"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (time.monotonic() + ttl, user)
+            self._tokens_by_user.setdefault(user.username, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, token: str):
+        _, user = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user.username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user.username]
+
+    def invalidate_user(self, username: str):
+        """Oublie toutes les sessions d'un utilisateur (fiche modifiée)"""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(username, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
@@ -1,47 +1,163 @@
 # src/subscriber.py
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 import pika
+from prometheus_client import start_http_server, Counter, Histogram
+
+from src.class_routing import declare_user_queue, user_queue
+from src.fake_db import fake_classes_db
+from src.wire_format import decode_messages, describe, describe_digest
+
+# ---- Configuration (variables d'environnement) ----
+PREFETCH = int(os.getenv('SUBSCRIBER_PREFETCH', '200'))          # messages non acquittés par processus
+BATCH_SIZE = int(os.getenv('SUBSCRIBER_BATCH_SIZE', '50'))       # messages traités par lot
+BATCH_TIMEOUT = float(os.getenv('SUBSCRIBER_BATCH_TIMEOUT', '0.2'))  # secondes avant d'envoyer un lot incomplet
+WORKERS = int(os.getenv('SUBSCRIBER_WORKERS', '4'))              # threads de traitement par processus
+PROCESSES = int(os.getenv('SUBSCRIBER_PROCESSES', '1'))          # processus consommateurs
+METRICS_PORT = int(os.getenv('SUBSCRIBER_METRICS_PORT', '8004'))  # port du 1er processus (+1 par processus)
+
+
+def members_of_classes() -> list:
+    """Enseignants et élèves des classes (queues utilisateur écoutées par défaut)"""
+    members = []
+    for class_info in fake_classes_db.values():
+        for username in [class_info["teacher"], *class_info["students"]]:
+            if username not in members:
+                members.append(username)
+    return members
+
+
+# Utilisateurs écoutés : SUBSCRIBER_USERS=JessFerr,YannBerl (tous les membres par défaut).
+# Une queue par utilisateur, liée par l'API aux classes dont il est membre
+USERS = [u for u in os.getenv('SUBSCRIBER_USERS', '').split(',') if u] or members_of_classes()
+
+# Queues écoutées et libellé affiché pour chacune
+QUEUES = {
+    'private_events': "Notification privée reçue",
+    'private_event_updates': "Mise à jour d'événement privé reçue",
+    'notifications': "Notification reçue",
+}
+for username in USERS:
+    QUEUES[user_queue(username)] = f"Notification reçue ({username})"
+
+# ---- Métriques du consommateur ----
+messages_consumed = Counter(
+    'agenda_subscriber_messages',
+    'Nombre de messages traités par le subscriber',
+    ['queue', 'outcome']  # outcome : ack ou nack
+)
+message_lag = Histogram(
+    'agenda_subscriber_lag_seconds',
+    'Délai entre la publication et le traitement d\'un message'
+)
+batch_duration = Histogram(
+    'agenda_subscriber_batch_seconds',
+    'Durée de traitement d\'un lot de messages'
+)
+
 
-# Connexion à RabbitMQ
-try:
+def handle_message(queue_name: str, properties, body: bytes):
+    """Traitement d'un message (affichage de la notification)"""
+    try:
+        messages = decode_messages(body, properties.content_type if properties else None)
+    except ValueError as e:
+        # Message illisible : le remettre en queue le ferait revenir sans fin
+        print(f"Message ignoré ({queue_name}): {e}")
+        return
+    if messages is None:
+        text = body.decode()  # ancien message texte
+    elif len(messages) == 1:
+        text = describe(messages[0])
+    else:
+        text = describe_digest(messages)
+    print(f"[x] {QUEUES[queue_name]} : {text}")
+    sent_at = (properties.headers or {}).get('x-sent-at') if properties else None
+    if sent_at:
+        message_lag.observe(max(time.time() - sent_at, 0))
+
+
+def process_batch(connection, channel, batch):
+    """Traite un lot dans un thread du pool puis programme les acquittements
+    sur le thread de la connexion (pika n'est pas thread-safe)"""
+    start = time.perf_counter()
+    results = []
+    for queue_name, method, properties, body in batch:
+        try:
+            handle_message(queue_name, properties, body)
+            results.append((queue_name, method.delivery_tag, True))
+        except Exception as e:
+            print(f"Erreur de traitement ({queue_name}): {e}")
+            results.append((queue_name, method.delivery_tag, False))
+    batch_duration.observe(time.perf_counter() - start)
+
+    def acknowledge():
+        for queue_name, delivery_tag, ok in results:
+            if ok:
+                channel.basic_ack(delivery_tag=delivery_tag)
+            else:
+                channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+            messages_consumed.labels(queue=queue_name, outcome='ack' if ok else 'nack').inc()
+
+    connection.add_callback_threadsafe(acknowledge)
+
+
+def consume(index: int = 0):
+    """Boucle d'un processus consommateur : réception, lots, acquittements"""
+    start_http_server(METRICS_PORT + index)
     connection = pika.BlockingConnection(pika.ConnectionParameters(host='localhost'))
     channel = connection.channel()
+    channel.basic_qos(prefetch_count=PREFETCH)
     print("Connexion réussie à RabbitMQ !")
 
-    # Fonction appelée lorsqu'un message est reçu pour les événements partagés
-    def class_event_callback(ch, method, properties, body):
-        print(f"[x] Notification reçue : {body.decode()}")
-
-    # Fonction appelée lorsqu'un message est reçu pour les événements privés
-    def private_event_callback(ch, method, properties, body):
-        print(f"[x] Notification privée reçue : {body.decode()}")
+    pending = []
 
-    # Fonction appelée lorsqu'un message est reçu pour la mise à jour d'un événement privé
-    def private_event_update_callback(ch, method, properties, body):
-        print(f"[x] Mise à jour d'événement privé reçue : {body.decode()}")
+    def on_message(queue_name, ch, method, properties, body):
+        pending.append((queue_name, method, properties, body))
 
-    # Abonnement à la queue des événements privés
-    channel.queue_declare(queue='private_events')
-    channel.basic_consume(queue='private_events', on_message_callback=private_event_callback, auto_ack=True)
+    user_queues = {user_queue(username): username for username in USERS}
+    for queue_name in QUEUES:
+        if queue_name in user_queues:
+            declare_user_queue(channel, user_queues[queue_name])
+        else:
+            channel.queue_declare(queue=queue_name)
+        channel.basic_consume(queue=queue_name, on_message_callback=partial(on_message, queue_name), auto_ack=False)
 
-    # Abonnement à la queue des mises à jour d'événements privés
-    channel.queue_declare(queue='private_event_updates')
-    channel.basic_consume(queue='private_event_updates', on_message_callback=private_event_update_callback, auto_ack=True)
+    print(' [*] En attente des notifications pour les événements partagés, privés et les mises à jour. Appuyez sur CTRL+C pour quitter.')
 
-    # Abonnement à la queue des notifications
-    channel.queue_declare(queue='notifications')
-    channel.basic_consume(queue='notifications', on_message_callback=class_event_callback, auto_ack=True)
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        try:
+            while True:
+                # Reçoit les messages (et exécute les acquittements programmés)
+                deadline = time.monotonic() + BATCH_TIMEOUT
+                while len(pending) < BATCH_SIZE and time.monotonic() < deadline:
+                    connection.process_data_events(time_limit=max(deadline - time.monotonic(), 0))
+                while pending:
+                    batch, pending[:] = pending[:BATCH_SIZE], pending[BATCH_SIZE:]
+                    executor.submit(process_batch, connection, channel, batch)
+        except KeyboardInterrupt:
+            pass
+    # Les derniers acquittements sont envoyés avant la fermeture
+    connection.process_data_events(time_limit=0)
+    connection.close()
 
-    # Abonnement à la queue des événements partagés d'une ou plusieurs classes
-    classes_to_subscribe = ['M321', 'CG']  
-    for class_name in classes_to_subscribe:
-        queue_name = f'class_events_{class_name}'
-        channel.queue_declare(queue=queue_name)
-        channel.basic_consume(queue=queue_name, on_message_callback=class_event_callback, auto_ack=True)
 
-    print(' [*] En attente des notifications pour les événements partagés, privés et les mises à jour. Appuyez sur CTRL+C pour quitter.')
+def main():
+    try:
+        if PROCESSES <= 1:
+            consume()
+            return
+        processes = [multiprocessing.Process(target=consume, args=(i,)) for i in range(PROCESSES)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    except pika.exceptions.AMQPConnectionError as e:
+        print(f"Erreur de connexion à RabbitMQ. Assurez-vous que docker-compose up est en cours d'exécution.\nErreur : {e}")
 
-    # Démarrer la consommation des messages
-    channel.start_consuming()
 
-except Exception as e:
-    print(f"Erreur de connexion à RabbitMQ. Assurez-vous que docker-compose up est en cours d'exécution.\nErreur : {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# src/synthetic_db.py
+import os
+import random
+import re
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+from src.agenda_store import AgendaStore, StoredEvent
+from src.models import PriorityLevel
+
+# Jeu de données synthétique à l'échelle d'un ensemble d'écoles, déterministe
+# pour une graine donnée (noms, inscriptions, titres, dates et priorités ;
+# les identifiants ULID restent attribués au chargement). Les événements sont
+# produits directement sous forme de StoredEvent, sans modèle pydantic.
+#
+# En mode "lazy" (défaut), rien n'est construit au démarrage à part les listes
+# d'élèves des classes : une fiche utilisateur est créée au premier accès et
+# un agenda (privé ou de classe) est généré à sa première lecture.
+# En mode "eager", tous les agendas sont générés d'emblée.
+
+SYNTH_PASSWORD = 'pwd-synth'  # mot de passe de tous les comptes générés
+
+_SUBJECTS = ('Maths', 'Français', 'Allemand', 'Anglais', 'Histoire', 'Géographie', 'Physique',
+             'Chimie', 'Biologie', 'Informatique', 'Économie', 'Sport', 'Musique', 'Arts')
+_CLASS_KINDS = (('Examen', PriorityLevel.P1), ('Devoir', PriorityLevel.P2), ('Info', PriorityLevel.P3))
+_PRIVATE_KINDS = ('Révision', 'Rendez-vous', 'Entraînement', 'Lecture')
+_CLASS_WEIGHTS = (1, 5, 4)  # 10 % d'examens, 50 % de devoirs, 40 % d'infos
+
+_USERNAME = re.compile(r's(\d+)-(prof|el)(\d+)$')
+_CLASS_NAME = re.compile(r's(\d+)-c(\d+)$')
+
+
+class SchoolDataset:
+    """Écoles, enseignants, élèves, classes et historiques d'événements générés"""
+
+    def __init__(self, schools: int = 10, teachers: int = 40, students: int = 1000,
+                 classes: int = 40, classes_per_student: int = 6, class_events: int = 200,
+                 private_events: int = 20, seed: int = 42,
+                 start: datetime = datetime(2024, 8, 19), days: int = 320):
+        self.schools = schools
+        self.teachers = teachers                          # par école
+        self.students = students                          # par école
+        self.classes = classes                            # par école
+        self.classes_per_student = min(classes_per_student, classes)
+        self.class_events = class_events                  # par classe
+        self.private_events = private_events              # par élève
+        self.seed = seed
+        self.start = start
+        self.days = days
+
+    # ---- Noms ----
+
+    @staticmethod
+    def teacher_name(school: int, index: int) -> str:
+        return f"s{school:03d}-prof{index:03d}"
+
+    @staticmethod
+    def student_name(school: int, index: int) -> str:
+        return f"s{school:03d}-el{index:05d}"
+
+    @staticmethod
+    def class_name(school: int, index: int) -> str:
+        return f"s{school:03d}-c{index:03d}"
+
+    def usernames(self):
+        for school in range(self.schools):
+            for index in range(self.teachers):
+                yield self.teacher_name(school, index)
+            for index in range(self.students):
+                yield self.student_name(school, index)
+
+    def user_count(self) -> int:
+        return self.schools * (self.teachers + self.students)
+
+    def event_count(self) -> int:
+        return self.schools * (self.classes * self.class_events + self.students * self.private_events)
+
+    def _rng(self, *parts) -> random.Random:
+        # Une graine par entité : chaque agenda se génère seul, dans n'importe quel ordre
+        return random.Random(f"{self.seed}:" + ":".join(map(str, parts)))
+
+    # ---- Utilisateurs ----
+
+    def make_user(self, username: str) -> dict:
+        """Fiche d'un utilisateur généré (KeyError si le nom n'en désigne aucun)"""
+        match = _USERNAME.match(username)
+        if match is None:
+            raise KeyError(username)
+        school, kind, index = int(match[1]), match[2], int(match[3])
+        limit = self.teachers if kind == 'prof' else self.students
+        if school >= self.schools or index >= limit:
+            raise KeyError(username)
+        role = "enseignant" if kind == 'prof' else "eleve"
+        label = "Enseignant" if kind == 'prof' else "Élève"
+        return {
+            "username": username,
+            "full_name": f"{label} {index} (école {school})",
+            "email": f"{username}@edu.vs.ch",
+            "hashed_password": "fakehashed" + SYNTH_PASSWORD,
+            "disabled": False,
+            "role": role,
+        }
+
+    def users_db(self) -> "LazyUsers":
+        return LazyUsers(self)
+
+    # ---- Classes ----
+
+    def classes_db(self) -> dict:
+        """Classes et listes d'élèves (les événements sont générés à part)"""
+        classes = {}
+        for school in range(self.schools):
+            rosters = [[] for _ in range(self.classes)]
+            for index in range(self.students):
+                rng = self._rng('student', school, index)
+                for class_index in rng.sample(range(self.classes), self.classes_per_student):
+                    rosters[class_index].append(self.student_name(school, index))
+            for class_index, roster in enumerate(rosters):
+                classes[self.class_name(school, class_index)] = {
+                    "teacher": self.teacher_name(school, class_index % self.teachers),
+                    "students": roster,
+                }
+        return classes
+
+    # ---- Événements ----
+
+    def _date(self, rng: random.Random) -> datetime:
+        # Jours de semaine, entre 7h et 17h (créneaux de 5 minutes), un seul tirage
+        day, slot = divmod(int(rng.random() * self.days * 120), 120)
+        date = self.start + timedelta(days=day)
+        date -= timedelta(days=max(date.weekday() - 4, 0))
+        return date.replace(hour=7) + timedelta(minutes=5 * slot)
+
+    def generate_class_events(self, class_name: str):
+        """Historique généré d'une classe (liste vide pour une classe inconnue)"""
+        if _CLASS_NAME.match(class_name) is None:
+            return []
+        rng = self._rng('class', class_name)
+        subject = _SUBJECTS[rng.randrange(len(_SUBJECTS))]
+        events = []
+        for n in range(self.class_events):
+            kind, priority = rng.choices(_CLASS_KINDS, weights=_CLASS_WEIGHTS)[0]
+            events.append(StoredEvent(f"{kind} {subject} {n + 1}", self._date(rng), priority))
+        return events
+
+    def generate_private_events(self, username: str):
+        """Agenda privé généré d'un élève (vide pour un enseignant ou un inconnu)"""
+        match = _USERNAME.match(username)
+        if match is None or match[2] != 'el':
+            return []
+        rng = self._rng('private', username)
+        priorities = list(PriorityLevel)
+        return [
+            StoredEvent(f"{rng.choice(_PRIVATE_KINDS)} {rng.choice(_SUBJECTS)}", self._date(rng),
+                        rng.choice(priorities))
+            for _ in range(self.private_events)
+        ]
+
+    # ---- Chargement ----
+
+    def event_batches(self):
+        """Lots (propriétaire, classe, événements) générés un agenda à la fois"""
+        for school in range(self.schools):
+            for index in range(self.classes):
+                class_name = self.class_name(school, index)
+                yield None, class_name, self.generate_class_events(class_name)
+            if self.private_events:
+                for index in range(self.students):
+                    username = self.student_name(school, index)
+                    yield username, None, self.generate_private_events(username)
+
+    def load(self, mode: str = 'lazy'):
+        """(users_db, classes_db, agendas_db, loader) pour MemoryRepository"""
+        users, classes = self.users_db(), self.classes_db()
+        if mode == 'lazy':
+            return users, classes, {}, self
+        if mode != 'eager':
+            raise ValueError(f"Mode de chargement inconnu : {mode}")
+        agendas = {}
+        for owner, class_name, events in self.event_batches():
+            if owner is None:
+                classes[class_name]["events"] = AgendaStore(events)
+            else:
+                agendas[owner] = AgendaStore(events)
+        return users, classes, agendas, None
+
+
+class LazyUsers(Mapping):
+    """Fiches utilisateurs créées au premier accès puis conservées
+    (une modification via update_user reste donc visible)"""
+
+    def __init__(self, dataset: SchoolDataset):
+        self.dataset = dataset
+        self._touched = {}
+
+    def __getitem__(self, username: str) -> dict:
+        user = self._touched.get(username)
+        if user is None:
+            user = self._touched[username] = self.dataset.make_user(username)
+        return user
+
+    def __contains__(self, username) -> bool:
+        try:
+            self[username]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return self.dataset.usernames()
+
+    def __len__(self) -> int:
+        return self.dataset.user_count()
+
+
+def dataset_from_env() -> SchoolDataset:
+    """Jeu synthétique configuré par les variables SYNTH_*"""
+    return SchoolDataset(
+        schools=int(os.getenv('SYNTH_SCHOOLS', '10')),
+        teachers=int(os.getenv('SYNTH_TEACHERS', '40')),
+        students=int(os.getenv('SYNTH_STUDENTS', '1000')),
+        classes=int(os.getenv('SYNTH_CLASSES', '40')),
+        classes_per_student=int(os.getenv('SYNTH_CLASSES_PER_STUDENT', '6')),
+        class_events=int(os.getenv('SYNTH_CLASS_EVENTS', '200')),
+        private_events=int(os.getenv('SYNTH_PRIVATE_EVENTS', '20')),
+        seed=int(os.getenv('SYNTH_SEED', '42')),
+    )
@@ -0,0 +1,269 @@
+# src/wire_format.py
+import json
+import os
+import struct
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from src.agenda_store import date_key
+from src.models import PriorityLevel
+
+# ---- Format des messages publiés sur RabbitMQ ----
+#
+# Version 1, binaire (ordre réseau) :
+#   en-tête  !BBBqHHHH  version, action, priorité, date (µs depuis l'epoch),
+#                       longueurs UTF-8 de : id, titre, classe, auteur
+#   suivi des 4 chaînes concaténées (longueur 0 = absente)
+#
+# Le format JSON de secours porte les mêmes champs ; il est aussi utilisé
+# pour un message dont une chaîne dépasse 65535 octets (longueurs sur 16 bits). Le type de contenu
+# AMQP indique le format et sa version ; un message sans type connu est
+# un ancien message texte.
+#
+# Résumé (digest, plusieurs changements regroupés en un message) :
+#   binaire  !BH version, nombre de messages, puis pour chacun
+#            !I longueur suivie du message binaire ci-dessus
+#   JSON     {"v": 1, "digest": [messages JSON]}
+
+WIRE_VERSION = 1
+BINARY_CONTENT_TYPE = f'application/x-agenda-event; v={WIRE_VERSION}'
+JSON_CONTENT_TYPE = f'application/json; v={WIRE_VERSION}'
+BINARY_DIGEST_CONTENT_TYPE = f'application/x-agenda-digest; v={WIRE_VERSION}'
+JSON_DIGEST_CONTENT_TYPE = f'application/x-agenda-digest+json; v={WIRE_VERSION}'
+
+# Format utilisé par les publishers : binary (défaut) ou json
+MESSAGE_FORMAT = os.getenv('MESSAGE_FORMAT', 'binary')
+
+# Codes des actions et priorités (l'ordre fait partie du format : ajouter à la fin)
+ACTIONS = ('created', 'updated', 'deleted', 'reminder')
+_ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+_PRIORITIES = tuple(PriorityLevel)
+_PRIORITY_CODES = {priority: code for code, priority in enumerate(_PRIORITIES)}
+
+_HEADER = struct.Struct('!BBBqHHHH')
+_DIGEST_HEADER = struct.Struct('!BH')
+_LENGTH = struct.Struct('!I')
+_EPOCH = datetime(1970, 1, 1)
+
+
+class EventMessage(NamedTuple):
+    """Contenu d'un message d'événement (création, modification, suppression, rappel)"""
+    action: str
+    title: str
+    date: datetime
+    priority: PriorityLevel
+    class_name: Optional[str] = None
+    event_id: Optional[str] = None
+    author: Optional[str] = None
+
+
+def _to_micros(date: datetime) -> int:
+    """Date (sans fuseau, comme les index) en microsecondes depuis l'epoch"""
+    delta = date_key(date) - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+# ---- Binaire ----
+
+def encode_binary(message: EventMessage) -> bytes:
+    """Lève ValueError si une chaîne est trop longue pour le format binaire"""
+    event_id = (message.event_id or '').encode()
+    title = message.title.encode()
+    class_name = (message.class_name or '').encode()
+    author = (message.author or '').encode()
+    try:
+        header = _HEADER.pack(WIRE_VERSION, _ACTION_CODES[message.action], _PRIORITY_CODES[message.priority],
+                              _to_micros(message.date), len(event_id), len(title), len(class_name), len(author))
+    except struct.error as e:
+        raise ValueError(f"Message trop long pour le format binaire : {e}") from e
+    return b''.join((header, event_id, title, class_name, author))
+
+
+def decode_binary(data: bytes) -> EventMessage:
+    """Lève ValueError si le message est tronqué ou d'une version inconnue"""
+    try:
+        version, action, priority, micros, *lengths = _HEADER.unpack_from(data)
+    except struct.error as e:
+        raise ValueError(f"Message binaire invalide : {e}") from e
+    if version != WIRE_VERSION:
+        raise ValueError(f"Version de message inconnue : {version}")
+    if _HEADER.size + sum(lengths) != len(data):
+        raise ValueError("Message binaire tronqué")
+    fields = []
+    offset = _HEADER.size
+    for length in lengths:
+        fields.append(data[offset:offset + length].decode() or None)
+        offset += length
+    event_id, title, class_name, author = fields
+    return EventMessage(ACTIONS[action], title or '', _from_micros(micros), _PRIORITIES[priority],
+                        class_name, event_id, author)
+
+
+# ---- JSON (secours) ----
+
+def _json_fields(message: EventMessage) -> dict:
+    return {
+        'v': WIRE_VERSION,
+        'action': message.action,
+        'id': message.event_id,
+        'title': message.title,
+        'date': _to_micros(message.date),
+        'priority': message.priority.value,
+        'class': message.class_name,
+        'author': message.author,
+    }
+
+
+def _from_json_fields(payload: dict) -> EventMessage:
+    if payload['v'] != WIRE_VERSION:
+        raise ValueError(f"Version de message inconnue : {payload['v']}")
+    return EventMessage(payload['action'], payload['title'], _from_micros(payload['date']),
+                        PriorityLevel(payload['priority']), payload['class'], payload['id'],
+                        payload['author'])
+
+
+def encode_json(message: EventMessage) -> bytes:
+    return json.dumps(_json_fields(message), ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def decode_json(data: bytes) -> EventMessage:
+    """Lève ValueError si le message est invalide ou d'une version inconnue"""
+    try:
+        return _from_json_fields(json.loads(data))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Message JSON invalide : {e}") from e
+
+
+# ---- Résumés ----
+
+def encode_digest_binary(messages: List[EventMessage]) -> bytes:
+    """Lève ValueError si un message est trop long pour le format binaire"""
+    parts = [_DIGEST_HEADER.pack(WIRE_VERSION, len(messages))]
+    for message in messages:
+        body = encode_binary(message)
+        parts.append(_LENGTH.pack(len(body)))
+        parts.append(body)
+    return b''.join(parts)
+
+
+def decode_digest_binary(data: bytes) -> List[EventMessage]:
+    """Lève ValueError si le résumé est tronqué ou d'une version inconnue"""
+    try:
+        version, count = _DIGEST_HEADER.unpack_from(data)
+        if version != WIRE_VERSION:
+            raise ValueError(f"Version de message inconnue : {version}")
+        messages = []
+        offset = _DIGEST_HEADER.size
+        for _ in range(count):
+            (length,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            messages.append(decode_binary(data[offset:offset + length]))
+            offset += length
+    except struct.error as e:
+        raise ValueError(f"Résumé binaire invalide : {e}") from e
+    if offset != len(data):
+        raise ValueError("Résumé binaire invalide : octets en trop")
+    return messages
+
+
+def encode_digest_json(messages: List[EventMessage]) -> bytes:
+    payload = {'v': WIRE_VERSION, 'digest': [_json_fields(message) for message in messages]}
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def decode_digest_json(data: bytes) -> List[EventMessage]:
+    try:
+        payload = json.loads(data)
+        if payload['v'] != WIRE_VERSION:
+            raise ValueError(f"Version de message inconnue : {payload['v']}")
+        return [_from_json_fields(fields) for fields in payload['digest']]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Résumé JSON invalide : {e}") from e
+
+
+# ---- Choix du format ----
+
+def encode(message: EventMessage, fmt: str = None) -> Tuple[bytes, str]:
+    """Encode un message ; retourne (corps, type de contenu). Un message trop
+    long pour le binaire part en JSON"""
+    if (fmt or MESSAGE_FORMAT) != 'json':
+        try:
+            return encode_binary(message), BINARY_CONTENT_TYPE
+        except ValueError:
+            pass
+    return encode_json(message), JSON_CONTENT_TYPE
+
+
+def encode_digest(messages: List[EventMessage], fmt: str = None) -> Tuple[bytes, str]:
+    """Encode un résumé ; retourne (corps, type de contenu). Si un message est
+    trop long pour le binaire, tout le résumé part en JSON (rien n'est perdu)"""
+    if (fmt or MESSAGE_FORMAT) != 'json':
+        try:
+            return encode_digest_binary(messages), BINARY_DIGEST_CONTENT_TYPE
+        except ValueError:
+            pass
+    return encode_digest_json(messages), JSON_DIGEST_CONTENT_TYPE
+
+
+def decode(body: bytes, content_type: Optional[str]) -> Optional[EventMessage]:
+    """Décode selon le type de contenu ; None pour un ancien message texte"""
+    if content_type == BINARY_CONTENT_TYPE:
+        return decode_binary(body)
+    if content_type == JSON_CONTENT_TYPE:
+        return decode_json(body)
+    if content_type and content_type.split(';')[0] in ('application/x-agenda-event', 'application/json'):
+        raise ValueError(f"Version de message non supportée : {content_type}")
+    return None
+
+
+def decode_messages(body: bytes, content_type: Optional[str]) -> Optional[List[EventMessage]]:
+    """Comme decode, mais accepte aussi les résumés : liste des messages
+    (un seul pour un message simple), None pour un ancien message texte"""
+    if content_type == BINARY_DIGEST_CONTENT_TYPE:
+        return decode_digest_binary(body)
+    if content_type == JSON_DIGEST_CONTENT_TYPE:
+        return decode_digest_json(body)
+    if content_type and content_type.split(';')[0].startswith('application/x-agenda-digest'):
+        raise ValueError(f"Version de message non supportée : {content_type}")
+    message = decode(body, content_type)
+    return [message] if message is not None else None
+
+
+# ---- Affichage ----
+
+_REMINDER_PREFIXES = {
+    PriorityLevel.P1: "URGENT!",
+    PriorityLevel.P2: "Rappel:",
+    PriorityLevel.P3: "Info:",
+}
+
+
+def describe(message: EventMessage) -> str:
+    """Texte lisible d'un message (celui qu'affichaient les anciens messages)"""
+    day = message.date.strftime('%d/%m/%Y')
+    if message.action == 'reminder':
+        text = f"{_REMINDER_PREFIXES[message.priority]} {message.title} - échéance: {day}"
+        if message.class_name:
+            text = f"[Classe {message.class_name}] {text}"
+        if message.author:
+            text = f"{text} | Par: {message.author}"
+        return text
+    if message.class_name:
+        if message.action == 'created':
+            return f"{message.author} a ajouté une affectation | Échéance: {day} | Classe: {message.class_name}"
+        if message.action == 'updated':
+            return f"{message.author} a mis à jour '{message.title}' | Nouvelle échéance: {day}"
+        return f"L'événement '{message.title}' a été supprimé de la classe {message.class_name}"
+    if message.action == 'updated':
+        return f"Mise à jour événement privé : {message.title}, Nouvelle date : {message.date}, Priorité : {message.priority.value}"
+    return f"Événement privé : {message.title}, Date : {message.date}, Priorité : {message.priority.value}"
+
+
+def describe_digest(messages: List[EventMessage]) -> str:
+    """Texte lisible d'un résumé : une ligne par changement"""
+    lines = "".join(f"\n    - {describe(message)}" for message in messages)
+    return f"Résumé de {len(messages)} changement(s) :{lines}"